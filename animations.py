@@ -0,0 +1,127 @@
+"""Планировщик анимаций"""
+from array import array
+
+
+class AnimationScheduler:
+    """Хранит только активные анимации и обновляет их одним проходом
+
+    Анимация - любой объект с методом update_animation(delta_time), который
+    возвращает True, пока анимация продолжается. Завершенные анимации
+    удаляются из планировщика, поэтому стоимость кадра зависит только
+    от количества активных анимаций, а не от количества блоков на поле.
+    """
+
+    def __init__(self):
+        self.active = []
+
+    def add(self, animation):
+        """Добавляет анимацию"""
+        self.active.append(animation)
+
+    def add_many(self, animations):
+        """Добавляет несколько анимаций сразу"""
+        self.active.extend(animations)
+
+    def update(self, delta_time):
+        """Обновляет все активные анимации и удаляет завершенные"""
+        active = self.active
+        alive = 0
+        for animation in active:
+            if animation.update_animation(delta_time):
+                # Сдвигаем живые анимации к началу списка без новых выделений
+                active[alive] = animation
+                alive += 1
+        del active[alive:]
+
+    def clear(self):
+        """Удаляет все анимации"""
+        self.active.clear()
+
+    def __len__(self):
+        return len(self.active)
+
+
+class FadeOut:
+    """Плавное исчезновение спрайта с удалением из списка по завершении"""
+
+    def __init__(self, sprite, sprite_list, duration=0.25):
+        """
+        sprite: спрайт, который исчезает
+        sprite_list: список спрайтов, из которого спрайт удаляется в конце
+        duration: длительность исчезновения в секундах
+        """
+        self.sprite = sprite
+        self.sprite_list = sprite_list
+        self.duration = duration
+        self.time_left = duration
+
+    def update_animation(self, delta_time):
+        """Обновление прозрачности; возвращает False, когда спрайт исчез"""
+        self.time_left -= delta_time
+        if self.time_left <= 0:
+            if self.sprite in self.sprite_list:
+                self.sprite_list.remove(self.sprite)
+            return False
+        self.sprite.alpha = int(255 * self.time_left / self.duration)
+        return True
+
+
+class ScoreMessages:
+    """Всплывающие сообщения об изменении очков
+
+    Сообщения хранятся в параллельных массивах (координаты и время жизни -
+    в array, текст и цвет - в списках), а не отдельными объектами: новое
+    сообщение дописывается в конец, завершенные удаляются сдвигом живых
+    к началу, как в AnimationScheduler.
+    """
+
+    def __init__(self, speed=30):
+        """speed: скорость подъема сообщений в пикселях в секунду"""
+        self.speed = speed
+        self.texts = []
+        self.colors = []
+        self.xs = array('d')
+        self.ys = array('d')
+        self.lives = array('d')
+
+    def add(self, text, x, y, color, life=1.5):
+        """Добавляет сообщение
+        text: текст сообщения
+        x, y: начальная позиция в пикселях
+        color: цвет текста
+        life: время жизни в секундах
+        """
+        self.texts.append(text)
+        self.colors.append(color)
+        self.xs.append(x)
+        self.ys.append(y)
+        self.lives.append(life)
+
+    def update(self, delta_time):
+        """Движение вверх и удаление сообщений, время жизни которых истекло"""
+        texts, colors, xs, ys, lives = (self.texts, self.colors, self.xs,
+                                        self.ys, self.lives)
+        rise = self.speed * delta_time
+        alive = 0
+        for i in range(len(lives)):
+            life = lives[i] - delta_time
+            if life > 0:
+                texts[alive] = texts[i]
+                colors[alive] = colors[i]
+                xs[alive] = xs[i]
+                ys[alive] = ys[i] + rise
+                lives[alive] = life
+                alive += 1
+        if alive < len(lives):
+            del texts[alive:], colors[alive:], xs[alive:], ys[alive:], lives[alive:]
+
+    def clear(self):
+        """Удаляет все сообщения"""
+        del self.texts[:], self.colors[:], self.xs[:], self.ys[:], self.lives[:]
+
+    def __iter__(self):
+        """Сообщения в виде (текст, x, y, цвет)"""
+        return zip(self.texts, self.xs, self.ys, self.colors)
+
+    def __len__(self):
+        return len(self.lives)
@@ -2,6 +2,37 @@
 import arcade
 from constants import GRID_WIDTH, GRID_HEIGHT, MARGIN, CELL_SIZE
 
+# Текстура яблока загружается один раз за запуск (см. apple_texture)
+_texture = None
+
+
+def apple_texture():
+    """Текстура яблока: сначала из локального файла, потом из встроенных ресурсов"""
+    global _texture
+    if _texture is not None:
+        return _texture
+    texture_paths = [
+        "sprites/apple.png",  # Локальный файл в папке проекта
+        ":resources:images/items/fruit/apple.png",
+        ":resources:images/items/apple.png",
+    ]
+
+    texture = None
+    for path in texture_paths:
+        try:
+            texture = arcade.load_texture(path)
+            break
+        except:
+            continue
+
+    # Если текстура не загрузилась, создаем цветной спрайт
+    if not texture:
+        texture = arcade.make_soft_square_texture(
+            CELL_SIZE, (255, 50, 50), outer_alpha=255
+        )
+    _texture = texture
+    return texture
+
 
 class Apple(arcade.Sprite):
     """Класс для яблока с использованием спрайта"""
@@ -11,26 +42,7 @@ class Apple(arcade.Sprite):
         Создает яблоко
         x, y: позиция яблока в сетке
         """
-        # Загружаем текстуру яблока (сначала из локального файла, потом из встроенных ресурсов)
-        texture_paths = [
-            "sprites/apple.png",  # Локальный файл в папке проекта
-            ":resources:images/items/fruit/apple.png",
-            ":resources:images/items/apple.png",
-        ]
-
-        texture = None
-        for path in texture_paths:
-            try:
-                texture = arcade.load_texture(path)
-                break
-            except:
-                continue
-
-        # Если текстура не загрузилась, создаем цветной спрайт
-        if not texture:
-            texture = arcade.make_soft_square_texture(
-                CELL_SIZE, (255, 50, 50), outer_alpha=255
-            )
+        texture = apple_texture()
 
         # Создаем спрайт с загруженной текстурой
         super().__init__()
@@ -66,12 +78,13 @@ class Apple(arcade.Sprite):
         return (self.grid_x, self.grid_y)
 
     def update_animation(self, delta_time):
-        """Обновление анимации вращения"""
+        """Обновление анимации вращения; возвращает True, пока яблоко вращается"""
         self.angle += self.rotation_speed * delta_time
         if self.rotation_speed > 0:
             self.rotation_speed -= 50 * delta_time  # Замедление
             if self.rotation_speed < 0:
                 self.rotation_speed = 0
+        return self.rotation_speed > 0
 
     def start_rotation(self):
         """Запускает анимацию вращения"""
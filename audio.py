@@ -0,0 +1,171 @@
+"""Звук игры: короткие звуки через пул голосов и потоковая музыка
+
+Короткие звуки загружаются один раз за запуск программы и играют через
+постоянный набор плееров (голосов): новый звук занимает свободный голос,
+а если свободных нет - перехватывает самый давний. У каждого звука есть
+пауза между повторами, поэтому в серии комбо не накапливаются одинаковые
+звуки. Фоновая музыка читается с диска по мере проигрывания, а не
+декодируется в память целиком перед началом игры.
+"""
+import threading
+import time
+
+import arcade
+import pyglet
+
+# Сколько звуков может играть одновременно
+VOICE_COUNT = 8
+
+# Короткие звуки: первый загрузившийся файл из списка
+SOUND_PATHS = {
+    'eat_apple': [
+        ":resources:sounds/coin1.wav",
+        ":resources:sounds/coin2.wav",
+        ":resources:sounds/coin3.wav",
+        ":resources:sounds/coin4.wav",
+        ":resources:sounds/coin5.wav",
+    ],
+    'line_clear': [
+        ":resources:sounds/upgrade1.wav",
+        ":resources:sounds/upgrade2.wav",
+        ":resources:sounds/upgrade3.wav",
+        ":resources:sounds/upgrade4.wav",
+        ":resources:sounds/upgrade5.wav",
+    ],
+    'game_over': [
+        ":resources:sounds/gameover1.wav",
+        ":resources:sounds/gameover2.wav",
+        ":resources:sounds/gameover3.wav",
+        ":resources:sounds/gameover4.wav",
+        ":resources:sounds/gameover5.wav",
+    ],
+}
+MUSIC_PATHS = [
+    ":resources:music/funkyrobot.mp3",
+    ":resources:music/1918.mp3",
+]
+
+# Минимальная пауза между повторами звука (в секундах)
+SOUND_COOLDOWNS = {
+    'eat_apple': 0.05,
+    'line_clear': 0.1,
+    'game_over': 0.0,
+}
+
+
+class Voice:
+    """Плеер из пула; освобождается, когда звук доиграл"""
+
+    def __init__(self):
+        self.player = pyglet.media.Player()
+        self.player.push_handlers(on_player_eos=self._on_eos)
+        self.busy = False
+        self.started = 0.0
+
+    def _on_eos(self):
+        self.busy = False
+
+    def play(self, source, volume, now):
+        """Проигрывает source, прерывая текущий звук голоса"""
+        player = self.player
+        if player.source is not None:
+            player.pause()
+            player.next_source()
+        player.volume = volume
+        player.queue(source)
+        player.play()
+        self.busy = True
+        self.started = now
+
+
+class AudioManager:
+    """Звуки одного процесса: загружаются один раз, играют через пул голосов"""
+
+    def __init__(self, voice_count=VOICE_COUNT):
+        self.voice_count = voice_count
+        self.voices = None    # Голоса создаются при первом звуке (в главном потоке)
+        self.sounds = {}      # Имя -> загруженный звук
+        self.last_played = {}
+        self.loaded = False
+        self._lock = threading.Lock()
+        self.music_player = None
+        # Статистика
+        self.stolen = 0       # Звуков, перехвативших занятый голос
+        self.skipped = 0      # Звуков, пропущенных из-за паузы между повторами
+
+    def load(self):
+        """Загружает короткие звуки (повторные вызовы ничего не делают;
+        можно вызывать из фонового потока - второй вызов дождется первого)"""
+        with self._lock:
+            if self.loaded:
+                return
+            for name, paths in SOUND_PATHS.items():
+                for path in paths:
+                    try:
+                        self.sounds[name] = arcade.load_sound(path)
+                        break
+                    except Exception:
+                        continue
+            self.loaded = True
+
+    def _create_voices(self):
+        try:
+            self.voices = [Voice() for _ in range(self.voice_count)]
+        except Exception:
+            # Нет звукового устройства - играем без звука
+            self.voices = []
+
+    def play(self, name, volume=1.0):
+        """Проигрывает короткий звук; возвращает True, если он зазвучал"""
+        sound = self.sounds.get(name)
+        if sound is None:
+            return False
+        if self.voices is None:
+            self._create_voices()
+        if not self.voices:
+            return False
+        now = time.perf_counter()
+        if now - self.last_played.get(name, -1e9) < SOUND_COOLDOWNS.get(name, 0.0):
+            self.skipped += 1
+            return False
+        voice = self._free_voice()
+        if voice is None:
+            # Все голоса заняты - перехватываем самый давний
+            voice = min(self.voices, key=lambda item: item.started)
+            self.stolen += 1
+        try:
+            voice.play(sound.source, volume, now)
+        except Exception:
+            return False
+        self.last_played[name] = now
+        return True
+
+    def _free_voice(self):
+        for voice in self.voices:
+            if not voice.busy:
+                return voice
+        return None
+
+    def busy_voices(self):
+        """Количество голосов, которые сейчас звучат"""
+        return sum(1 for voice in self.voices or () if voice.busy)
+
+    def play_music(self, volume=0.3):
+        """Запускает фоновую музыку по кругу (файл читается потоком)"""
+        self.stop_music()
+        for path in MUSIC_PATHS:
+            try:
+                music = arcade.load_sound(path, streaming=True)
+                self.music_player = music.play(volume=volume, loop=True)
+                return
+            except Exception:
+                continue
+
+    def stop_music(self):
+        """Останавливает фоновую музыку"""
+        if self.music_player is not None:
+            arcade.stop_sound(self.music_player)
+            self.music_player = None
+
+
+audio = AudioManager()
@@ -0,0 +1,375 @@
+"""Автопилот змейки (для демонстраций, долгих прогонов и как точка отсчета)
+
+Каждый тик автопилот выбирает направление змейки:
+1. A* от головы к яблоку. Препятствия учитываются во времени: сегмент змейки
+   освобождает клетку через столько ходов, сколько сегментов за ним,
+   а падающая фигура сдвигается вниз по скорости падения.
+2. Проверка безопасности: после прохода пути змейка (уже выросшая) должна
+   иметь путь от головы до своего хвоста - иначе путь к яблоку не берется.
+3. Если безопасного пути к яблоку нет, выбирается ход, после которого
+   достижим хвост и больше всего свободного места.
+
+У поиска жесткий бюджет времени на тик. Найденный путь используется
+на следующих тиках, пока он остается свободным. Если A* не успел, змейка
+делает шаг по его дереву к самой перспективной клетке (если после шага
+хватает места), а поиск продолжается на следующем тике с накопленным
+состоянием.
+
+Модуль не зависит от arcade.
+"""
+import heapq
+import time
+
+# Бюджет поиска на один тик (в секундах) для всех змеек автопилота вместе
+AUTOPILOT_BUDGET = 0.002
+# Доля бюджета на поиск пути; остаток - на проверку хода, если поиск не успел
+SEARCH_SHARE = 0.75
+# Как часто поиск проверяет время (в раскрытых клетках)
+TIME_CHECK_INTERVAL = 64
+# Сколько клеток считать при оценке свободного места вокруг хода: места
+# больше двух длин змейки достаточно, дальше считать незачем
+AREA_LIMIT = 400
+
+# Направления в порядке Snake.direction: вверх, вправо, вниз, влево
+DIRECTIONS = ((0, 1), (1, 0), (0, -1), (-1, 0))
+
+
+class BudgetExceeded(Exception):
+    """Бюджет тика исчерпан"""
+
+
+class Deadline:
+    """Проверка бюджета времени без вызова часов на каждой клетке"""
+
+    def __init__(self, seconds):
+        self.end = time.perf_counter() + seconds
+        self.counter = 0
+        self.nodes = 0
+
+    def tick(self):
+        """Учитывает раскрытую клетку; бросает BudgetExceeded, если время вышло"""
+        self.nodes += 1
+        self.counter += 1
+        if self.counter >= TIME_CHECK_INTERVAL:
+            self.counter = 0
+            if time.perf_counter() >= self.end:
+                raise BudgetExceeded()
+
+
+class WorldModel:
+    """Снимок поля для поиска: проверка клетки на момент через t ходов"""
+
+    def __init__(self, view):
+        self.grid = view.grid
+        self.area = view.get_search_area()
+        self.occupancy = view.occupancy
+        self.lengths = {other.snake_id: len(other.body) for other in view.snakes}
+        # Фигура падает на клетку за fall_speed секунд, змейка ходит раз в snake_speed
+        self.piece_cells = ()
+        self.piece_rate = 0.0
+        piece = view.current_piece
+        if piece is not None:
+            self.piece_cells = frozenset(piece.get_positions())
+            self.piece_rate = view.snake_speed / max(1e-6, view.fall_speed)
+
+    def is_free(self, cell, t):
+        """Свободна ли клетка, когда голова дойдет до нее через t ходов"""
+        x, y = cell
+        x0, x1, y0, y1 = self.area
+        if x < x0 or x > x1 or y < y0 or y > y1:
+            return False
+        if self.grid[y][x] is not None:
+            return False
+        if self.piece_cells:
+            # Фигура к этому моменту опустится на fallen клеток (или на одну больше)
+            fallen = int(t * self.piece_rate)
+            if (x, y + fallen) in self.piece_cells or (x, y + fallen + 1) in self.piece_cells:
+                return False
+        occupant = self.occupancy.get(cell)
+        if occupant is not None:
+            snake_id, index = occupant
+            length = self.lengths.get(snake_id, 0)
+            # Сегмент index освобождает клетку через length - index ходов
+            if t < length - index:
+                return False
+        return True
+
+
+class AStarSearch:
+    """Прерываемый A* от клетки start к клетке goal
+
+    Стоимость клетки - номер хода (от момента начала поиска), на котором
+    голова в нее придет. Если бюджет тика кончился, змейка делает шаг
+    по дереву поиска (anchor - новая клетка головы), а поиск продолжается
+    на следующем тике только в поддереве этой клетки: elapsed ходов уже
+    сделано, поэтому поле проверяется на момент cost - elapsed.
+    """
+
+    def __init__(self, start, goal, key):
+        self.start = start
+        self.goal = goal
+        self.key = key
+        self.anchor = start
+        self.elapsed = 0
+        self.came_from = {start: None}
+        self.cost = {start: 0}
+        self.open = [(self._heuristic(start), 0, start)]
+        self.subtree = None  # Кэш принадлежности поддереву anchor
+        self.done = False
+
+    def _heuristic(self, cell):
+        return abs(cell[0] - self.goal[0]) + abs(cell[1] - self.goal[1])
+
+    def run(self, world, deadline):
+        """Раскрывает клетки, пока не найдена цель, не кончились клетки или время"""
+        while self.open:
+            deadline.tick()
+            _, cost, cell = heapq.heappop(self.open)
+            if cost > self.cost.get(cell, cost) or not self._in_subtree(cell):
+                continue
+            if cell == self.goal:
+                self.done = True
+                return
+            next_cost = cost + 1
+            for dx, dy in DIRECTIONS:
+                neighbor = (cell[0] + dx, cell[1] + dy)
+                known = self.cost.get(neighbor)
+                if known is not None and next_cost >= known and self._in_subtree(neighbor):
+                    continue
+                if not world.is_free(neighbor, next_cost - self.elapsed):
+                    continue
+                self.cost[neighbor] = next_cost
+                self.came_from[neighbor] = cell
+                if self.subtree is not None:
+                    self.subtree[neighbor] = True
+                heapq.heappush(self.open, (next_cost + self._heuristic(neighbor),
+                                           next_cost, neighbor))
+        self.done = True  # Пути нет
+
+    def _in_subtree(self, cell):
+        """Лежит ли клетка в поддереве anchor (до первого шага - все дерево)"""
+        if self.subtree is None:
+            return True
+        chain = []
+        known = None
+        while cell is not None:
+            known = self.subtree.get(cell)
+            if known is not None:
+                break
+            chain.append(cell)
+            cell = self.came_from.get(cell)
+        known = bool(known)
+        for visited in chain:
+            self.subtree[visited] = known
+        return known
+
+    def path(self):
+        """Путь от клетки после anchor до goal или None"""
+        if self.goal not in self.came_from or not self._in_subtree(self.goal):
+            return None
+        path = []
+        cell = self.goal
+        while cell != self.anchor:
+            path.append(cell)
+            cell = self.came_from[cell]
+        path.reverse()
+        return path
+
+    def advance(self, world):
+        """Шаг головы к самой перспективной клетке фронта; None, если шага нет"""
+        while self.open and not self._in_subtree(self.open[0][2]):
+            heapq.heappop(self.open)
+        if not self.open:
+            return None
+        cell = self.open[0][2]
+        while cell is not None and self.came_from[cell] != self.anchor:
+            cell = self.came_from[cell]
+        if cell is None or not world.is_free(cell, 1):
+            return None
+        self.anchor = cell
+        self.elapsed += 1
+        self.subtree = {cell: True}
+        return cell
+
+
+class Autopilot:
+    """Автопилот одной змейки"""
+
+    def __init__(self, snake_id):
+        self.snake_id = snake_id
+        self.plan = []       # Оставшиеся клетки пути к яблоку
+        self.plan_key = None
+        self.search = None   # Незаконченный A* (продолжается на следующем тике)
+        # Статистика для оверлея профилировщика
+        self.nodes = 0
+        self.overruns = 0    # Тиков, на которых не хватило бюджета
+        self.fallbacks = 0   # Тиков без безопасного пути к яблоку
+
+    def choose(self, view, snake, budget=AUTOPILOT_BUDGET):
+        """Возвращает направление (0-3) для следующего хода змейки"""
+        deadline = Deadline(budget * SEARCH_SHARE)
+        world = WorldModel(view)
+        head = snake.get_head()
+        apple = view.apple.get_position() if view.apple else None
+        # Путь устаревает, когда фигура зафиксирована или поле очищено
+        key = (apple, view.pieces_count, view.total_lines_cleared,
+               view.total_columns_cleared, len(snake.body))
+        try:
+            direction = self._choose(world, snake, head, apple, key, deadline)
+        except BudgetExceeded:
+            self.overruns += 1
+            direction = None
+            reserve = Deadline(budget * (1 - SEARCH_SHARE))
+            try:
+                direction = self._postpone(world, snake, head, reserve)
+            except BudgetExceeded:
+                pass
+            self.nodes += reserve.nodes
+        self.nodes += deadline.nodes
+        if direction is None:
+            direction = self._any_free_move(world, snake, head)
+        return direction
+
+    def _choose(self, world, snake, head, apple, key, deadline):
+        """Выбор хода; может прерваться по бюджету"""
+        # 1. Продолжаем найденный ранее путь, если он все еще свободен
+        if self.plan and self.plan_key == key and self._plan_valid(world, head):
+            return self._direction_to(head, self.plan.pop(0))
+        self.plan = []
+
+        # 2. Ищем (или продолжаем искать) путь к яблоку
+        if apple is not None:
+            search = self.search
+            if search is None or search.key != key or search.anchor != head:
+                search = AStarSearch(head, apple, key)
+            self.search = search
+            search.run(world, deadline)
+            self.search = None
+            path = search.path()
+            if path and self._tail_reachable_after(world, snake, path, deadline):
+                self.plan = path
+                self.plan_key = key
+                return self._direction_to(head, self.plan.pop(0))
+
+        # 3. Безопасного пути к яблоку нет: ход с достижимым хвостом и местом
+        self.fallbacks += 1
+        return self._safest_move(world, snake, head, deadline)
+
+    def _postpone(self, world, snake, head, deadline):
+        """Бюджет поиска кончился: шаг по дереву незаконченного поиска,
+        если после него хватает места, иначе самый безопасный ход"""
+        search = self.search
+        cell = search.advance(world) if search else None
+        if cell is not None:
+            area, reaches_tail = self._flood(world, cell, snake, deadline)
+            if reaches_tail or area >= len(snake.body):
+                return self._direction_to(head, cell)
+        self.search = None
+        return self._safest_move(world, snake, head, deadline)
+
+    def _plan_valid(self, world, head):
+        """Путь начинается рядом с головой и его клетки свободны к нужному моменту"""
+        first = self.plan[0]
+        if abs(first[0] - head[0]) + abs(first[1] - head[1]) != 1:
+            return False
+        return all(world.is_free(cell, t) for t, cell in enumerate(self.plan, 1))
+
+    def _tail_reachable_after(self, world, snake, path, deadline):
+        """Будет ли у змейки путь к хвосту после прохода path и съедания яблока"""
+        length = len(snake.body) + 1
+        body = (list(reversed(path)) + snake.body)[:length]
+        # Индексы сегментов воображаемого тела: голова - 0
+        index = {cell: i for i, cell in enumerate(body)}
+        steps = len(path)
+        head = body[0]
+        tail = body[-1]
+        frontier = [head]
+        seen = {head}
+        t = 0
+        while frontier:
+            t += 1
+            next_frontier = []
+            for cell in frontier:
+                deadline.tick()
+                for dx, dy in DIRECTIONS:
+                    neighbor = (cell[0] + dx, cell[1] + dy)
+                    if neighbor == tail:
+                        return True
+                    if neighbor in seen:
+                        continue
+                    segment = index.get(neighbor)
+                    if segment is not None:
+                        if t < length - segment:
+                            continue
+                    elif not world.is_free(neighbor, steps + t):
+                        continue
+                    seen.add(neighbor)
+                    next_frontier.append(neighbor)
+            frontier = next_frontier
+        return False
+
+    def _safest_move(self, world, snake, head, deadline):
+        """Ход, после которого достижим хвост и больше всего свободных клеток"""
+        best = None
+        best_score = None
+        for direction in self._candidate_moves(snake):
+            dx, dy = DIRECTIONS[direction]
+            start = (head[0] + dx, head[1] + dy)
+            if not world.is_free(start, 1):
+                continue
+            area, reaches_tail = self._flood(world, start, snake, deadline)
+            score = (reaches_tail, area)
+            if best_score is None or score > best_score:
+                best, best_score = direction, score
+        return best
+
+    def _flood(self, world, start, snake, deadline):
+        """Сколько клеток достижимо из start (с ограничением) и достижим ли хвост"""
+        tail = snake.body[-1]
+        limit = min(AREA_LIMIT, 2 * len(snake.body) + 16)
+        frontier = [start]
+        seen = {start}
+        reaches_tail = False
+        t = 1
+        while frontier and len(seen) < limit:
+            t += 1
+            next_frontier = []
+            for cell in frontier:
+                deadline.tick()
+                for dx, dy in DIRECTIONS:
+                    neighbor = (cell[0] + dx, cell[1] + dy)
+                    if neighbor == tail:
+                        reaches_tail = True
+                    if neighbor in seen or not world.is_free(neighbor, t):
+                        continue
+                    seen.add(neighbor)
+                    next_frontier.append(neighbor)
+            frontier = next_frontier
+        return len(seen), reaches_tail
+
+    def _any_free_move(self, world, snake, head):
+        """Любой ход в свободную клетку (когда на поиск не осталось времени)"""
+        moves = self._candidate_moves(snake)
+        for direction in moves:
+            dx, dy = DIRECTIONS[direction]
+            if world.is_free((head[0] + dx, head[1] + dy), 1):
+                return direction
+        return moves[0]
+
+    @staticmethod
+    def _candidate_moves(snake):
+        """Возможные направления (без разворота), текущее - первым"""
+        current = snake.next_direction
+        return [current, (current + 1) % 4, (current + 3) % 4]
+
+    @staticmethod
+    def _direction_to(head, cell):
+        """Направление от головы к соседней клетке"""
+        return DIRECTIONS.index((cell[0] - head[0], cell[1] - head[1]))
+
+
+def create_autopilots(settings, snakes):
+    """Автопилоты змеек (snake_id -> Autopilot) или None, если выключены"""
+    if not settings.get('autopilot', False):
+        return None
+    return {snake.snake_id: Autopilot(snake.snake_id) for snake in snakes}
@@ -0,0 +1,457 @@
+"""Микробенчмарки горячих функций игры (без открытия окна)
+
+Запуск:
+    python benchmark.py                  # замер и сравнение с базовой линией
+    python benchmark.py --save-baseline  # сохранить результаты как базовую линию
+    python benchmark.py --filter apple   # только бенчмарки с "apple" в имени
+    python benchmark.py --allocations    # проверка выделений памяти за кадр
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+import arcade
+
+from constants import GRID_WIDTH, GRID_HEIGHT, COLORS
+from game import GameView
+from apple import Apple
+from autopilot import Autopilot
+from placement import PlacementPlanner
+from snake import Snake
+from tetromino import Tetromino
+from particles import ParticleSystem, ParticleBudget
+from animations import AnimationScheduler, ScoreMessages
+from jobs import JobScheduler, COSMETIC, JOB_BUDGET
+from profiler import FrameProfiler
+from occupancy import OccupancyIndex
+from menu import DEFAULT_SETTINGS
+
+BASELINE_FILE = "benchmark_baseline.json"
+# Замедление относительно базовой линии, после которого бенчмарк считается регрессией
+DEFAULT_THRESHOLD = 0.20
+DEFAULT_REPEAT = 200
+SEED = 12345
+# Настройки игр бенчмарков: по умолчанию, но без фонового поиска появления
+# фигур (поток на каждую созданную игру; замеряется синхронный поиск)
+BENCHMARK_SETTINGS = dict(DEFAULT_SETTINGS, spawn_speculation=False)
+# Проверка выделений памяти: сценарий из COMBO_ROUNDS комбо по 4 линии,
+# после каждого - COMBO_FRAMES кадров; пик памяти, выделенной за кадр,
+# не должен превышать ALLOCATION_TARGET килобайт
+COMBO_ROUNDS = 5
+COMBO_FRAMES = 60
+ALLOCATION_TARGET = 32
+
+
+# ---------------------------------------------------------------------------
+# Заготовки полей и змеек
+# ---------------------------------------------------------------------------
+
+def make_board(kind, rng, width=GRID_WIDTH, height=GRID_HEIGHT):
+    """Создает поле одного из видов: empty, half_full, nearly_full, checkerboard"""
+    grid = [[None for _ in range(width)] for _ in range(height)]
+    if kind == 'empty':
+        return grid
+    if kind == 'half_full':
+        # Нижняя половина заполнена, в каждом ряду по 1-3 дырки
+        for y in range(height // 2):
+            holes = set(rng.sample(range(width), rng.randint(1, 3)))
+            for x in range(width):
+                if x not in holes:
+                    grid[y][x] = rng.choice(COLORS)
+    elif kind == 'nearly_full':
+        # Заполнено все, кроме верхних 6 рядов, в каждом ряду одна дырка
+        for y in range(height - 6):
+            hole = rng.randrange(width)
+            for x in range(width):
+                if x != hole:
+                    grid[y][x] = rng.choice(COLORS)
+    elif kind == 'checkerboard':
+        # Шахматные дырки в нижних двух третях поля
+        for y in range(height * 2 // 3):
+            for x in range(width):
+                if (x + y) % 2 == 0:
+                    grid[y][x] = rng.choice(COLORS)
+    else:
+        raise ValueError(f"Неизвестный вид поля: {kind}")
+    return grid
+
+
+def make_snake_body(grid, length):
+    """Строит змейку-"зигзаг" заданной длины по свободным клеткам сверху поля"""
+    body = []
+    y = GRID_HEIGHT - 3  # Ниже стартовой позиции падающей фигуры
+    row = 0
+    while len(body) < length and y >= 0:
+        xs = range(GRID_WIDTH) if row % 2 == 0 else range(GRID_WIDTH - 1, -1, -1)
+        for x in xs:
+            if grid[y][x] is None:
+                body.append((x, y))
+                if len(body) >= length:
+                    break
+        y -= 1
+        row += 1
+    body.reverse()  # Голова - последняя построенная клетка
+    return body
+
+
+def set_snake_body(game, body):
+    """Ставит главной змейке тело и перестраивает индекс занятости"""
+    game.snake.body = body
+    game.snake.prev_body = list(body)
+    game.snakes = [game.snake]
+    game.occupancy = OccupancyIndex()
+    game.occupancy.add_snake(game.snake.snake_id, body)
+
+
+# Планировщик размещения, общий для игр бенчмарков (создается первой игрой)
+_planner = None
+
+
+def make_game(board='empty', snake_length=3, seed=SEED):
+    """Создает GameView с заданным полем без окна, звуков и камер
+
+    Игровое состояние строит тот же reset_state, что и в игре (с настройками
+    по умолчанию), затем поле и змейка заменяются заготовками бенчмарка.
+    """
+    global _planner
+    rng = random.Random(seed)
+    random.seed(seed)
+    game = GameView.__new__(GameView)
+    # Ресурсы экрана, которые в игре создает __init__
+    game.profiler = FrameProfiler()
+    game.settings = dict(BENCHMARK_SETTINGS)
+    game.animations = AnimationScheduler()
+    game.jobs = JobScheduler()
+    game.apple_sprite_list = arcade.SpriteList()
+    game.block_sprites = arcade.SpriteList()
+    game.fading_sprites = arcade.SpriteList()
+    game.score_messages = ScoreMessages()
+    game.particle_system = ParticleSystem()
+    game.board_renderer = None
+    game.space = None
+    game.telemetry = None
+    game.spectators = None
+    # Как у GameView между перезапусками, планировщик переживает игру
+    game.planner = _planner
+    game.reset_state('medium', seed=seed)
+    _planner = game.planner
+
+    # Поле и змейка сценария; яблока нет, падает T
+    game.grid = make_board(board, rng)
+    game.row_stats.rebuild(game.grid)
+    body = make_snake_body(game.grid, snake_length)
+    game.snake = Snake(*body[0])
+    set_snake_body(game, body)
+    game.apple = None
+    game.apple_sprite_list.clear()
+    game.current_piece = Tetromino('T', COLORS[0], GRID_WIDTH // 2, GRID_HEIGHT - 1)
+    game.piece_spawn_y = GRID_HEIGHT - 1
+    return game
+
+
+def far_free_cell(game):
+    """Самая дальняя от головы свободная клетка нижней половины поля"""
+    head = game.snake.get_head()
+    return max(
+        ((x, y) for y in range(GRID_HEIGHT // 2)
+         for x in range(GRID_WIDTH) if game.grid[y][x] is None),
+        key=lambda cell: abs(cell[0] - head[0]) + abs(cell[1] - head[1]),
+        default=(0, 0))
+
+
+def add_snakes(game, count, length):
+    """Ставит на поле count змеек длины length (по одной в ряду, головой к центру)"""
+    game.snakes = []
+    game.occupancy = OccupancyIndex()
+    for snake_id in range(count):
+        y = 2 + snake_id * 4
+        body = [(length - 1 - i, y) for i in range(length)]
+        snake = Snake(*body[0], snake_id=snake_id)
+        snake.body = body
+        snake.prev_body = list(body)
+        game.snakes.append(snake)
+        game.occupancy.add_snake(snake_id, body)
+    game.snake = game.snakes[0]
+
+
+def fill_rows(game, rows):
+    """Полностью заполняет указанные ряды (для бенчмарка очистки линий)"""
+    for y in rows:
+        for x in range(GRID_WIDTH):
+            game.grid[y][x] = COLORS[x % len(COLORS)]
+    game.row_stats.rebuild(game.grid)
+
+
+def fill_columns(game, columns, height):
+    """Заполняет столбцы снизу на заданную высоту (для очистки столбцов)"""
+    for x in columns:
+        for y in range(height):
+            game.grid[y][x] = COLORS[y % len(COLORS)]
+    game.row_stats.rebuild(game.grid)
+
+
+def add_particles(system, count):
+    """Добавляет count частиц"""
+    while system.active_count() < count:
+        system.add_explosion(200, 300, (255, 200, 0), count=20)
+
+
+def emit_line_clear_combo(system, lines=4):
+    """Частицы, которые выпускает одновременная очистка lines линий"""
+    for y in range(lines):
+        for x in range(GRID_WIDTH):
+            system.add_line_clear_particles(x * 30, y * 30, (255, 200, 0), count=3)
+        system.add_line_clear_particles(200, y * 30, (255, 200, 0), count=20,
+                                        important=True)
+
+
+# ---------------------------------------------------------------------------
+# Выделения памяти за кадр
+# ---------------------------------------------------------------------------
+
+# Змейка ходит по квадрату 4x4 (вправо, вниз, влево, вверх)
+SQUARE_TURNS = (1, 2, 3, 0)
+
+
+def combo_frame(game, frame, delta_time=1 / 60):
+    """Один кадр сценария: анимации, частицы, отложенные работы и ход змейки"""
+    game.animations.update(delta_time)
+    game.score_messages.update(delta_time)
+    game.particle_system.update(delta_time)
+    game.jobs.run(JOB_BUDGET)
+    game.snake.change_direction(SQUARE_TURNS[frame // 4 % 4])
+    game.snake.save_previous_state()
+    game.snake.move()
+
+
+def measure_combo_allocations(rounds=COMBO_ROUNDS, frames=COMBO_FRAMES):
+    """Прогоняет сценарий комбо под tracemalloc и возвращает список
+    пиков памяти, выделенной за каждый кадр (в байтах)"""
+    game = make_game('half_full')
+    set_snake_body(game, [(5, GRID_HEIGHT - 5), (4, GRID_HEIGHT - 5),
+                          (3, GRID_HEIGHT - 5)])
+    # Первый проход без замера: кэши и ленивые структуры уже созданы
+    fill_rows(game, range(0, 4))
+    game.clear_lines()
+    for frame in range(frames):
+        combo_frame(game, frame)
+
+    peaks = []
+    tracemalloc.start()
+    try:
+        for _ in range(rounds):
+            fill_rows(game, range(0, 4))
+            for frame in range(frames):
+                tracemalloc.reset_peak()
+                start, _ = tracemalloc.get_traced_memory()
+                if frame == 0:
+                    game.clear_lines()
+                combo_frame(game, frame)
+                _, peak = tracemalloc.get_traced_memory()
+                peaks.append(peak - start)
+    finally:
+        tracemalloc.stop()
+    return peaks
+
+
+def check_allocations(target=ALLOCATION_TARGET):
+    """Печатает выделения за кадр в сценарии комбо; возвращает True,
+    если самый тяжелый кадр укладывается в target килобайт"""
+    peaks = measure_combo_allocations()
+    worst = max(peaks) / 1024
+    typical = sorted(peaks)[len(peaks) // 2] / 1024
+    print(f"Выделения за кадр (комбо x{COMBO_ROUNDS}, {len(peaks)} кадров): "
+          f"медиана {typical:.1f} КБ, максимум {worst:.1f} КБ, цель {target} КБ")
+    return worst <= target
+
+
+# ---------------------------------------------------------------------------
+# Бенчмарки
+# ---------------------------------------------------------------------------
+
+BOARDS = ('empty', 'half_full', 'nearly_full', 'checkerboard')
+
+
+def benchmark_cases():
+    """Возвращает список (имя, setup, функция); setup готовит состояние
+    для одного запуска и не входит в замер"""
+    cases = []
+
+    for board in BOARDS:
+        for length in (3, 40):
+            def setup(board=board, length=length):
+                game = make_game(board, length)
+                return game, far_free_cell(game)
+            cases.append((
+                f"is_apple_accessible[{board},len={length}]", setup,
+                lambda state: state[0].is_apple_accessible(*state[1])))
+
+        # Полное решение автопилота (поиск с нуля, без ограничения бюджетом)
+        def setup_autopilot(board=board):
+            game = make_game(board, 40)
+            game.apple = Apple(*far_free_cell(game))
+            return game, Autopilot(game.snake.snake_id)
+        cases.append((
+            f"Autopilot.choose[{board},len=40]", setup_autopilot,
+            lambda state: state[1].choose(state[0], state[0].snake, budget=1.0)))
+
+        cases.append((
+            f"spawn_apple[{board}]",
+            lambda board=board: make_game(board, 20),
+            lambda game: game.spawn_apple()))
+        cases.append((
+            f"find_best_target_row[{board}]",
+            lambda board=board: make_game(board),
+            lambda game: game.find_best_target_row()))
+        cases.append((
+            f"analyze_grid_for_spawn[{board}]",
+            lambda board=board: make_game(board),
+            lambda game: game.analyze_grid_for_spawn()))
+        # Полный поиск на 2 хода (без бюджета) с пустой таблицей транспозиций
+        cases.append((
+            f"PlacementPlanner.plan[{board}]",
+            lambda board=board: (make_game(board), PlacementPlanner(budget=None)),
+            lambda state: state[1].plan(state[0], 'T', 'L', GRID_HEIGHT - 1)))
+        cases.append((
+            f"check_snake_collision[{board},len=60]",
+            lambda board=board: make_game(board, 60),
+            lambda game: game.check_snake_collision()))
+
+    def setup_lines():
+        game = make_game('half_full')
+        fill_rows(game, range(0, 4))
+        return game
+    cases.append(("clear_lines[4 rows]", setup_lines,
+                  lambda game: game.clear_lines()))
+
+    def setup_columns():
+        game = make_game('empty')
+        fill_columns(game, range(0, GRID_WIDTH, 3), 12)
+        return game
+    cases.append(("clear_columns[5 cols]", setup_columns,
+                  lambda game: game.clear_columns()))
+
+    # То же вместе с отложенными работами (спрайты столбцов и частицы),
+    # которые в игре распределяются по кадрам
+    def clear_columns_and_jobs(game):
+        game.clear_columns()
+        game.jobs.finish(COSMETIC)
+    cases.append(("clear_columns[5 cols,all jobs]", setup_columns,
+                  clear_columns_and_jobs))
+
+    for count in (1, 4):
+        def setup_snakes(count=count):
+            game = make_game('empty')
+            add_snakes(game, count, 10)
+            return game
+        cases.append((f"update_snake_tick[snakes={count}]", setup_snakes,
+                      lambda game: game.update_snake_tick()))
+
+    for length in (3, 200):
+        def setup_move(length=length):
+            snake = Snake(0, 0)
+            snake.body = [(x, 0) for x in range(length, 0, -1)]
+            return snake
+        cases.append((f"Snake.move[len={length}]", setup_move,
+                      lambda snake: snake.move()))
+
+    for count in (100, 2000):
+        def setup_particles(count=count):
+            system = ParticleSystem()
+            add_particles(system, count)
+            return system
+        cases.append((f"ParticleSystem.update[{count}]", setup_particles,
+                      lambda system: system.update(1 / 60)))
+
+    # Частицы очистки четырех линий (как в clear_lines): без бюджета
+    # и с бюджетом, который видит кадры по 50 мс
+    for pressure in ('off', 'slow_frames'):
+        def setup_combo(pressure=pressure):
+            system = ParticleSystem()
+            if pressure != 'off':
+                system.budget = ParticleBudget()
+                for _ in range(30):
+                    system.budget.record_frame(0.05)
+            return system
+        cases.append((f"line_clear_particles[budget={pressure}]", setup_combo,
+                      emit_line_clear_combo))
+
+    return cases
+
+
+def run_case(setup, function, repeat):
+    """Запускает бенчмарк repeat раз и возвращает (медиана, минимум) в мкс"""
+    samples = []
+    for _ in range(repeat):
+        state = setup()
+        start = time.perf_counter_ns()
+        function(state)
+        samples.append(time.perf_counter_ns() - start)
+    samples.sort()
+    return samples[len(samples) // 2] / 1000, samples[0] / 1000
+
+
+def load_baseline(path):
+    """Загружает базовую линию (или пустой словарь)"""
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f).get('results', {})
+
+
+def main(argv=None):
+    """Точка входа бенчмарков"""
+    parser = argparse.ArgumentParser(description="Микробенчмарки игры")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT)
+    parser.add_argument('--filter', default='')
+    parser.add_argument('--baseline', default=BASELINE_FILE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--allocations', action='store_true',
+                        help="только проверка выделений памяти за кадр (tracemalloc)")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="допустимое замедление (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    if args.allocations:
+        return 0 if check_allocations() else 1
+
+    baseline = load_baseline(args.baseline)
+    results = {}
+    regressions = []
+
+    print(f"{'бенчмарк':<48} {'медиана':>10} {'минимум':>10} {'база':>10}")
+    for name, setup, function in benchmark_cases():
+        if args.filter not in name:
+            continue
+        median, best = run_case(setup, function, args.repeat)
+        results[name] = {'median_us': median, 'min_us': best}
+
+        base = baseline.get(name, {}).get('median_us')
+        mark = ''
+        if base:
+            change = (median - base) / base
+            mark = f"{change:+.0%}"
+            if change > args.threshold:
+                regressions.append(name)
+                mark += '  РЕГРЕССИЯ'
+        base_text = f"{base:10.1f}" if base else f"{'-':>10}"
+        print(f"{name:<48} {median:10.1f} {best:10.1f} {base_text}  {mark}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({'repeat': args.repeat, 'results': results}, f,
+                      ensure_ascii=False, indent=2)
+        print(f"Базовая линия сохранена в {args.baseline}")
+
+    if regressions:
+        print(f"Регрессии (> {args.threshold:.0%}): {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
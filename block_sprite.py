@@ -2,6 +2,20 @@
 import arcade
 from constants import MARGIN, CELL_SIZE
 
+# Цвет -> текстура блока (одна на цвет за весь запуск)
+_textures = {}
+
+
+def block_texture(color):
+    """Текстура блока цвета color"""
+    texture = _textures.get(color)
+    if texture is None:
+        texture = arcade.make_soft_square_texture(
+            CELL_SIZE - 2, color, outer_alpha=255
+        )
+        _textures[color] = texture
+    return texture
+
 
 class BlockSprite(arcade.Sprite):
     """Спрайт для блока тетриса"""
@@ -16,10 +30,8 @@ class BlockSprite(arcade.Sprite):
         self.width = CELL_SIZE - 2
         self.height = CELL_SIZE - 2
 
-        # Создаем текстуру с цветом
-        self.texture = arcade.make_soft_square_texture(
-            CELL_SIZE - 2, color, outer_alpha=255
-        )
+        # Текстура с цветом (общая для всех блоков этого цвета)
+        self.texture = block_texture(color)
 
         # Устанавливаем позицию в пикселях
         self.center_x = MARGIN + x * CELL_SIZE + CELL_SIZE // 2
@@ -36,10 +48,11 @@ class BlockSprite(arcade.Sprite):
         self.scale = 0.0  # Начальный масштаб спрайта
 
     def update_animation(self, delta_time):
-        """Обновление анимации появления"""
+        """Обновление анимации появления; возвращает True, пока анимация идет"""
         if self.animation_scale < self.target_scale:
             self.animation_scale += self.animation_speed * delta_time
             if self.animation_scale > self.target_scale:
                 self.animation_scale = self.target_scale
             # Применяем масштаб к спрайту
             self.scale = self.animation_scale
+        return self.animation_scale < self.target_scale
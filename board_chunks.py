@@ -0,0 +1,131 @@
+"""Пакетная отрисовка поля по чанкам"""
+import math
+from arcade.shape_list import ShapeElementList, create_line, create_rectangle_filled
+from constants import MARGIN, CELL_SIZE, CHUNK_SIZE
+
+FIELD_COLOR = (30, 35, 50)
+GRID_LINE_COLOR = (60, 70, 90)
+
+
+def get_rgb(color):
+    """Преобразует цвет arcade в RGB кортеж"""
+    if isinstance(color, tuple):
+        return color[:3] if len(color) >= 3 else (255, 255, 255)
+    try:
+        return (color[0], color[1], color[2]) if hasattr(color, '__getitem__') else (255, 255, 255)
+    except:
+        return (255, 255, 255)
+
+
+class ChunkedBoardRenderer:
+    """Рисует поле квадратными чанками по CHUNK_SIZE клеток
+
+    Геометрия чанка (фон, линии сетки, блоки) собирается в ShapeElementList
+    и пересобирается только после изменения клеток чанка. Рисуются только
+    чанки, попадающие в область видимости камеры, поэтому время кадра зависит
+    от видимой части поля, а не от его площади.
+    """
+
+    def __init__(self, grid_width, grid_height, chunk_size=CHUNK_SIZE):
+        self.grid_width = grid_width
+        self.grid_height = grid_height
+        self.chunk_size = chunk_size
+        self.chunks_x = math.ceil(grid_width / chunk_size)
+        self.chunks_y = math.ceil(grid_height / chunk_size)
+        self.shapes = {}  # (cx, cy) -> ShapeElementList
+        self.dirty = set()
+        self.mark_all_dirty()
+
+    def mark_all_dirty(self):
+        """Помечает все чанки для пересборки"""
+        self.dirty = {(cx, cy) for cx in range(self.chunks_x)
+                      for cy in range(self.chunks_y)}
+
+    def mark_cell_dirty(self, x, y):
+        """Помечает чанк, содержащий клетку"""
+        self.dirty.add((x // self.chunk_size, y // self.chunk_size))
+
+    def mark_rows_dirty(self, from_y):
+        """Помечает чанки всех рядов начиная с from_y (после удаления линии)"""
+        for cy in range(from_y // self.chunk_size, self.chunks_y):
+            for cx in range(self.chunks_x):
+                self.dirty.add((cx, cy))
+
+    def mark_column_dirty(self, x):
+        """Помечает чанки столбца (после удаления столбца)"""
+        cx = x // self.chunk_size
+        for cy in range(self.chunks_y):
+            self.dirty.add((cx, cy))
+
+    def visible_chunks(self, view_rect):
+        """Возвращает диапазоны чанков, пересекающих область (в пикселях)"""
+        left, right, bottom, top = view_rect
+        chunk_pixels = self.chunk_size * CELL_SIZE
+        cx0 = max(0, int((left - MARGIN) // chunk_pixels))
+        cx1 = min(self.chunks_x - 1, int((right - MARGIN) // chunk_pixels))
+        cy0 = max(0, int((bottom - MARGIN) // chunk_pixels))
+        cy1 = min(self.chunks_y - 1, int((top - MARGIN) // chunk_pixels))
+        return range(cx0, cx1 + 1), range(cy0, cy1 + 1)
+
+    def draw(self, grid, view_rect):
+        """Рисует видимые чанки, пересобирая изменившиеся"""
+        columns, rows = self.visible_chunks(view_rect)
+        for cy in rows:
+            for cx in columns:
+                key = (cx, cy)
+                if key in self.dirty or key not in self.shapes:
+                    self.shapes[key] = self._build_chunk(grid, cx, cy)
+                    self.dirty.discard(key)
+                self.shapes[key].draw()
+
+    def _build_chunk(self, grid, cx, cy):
+        """Собирает геометрию одного чанка"""
+        shapes = ShapeElementList()
+        x0 = cx * self.chunk_size
+        y0 = cy * self.chunk_size
+        x1 = min(self.grid_width, x0 + self.chunk_size)
+        y1 = min(self.grid_height, y0 + self.chunk_size)
+
+        # Фон чанка
+        left = MARGIN + x0 * CELL_SIZE
+        right = MARGIN + x1 * CELL_SIZE
+        bottom = MARGIN + y0 * CELL_SIZE
+        top = MARGIN + y1 * CELL_SIZE
+        shapes.append(create_rectangle_filled(
+            (left + right) / 2, (bottom + top) / 2,
+            right - left, top - bottom, FIELD_COLOR))
+
+        # Линии сетки
+        for x in range(x0, x1 + 1):
+            line_x = MARGIN + x * CELL_SIZE
+            shapes.append(create_line(line_x, bottom, line_x, top, GRID_LINE_COLOR, 1))
+        for y in range(y0, y1 + 1):
+            line_y = MARGIN + y * CELL_SIZE
+            shapes.append(create_line(left, line_y, right, line_y, GRID_LINE_COLOR, 1))
+
+        # Блоки (так же, как в GameView.draw_blocks)
+        for y in range(y0, y1):
+            row = grid[y]
+            for x in range(x0, x1):
+                color = row[x]
+                if color is None:
+                    continue
+                block_left = MARGIN + x * CELL_SIZE + 1
+                block_right = MARGIN + (x + 1) * CELL_SIZE - 1
+                block_bottom = MARGIN + y * CELL_SIZE + 1
+                block_top = MARGIN + (y + 1) * CELL_SIZE - 1
+                shapes.append(create_rectangle_filled(
+                    (block_left + block_right) / 2, (block_bottom + block_top) / 2,
+                    block_right - block_left, block_top - block_bottom, color))
+                rgb = get_rgb(color)
+                border_color = tuple(min(255, c + 50) for c in rgb)
+                shadow_color = tuple(max(0, c - 50) for c in rgb)
+                shapes.append(create_line(block_left, block_top, block_right,
+                                          block_top, border_color, 2))
+                shapes.append(create_line(block_left, block_bottom, block_left,
+                                          block_top, border_color, 2))
+                shapes.append(create_line(block_left, block_bottom, block_right,
+                                          block_bottom, shadow_color, 2))
+                shapes.append(create_line(block_right, block_bottom, block_right,
+                                          block_top, shadow_color, 2))
+        return shapes
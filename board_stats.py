@@ -0,0 +1,42 @@
+"""Статистика заполнения рядов поля"""
+
+
+class RowStats:
+    """Количество заполненных клеток и сумма их X для каждого ряда
+
+    Обновляется при каждом изменении поля, поэтому анализ рядов при появлении
+    фигуры и проверка заполненных линий не сканируют всё поле.
+    """
+
+    def __init__(self, grid_width, grid_height):
+        self.grid_width = grid_width
+        self.fill = [0] * grid_height   # Заполненных клеток в ряду
+        self.x_sum = [0] * grid_height  # Сумма X заполненных клеток ряда
+
+    def rebuild(self, grid):
+        """Пересчитывает статистику по всему полю"""
+        for y, row in enumerate(grid):
+            filled = [x for x, cell in enumerate(row) if cell is not None]
+            self.fill[y] = len(filled)
+            self.x_sum[y] = sum(filled)
+
+    def add(self, x, y):
+        """Учитывает новую заполненную клетку"""
+        self.fill[y] += 1
+        self.x_sum[y] += x
+
+    def remove(self, x, y):
+        """Учитывает освободившуюся клетку"""
+        self.fill[y] -= 1
+        self.x_sum[y] -= x
+
+    def delete_row(self, y):
+        """Удаляет ряд (ряды выше сдвигаются вниз, сверху появляется пустой)"""
+        del self.fill[y]
+        del self.x_sum[y]
+        self.fill.append(0)
+        self.x_sum.append(0)
+
+    def is_full(self, y):
+        """Проверяет, заполнен ли ряд целиком"""
+        return self.fill[y] >= self.grid_width
@@ -55,3 +55,36 @@ COLUMN_CLEAR_THRESHOLD = 10
 
 # Очки за каждую очищенную линию в тетрисе
 POINTS_PER_LINE = 100
+
+# Максимальное количество логических тиков, которые догоняются за один кадр
+# (если кадр был очень долгим, лишние тики отбрасываются)
+MAX_CATCH_UP_TICKS = 5
+
+# Сколько поворотов змейки может ждать своего тика (лишние нажатия отбрасываются)
+MAX_QUEUED_TURNS = 3
+
+# Сколько змеек может быть на одном поле (локальная игра вдвоем-вчетвером)
+MAX_SNAKES = 4
+# Цвета змеек: (голова, тело, хвост)
+SNAKE_COLORS = [
+    ((100, 255, 100), (50, 200, 50), (20, 150, 20)),     # Зеленая
+    ((100, 180, 255), (50, 130, 220), (20, 80, 170)),    # Синяя
+    ((255, 180, 80), (230, 130, 40), (180, 90, 20)),     # Оранжевая
+    ((230, 120, 255), (180, 70, 220), (130, 40, 170)),   # Фиолетовая
+]
+
+# Большая арена: максимальный размер поля в клетках
+MAX_ARENA_WIDTH = 200
+MAX_ARENA_HEIGHT = 400
+# На большой арене фигуры появляются на столько рядов выше головы змейки
+BIG_ARENA_SPAWN_OFFSET = 20
+# Радиус области вокруг головы змейки, где ищется место для яблока
+# и проверяется его доступность (чтобы поиск не зависел от размера поля)
+BIG_ARENA_SEARCH_RADIUS = 20
+# Размер чанка поля для пакетной отрисовки (в клетках)
+CHUNK_SIZE = 16
+
+# Сетевая игра (lockstep): длительность сетевого тика в секундах
+# и как часто (в тиках) стороны сверяют контрольные суммы состояния
+NET_TICK = 0.05
+HASH_INTERVAL = 20
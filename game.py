@@ -2,24 +2,34 @@
 import arcade
 import random
 import json
-import os
-import pymunk
-import copy
+import time
 from constants import (
     SCREEN_WIDTH, SCREEN_HEIGHT, GRID_WIDTH, GRID_HEIGHT,
     MARGIN, CELL_SIZE, COLORS, TETROMINOES, DIFFICULTY_SETTINGS,
     PIECE_SPAWN_DELAY, PIECE_SPAWN_DELAY_CYCLES, COLUMN_CLEAR_THRESHOLD,
-    POINTS_PER_LINE
+    POINTS_PER_LINE, MAX_ARENA_WIDTH, MAX_ARENA_HEIGHT,
+    BIG_ARENA_SPAWN_OFFSET, BIG_ARENA_SEARCH_RADIUS, MAX_SNAKES, SNAKE_COLORS,
+    NET_TICK
 )
-from snake import Snake
+from snake import Snake, grid_cell, reserve_cells
 from tetromino import Tetromino
 from apple import Apple
 from menu import load_settings
-from particles import ParticleSystem
+from particles import create_particle_system
 from block_sprite import BlockSprite
-
-HIGH_SCORE_FILE = "high_score.json"
-
+from leaderboard import scores
+from profiler import profiler, profiled, LatencyMeter
+from telemetry import create_sink
+from timestep import TickClock
+from animations import AnimationScheduler, FadeOut, ScoreMessages
+from board_stats import RowStats
+from board_chunks import ChunkedBoardRenderer
+from occupancy import OccupancyIndex
+from spectator import create_broadcaster
+from autopilot import create_autopilots, AUTOPILOT_BUDGET
+from placement import create_placement_planner, PLANNER_FALLBACKS
+from jobs import JobScheduler, CRITICAL, COSMETIC, JOB_BUDGET
+from audio import audio
 
 def get_rgb(color):
     """Преобразует цвет arcade в RGB кортеж"""
@@ -31,37 +41,161 @@ def get_rgb(color):
         return (255, 255, 255)
 
 
-def load_high_score():
-    """Загружает рекорд из файла"""
-    if os.path.exists(HIGH_SCORE_FILE):
-        try:
-            with open(HIGH_SCORE_FILE, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                return data.get('high_score', 0)
-        except:
-            return 0
-    return 0
+# Экран последней законченной локальной игры: следующая игра из меню
+# сбрасывает его (GameView.reset), а не создает экран заново
+_finished_view = None
 
 
-def save_high_score(score):
-    """Сохраняет рекорд в файл"""
-    try:
-        with open(HIGH_SCORE_FILE, 'w', encoding='utf-8') as f:
-            json.dump({'high_score': score}, f, ensure_ascii=False)
-    except:
-        pass
+def start_game(difficulty='medium'):
+    """Экран новой локальной игры; экран прошлой игры переиспользуется,
+    если с тех пор не менялись настройки"""
+    global _finished_view
+    view, _finished_view = _finished_view, None
+    if view is not None and view.settings == load_settings():
+        view.reset(difficulty)
+        return view
+    return GameView(difficulty=difficulty)
+
+
+# Сколько спрайтов просматривает один шаг переноса спрайтов столбцов
+SPRITE_JOB_STEP = 64
+
+# Однобуквенные коды цветов блоков для сериализации поля
+COLOR_CODES = {color: str(index) for index, color in enumerate(COLORS)}
+
+# Клавиши направлений для каждой змейки: вверх, вправо, вниз, влево
+SNAKE_KEYS = [
+    (arcade.key.W, arcade.key.D, arcade.key.S, arcade.key.A),
+    (arcade.key.UP, arcade.key.RIGHT, arcade.key.DOWN, arcade.key.LEFT),
+    (arcade.key.I, arcade.key.L, arcade.key.K, arcade.key.J),
+    (arcade.key.NUM_8, arcade.key.NUM_6, arcade.key.NUM_5, arcade.key.NUM_4),
+]
 
 
 class GameView(arcade.View):
     """Класс игрового экрана"""
 
-    def __init__(self, difficulty='medium'):
+    def __init__(self, difficulty='medium', netplay=None, seed=None):
+        """
+        difficulty: сложность ('easy', 'medium', 'hard')
+        netplay: начатая сетевая сессия (LockstepSession) или None
+        seed: зерно случайных чисел игры (в сетевой игре берется из сессии)
+        """
         super().__init__()
-        arcade.set_background_color((20, 25, 40))
+
+        # Профилировщик кадра (включается клавишей F3)
+        self.profiler = profiler
 
         # Загружаем настройки
-        settings = load_settings()
+        self.settings = load_settings()
+
+        # Ресурсы экрана создаются один раз и переживают reset ("играть снова"):
+        # списки спрайтов очищаются, а не создаются заново
+        # Активные анимации (появление блоков, вращение яблока, сообщения, исчезновение)
+        self.animations = AnimationScheduler()
+        # Дорогая логика по шагам в бюджете кадра
+        self.jobs = JobScheduler()
+        self.apple_sprite_list = arcade.SpriteList()
+        # Спрайты для блоков (для использования методов collide)
+        self.block_sprites = arcade.SpriteList()
+        # Исчезающие спрайты очищенных линий и столбцов
+        self.fading_sprites = arcade.SpriteList()
+        # Сообщения об изменении очков (текст, x, y, время жизни, цвет)
+        self.score_messages = ScoreMessages()
+        # Система частиц (на GPU, если поддерживается)
+        self.particle_system = create_particle_system(self.settings)
+        # Поле рисуется чанками (создается в reset, если нужно)
+        self.board_renderer = None
+        # Физический движок (pymunk) создается при первом обращении (get_space)
+        self.space = None
+        # Задержка от нажатия до хода змейки
+        self.input_latency = LatencyMeter()
+        # Создаем камеру для игрового поля
+        self._camera = arcade.Camera2D()
+        # Создаем камеру по умолчанию для UI
+        self._ui_camera = arcade.Camera2D()
+        # Тексты счета и рекорда (текст меняется, только когда меняется число)
+        self.score_text = arcade.Text("", 10, SCREEN_HEIGHT - 30, arcade.color.WHITE, 16)
+        self.high_score_text = arcade.Text("", 0, SCREEN_HEIGHT - 30, arcade.color.YELLOW, 16)
+        # Звуки (короткие загружаются один раз за запуск)
+        audio.load()
+
+        self.planner = None
+        self.telemetry = None
+        self.spectators = None
+        self.reset(difficulty, netplay, seed)
+
+    def reset(self, difficulty='medium', netplay=None, seed=None):
+        """Начинает новую игру на этом же экране
+
+        Игровое состояние создается заново, а текстуры, звуки, списки
+        спрайтов, камеры и тексты остаются, поэтому "играть снова"
+        не ждет загрузки.
+        """
+        arcade.set_background_color((20, 25, 40))
+        settings = self.settings
+
+        # Телеметрия тиков (включается в settings.json)
+        self.telemetry = create_sink(settings)
+        if self.telemetry:
+            self.profiler.set_telemetry(True)
+
+        self.reset_state(difficulty, netplay, seed)
+        # Рекорд для этой сложности
+        self.high_score = scores.best_score(self.difficulty)
+
+        # Поле рисуется чанками (рендерер переиспользуется, если размер тот же)
+        if self.render_mode != 'batched':
+            self.board_renderer = None
+        elif (self.board_renderer is not None
+              and self.board_renderer.grid_width == self.grid_width
+              and self.board_renderer.grid_height == self.grid_height):
+            self.board_renderer.mark_all_dirty()
+        else:
+            self.board_renderer = ChunkedBoardRenderer(
+                self.grid_width, self.grid_height)
+
+        # Фоновая музыка (файл читается потоком)
+        audio.play_music(volume=0.3)
+
+        # Трансляция игры зрителям (включается адресом в settings.json)
+        self.spectators = create_broadcaster(settings)
+
+    def reset_state(self, difficulty='medium', netplay=None, seed=None):
+        """Игровое состояние новой игры: поле, змейки, фигура, яблоко, счет
+
+        Не трогает окно, звук, базу рекордов, телеметрию и трансляцию,
+        поэтому benchmark.py строит игру без окна тем же кодом.
+        """
+        settings = self.settings
         self.camera_follow_snake = settings.get('camera_follow_snake', False)
+        # Интерполяция отрисовки между логическими тиками
+        self.render_interpolation = settings.get('render_interpolation', True)
+
+        # Сетевая игра: сложность и зерно общие для обоих игроков
+        self.netplay = netplay
+        if netplay:
+            difficulty = netplay.difficulty
+            seed = netplay.seed
+        # Все случайные решения логики идут через собственный генератор,
+        # чтобы игра с одним зерном шла одинаково на разных машинах
+        self.rng = random.Random(seed)
+
+        # Размер поля: обычный или большая арена (до MAX_ARENA_WIDTH x MAX_ARENA_HEIGHT)
+        self.big_arena = settings.get('big_arena', False) and not netplay
+        if self.big_arena:
+            self.grid_width = max(GRID_WIDTH, min(
+                MAX_ARENA_WIDTH, int(settings.get('arena_width', 100))))
+            self.grid_height = max(GRID_HEIGHT, min(
+                MAX_ARENA_HEIGHT, int(settings.get('arena_height', 200))))
+            # Большая арена целиком не помещается в окно
+            self.camera_follow_snake = True
+        else:
+            self.grid_width = GRID_WIDTH
+            self.grid_height = GRID_HEIGHT
+        # Отрисовка поля: 'immediate' - каждый кадр заново, 'batched' - чанками
+        self.render_mode = 'batched' if self.big_arena else settings.get(
+            'render_mode', 'immediate')
 
         # Настройки сложности
         self.difficulty = difficulty
@@ -70,59 +204,98 @@ class GameView(arcade.View):
         self.fall_speed = difficulty_config['fall_speed']
         self.snake_speed = difficulty_config['snake_speed']
 
-        self.grid = [[None for _ in range(GRID_WIDTH)]
-                     for _ in range(GRID_HEIGHT)]
+        self.grid = [[None for _ in range(self.grid_width)]
+                     for _ in range(self.grid_height)]
+        # Заполнение рядов (для анализа поля без сканирования всех клеток)
+        self.row_stats = RowStats(self.grid_width, self.grid_height)
 
         self.current_piece = None
-        self.fall_timer = 0.0
+        # Фиксированный шаг падения фигуры
+        self.fall_clock = TickClock(self.fall_speed)
         self.piece_spawn_delay_timer = 0.0
         self.piece_spawn_delay_cycles = 0
         self.piece_spawn_delay_applied = False  # Флаг, что задержка уже применена
         self.score = 0
         self.max_score = 0  # Максимальный счёт за игру (для рекорда)
-        self.high_score = load_high_score()  # Загружаем текущий рекорд
-
-        # Инициализация змейки в безопасной позиции
-        snake_x, snake_y = self._find_safe_snake_spawn()
-        self.snake = Snake(snake_x, snake_y)
-        self.snake_timer = 0.0
+        self.high_score = 0  # Рекорд сложности (читается в reset)
+
+        # Статистика игры (сохраняется в историю игр)
+        self.play_time = 0.0
+        self.total_lines_cleared = 0
+        self.total_columns_cleared = 0
+        self.apples_eaten = 0
+        self.death_cause = None
+        self.result_recorded = False  # Итог игры уже передан в таблицу рекордов
+
+        # Змейки (в локальной игре до MAX_SNAKES, у каждой свои клавиши).
+        # Индекс занятости хранит, какая змейка и какой сегмент в каждой клетке
+        self.snake_count = max(1, min(MAX_SNAKES, int(settings.get('snake_count', 1))))
+        if netplay:
+            self.snake_count = netplay.players
+        self.occupancy = OccupancyIndex()
+        self.snakes = []
+        reserve_cells(self.grid_width, self.grid_height)
+        for snake_id in range(self.snake_count):
+            # Каждая змейка появляется в безопасной позиции, не рядом с другими
+            snake_x, snake_y = self._find_safe_snake_spawn()
+            snake = Snake(snake_x, snake_y, snake_id, SNAKE_COLORS[snake_id])
+            self.snakes.append(snake)
+            self.occupancy.add_snake(snake_id, snake.body)
+        # Шаг сетевых тиков (в сетевой игре логика продвигается только по ним)
+        self.net_clock = TickClock(NET_TICK)
+        # Главная змейка (за ней следует камера); в сетевой игре - своя
+        self.snake = self.snakes[netplay.player if netplay else 0]
+        # Клавиша -> (змейка, направление); одной змейкой можно управлять
+        # и WASD, и стрелками
+        self.key_bindings = {}
+        for index, keys in enumerate(SNAKE_KEYS[:max(2, self.snake_count)]):
+            snake = self.snakes[index % self.snake_count]
+            for direction, key in enumerate(keys):
+                self.key_bindings[key] = (snake, direction)
+        # Окно, в котором нажатие сразу после хода выполняет следующий ход досрочно
+        self.input_grace = max(0, settings.get('input_grace_ms', 0)) / 1000
+        self.last_update_time = time.perf_counter()
+        # Автопилот змеек (для демонстраций и долгих прогонов; не в сетевой игре)
+        self.autopilots = None if netplay else create_autopilots(settings, self.snakes)
+        # Поле менялось с прошлого тика змеек (нужно проверить блоки на телах)
+        self.board_changed = False
+        # Фиксированный шаг движения змейки
+        self.snake_clock = TickClock(self.snake_speed)
+        self.is_game_over = False
+
+        # Остатки прошлой игры: анимации, работы, частицы, спрайты, сообщения
+        self.animations.clear()
+        self.jobs.cancel()
+        # В сетевой игре игровые работы выполняются сразу
+        self.jobs.deterministic = bool(netplay)
+        self.particle_system.clear()
+        self.block_sprites.clear()
+        self.fading_sprites.clear()
+        self.score_messages.clear()
 
         # Яблоко (теперь спрайт)
         self.apple = None
-        self.apple_sprite_list = arcade.SpriteList()
+        self.apple_sprite_list.clear()
         self.spawn_apple()
 
+        # Планировщик размещения фигур (поиск на 2 хода); следующая фигура
+        # известна заранее, чтобы планировщик учитывал и ее. Между играми
+        # планировщик остается вместе с таблицей оценок полей. В сетевой игре
+        # он есть всегда: от него зависит расход общих случайных чисел
+        if self.planner is None or (self.planner.budget is None) != bool(netplay):
+            self.planner = create_placement_planner(settings, deterministic=bool(netplay))
+        # Предпросмотр двух следующих фигур: вторая нужна фоновому поиску,
+        # который считает появление заранее, пока падает текущая фигура
+        self.piece_preview = [self.rng.choice(list(TETROMINOES.keys()))
+                              for _ in range(2)] if self.planner else None
         self.spawn_new_piece()
 
-        # Сообщения об изменении очков (текст, x, y, время жизни, цвет)
-        self.score_messages = []
-
         # Счетчик фигур для постепенного ускорения
         self.pieces_count = 0
         self.base_fall_speed = self.fall_speed  # Сохраняем базовую скорость
 
-        # Система частиц
-        self.particle_system = ParticleSystem()
-
-        # Спрайты для блоков (для использования методов collide)
-        self.block_sprites = arcade.SpriteList()
-
-        # Физический движок (pymunk)
-        self.space = pymunk.Space()
-        self.space.gravity = (0, -981)  # Гравитация вниз
-
-        # Звуки
-        self.sound_eat_apple = None
-        self.sound_line_clear = None
-        self.sound_game_over = None
-        self.sound_background = None
-        self.background_music_player = None
-        self.load_sounds()
-
-        # Запускаем фоновую музыку
-        if self.sound_background:
-            self.background_music_player = self.sound_background.play(
-                volume=0.3, loop=True)
+        # На большой арене блоки рисуются только чанками, без спрайтов
+        self.use_block_sprites = not self.big_arena
 
         # Настройки камеры
         # Увеличение при следовании за змейкой (меньше = больше область видимости)
@@ -131,62 +304,18 @@ class GameView(arcade.View):
         snake_head = self.snake.get_head()
         self.camera_x = MARGIN + snake_head[0] * CELL_SIZE + CELL_SIZE // 2
         self.camera_y = MARGIN + snake_head[1] * CELL_SIZE + CELL_SIZE // 2
-        # Создаем камеру для игрового поля
-        self._camera = arcade.Camera2D()
-        # Создаем камеру по умолчанию для UI
-        self._ui_camera = arcade.Camera2D()
 
         # Анимация для фигур
         self.piece_animation_timer = 0.0
 
-    def load_sounds(self):
-        """Загружает звуки игры"""
-        try:
-            # Пытаемся загрузить звуки из встроенных ресурсов arcade
-            sound_paths = {
-                'eat_apple': [
-                    ":resources:sounds/coin1.wav",
-                    ":resources:sounds/coin2.wav",
-                    ":resources:sounds/coin3.wav",
-                    ":resources:sounds/coin4.wav",
-                    ":resources:sounds/coin5.wav",
-                ],
-                'line_clear': [
-                    ":resources:sounds/upgrade1.wav",
-                    ":resources:sounds/upgrade2.wav",
-                    ":resources:sounds/upgrade3.wav",
-                    ":resources:sounds/upgrade4.wav",
-                    ":resources:sounds/upgrade5.wav",
-                ],
-                'game_over': [
-                    ":resources:sounds/gameover1.wav",
-                    ":resources:sounds/gameover2.wav",
-                    ":resources:sounds/gameover3.wav",
-                    ":resources:sounds/gameover4.wav",
-                    ":resources:sounds/gameover5.wav",
-                ],
-                'background': [
-                    ":resources:music/funkyrobot.mp3",
-                    ":resources:music/1918.mp3",
-                ]
-            }
-
-            for sound_name, paths in sound_paths.items():
-                for path in paths:
-                    try:
-                        if sound_name == 'eat_apple':
-                            self.sound_eat_apple = arcade.load_sound(path)
-                        elif sound_name == 'line_clear':
-                            self.sound_line_clear = arcade.load_sound(path)
-                        elif sound_name == 'game_over':
-                            self.sound_game_over = arcade.load_sound(path)
-                        elif sound_name == 'background':
-                            self.sound_background = arcade.load_sound(path)
-                        break
-                    except:
-                        continue
-        except:
-            pass  # Если звуки не загрузились, продолжаем без них
+    def get_space(self):
+        """Физический движок pymunk; модуль импортируется и пространство
+        создается только для механики, которой нужны тела"""
+        if self.space is None:
+            import pymunk
+            self.space = pymunk.Space()
+            self.space.gravity = (0, -981)  # Гравитация вниз
+        return self.space
 
     def _find_safe_snake_spawn(self):
         """Находит безопасную позицию для спавна змейки
@@ -208,13 +337,13 @@ class GameView(arcade.View):
         max_attempts = 500
         for attempt in range(max_attempts):
             # Генерируем случайную позицию с учетом минимальных отступов
-            snake_x = random.randint(
+            snake_x = self.rng.randint(
                 min_distance_from_left,
-                GRID_WIDTH - min_distance_from_right - snake_length
+                self.grid_width - min_distance_from_right - snake_length
             )
-            snake_y = random.randint(
+            snake_y = self.rng.randint(
                 min_distance_from_bottom,
-                GRID_HEIGHT - min_distance_from_top
+                self.grid_height - min_distance_from_top
             )
             
             # Проверяем, что позиция безопасна
@@ -224,11 +353,11 @@ class GameView(arcade.View):
         # Если не нашли безопасную позицию после всех попыток,
         # возвращаем позицию по умолчанию (центр поля с отступами)
         default_x = max(min_distance_from_left, 
-                       min(GRID_WIDTH - min_distance_from_right - snake_length,
-                           GRID_WIDTH // 2 - snake_length // 2))
+                       min(self.grid_width - min_distance_from_right - snake_length,
+                           self.grid_width // 2 - snake_length // 2))
         default_y = max(min_distance_from_bottom,
-                       min(GRID_HEIGHT - min_distance_from_top,
-                           GRID_HEIGHT // 2))
+                       min(self.grid_height - min_distance_from_top,
+                           self.grid_height // 2))
         return default_x, default_y
 
     def _is_safe_spawn_position(self, snake_x, snake_y):
@@ -240,27 +369,33 @@ class GameView(arcade.View):
         # Проверяем каждую часть тела змейки
         for x, y in snake_body:
             # Проверяем границы
-            if x < 0 or x >= GRID_WIDTH or y < 0 or y >= GRID_HEIGHT:
+            if x < 0 or x >= self.grid_width or y < 0 or y >= self.grid_height:
                 return False
             
             # Проверяем, что нет блоков на сетке
-            if 0 <= y < GRID_HEIGHT and 0 <= x < GRID_WIDTH:
+            if 0 <= y < self.grid_height and 0 <= x < self.grid_width:
                 if self.grid[y][x] is not None:
                     return False
         
         # Проверяем, что в направлении движения (вправо) есть достаточно места
         # Проверяем следующие 5 клеток вправо от головы
         safe_distance_ahead = 5
+
+        # Проверяем, что рядом и впереди нет других змеек
+        for y in range(snake_y - 2, snake_y + 3):
+            for x in range(snake_x - 2, snake_x + safe_distance_ahead + 1):
+                if self.occupancy.is_occupied(x, y):
+                    return False
         for i in range(1, safe_distance_ahead + 1):
             check_x = snake_x + i
             check_y = snake_y
             
             # Если вышли за границы - это плохо (слишком близко к стене)
-            if check_x >= GRID_WIDTH:
+            if check_x >= self.grid_width:
                 return False
             
             # Проверяем, что впереди нет блоков
-            if 0 <= check_y < GRID_HEIGHT and 0 <= check_x < GRID_WIDTH:
+            if 0 <= check_y < self.grid_height and 0 <= check_x < self.grid_width:
                 if self.grid[check_y][check_x] is not None:
                     return False
         
@@ -287,17 +422,17 @@ class GameView(arcade.View):
         
         # Проверяем, что есть место для маневра вверх и вниз
         # (чтобы игрок мог повернуть, если нужно)
-        if snake_y + 2 >= GRID_HEIGHT or snake_y - 2 < 0:
+        if snake_y + 2 >= self.grid_height or snake_y - 2 < 0:
             return False
         
         # Проверяем, что сверху и снизу нет блоков в опасной близости
         for offset_y in [-2, -1, 1, 2]:
             check_y = snake_y + offset_y
-            if 0 <= check_y < GRID_HEIGHT:
+            if 0 <= check_y < self.grid_height:
                 # Проверяем позиции тела змейки по X
                 for offset_x in [0, -1, -2]:
                     check_x = snake_x + offset_x
-                    if 0 <= check_x < GRID_WIDTH:
+                    if 0 <= check_x < self.grid_width:
                         if self.grid[check_y][check_x] is not None:
                             # Блок слишком близко - небезопасно
                             return False
@@ -305,66 +440,28 @@ class GameView(arcade.View):
         return True
 
     def _is_piece_safe_from_snake(self, piece):
-        """Проверяет, не находится ли фигура в опасной позиции относительно змейки
-        Фигура считается опасной, если она:
-        - находится прямо над змейкой или в опасной близости
-        - может упасть на змейку слишком быстро
+        """Проверяет, не находится ли фигура в опасной позиции относительно змеек
+        Фигура считается опасной, если под ней (или рядом по X) ближе 8 клеток
+        есть сегмент любой змейки: игрок должен успеть среагировать.
+        Проверяются только клетки вокруг фигуры по индексу занятости, поэтому
+        цена проверки не зависит от количества и длины змеек.
         """
-        if not hasattr(self, 'snake') or not self.snake:
-            return True  # Если змейки еще нет, позиция безопасна
-        
+        if not hasattr(self, 'occupancy'):
+            return True  # Если змеек еще нет, позиция безопасна
+
         piece_positions = piece.get_positions()
-        snake_body = self.snake.get_body()
-        snake_head = self.snake.get_head()
-        snake_x, snake_y = snake_head
-        
+
         # Находим границы фигуры
         piece_min_x = min(px for px, py in piece_positions)
         piece_max_x = max(px for px, py in piece_positions)
         piece_min_y = min(py for px, py in piece_positions)
         piece_max_y = max(py for px, py in piece_positions)
-        
-        # Находим границы змейки
-        snake_min_x = min(sx for sx, sy in snake_body)
-        snake_max_x = max(sx for sx, sy in snake_body)
-        snake_min_y = min(sy for sx, sy in snake_body)
-        snake_max_y = max(sy for sx, sy in snake_body)
-        
-        # Проверяем, не находится ли фигура прямо над змейкой
-        # (по X координате пересекается с змейкой)
-        x_overlap = not (piece_max_x < snake_min_x - 1 or piece_min_x > snake_max_x + 1)
-        
-        if x_overlap:
-            # Если есть пересечение по X, проверяем расстояние по Y
-            # Фигура находится вверху (y = GRID_HEIGHT - 1), змейка ниже
-            # Вычисляем минимальное расстояние по Y между фигурой и змейкой
-            # (фигура выше змейки, поэтому piece_min_y > snake_max_y)
-            vertical_distance = piece_min_y - snake_max_y
-            
-            # Если расстояние слишком маленькое (меньше 8 клеток), это опасно
-            # Игрок должен иметь время среагировать
-            if vertical_distance < 8:
-                return False
-        
-        # Проверяем, не находится ли фигура в опасной близости впереди змейки
-        # (змейка движется вправо, поэтому проверяем справа от змейки)
-        # Если фигура находится справа от змейки и может упасть на ее путь
-        if piece_min_x >= snake_max_x:
-            # Фигура справа от змейки
-            horizontal_distance = piece_min_x - snake_max_x
-            # Если фигура слишком близко (меньше 3 клеток) и может упасть на путь змейки
-            if horizontal_distance < 3 and x_overlap:
-                return False
-        
-        # Проверяем, не находится ли фигура слишком близко по диагонали
-        # (может упасть на змейку при движении)
-        if x_overlap:
-            # Если фигура находится в опасной зоне (может упасть на змейку быстро)
-            # Проверяем, что есть достаточно времени для реакции
-            min_safe_distance = 6  # Минимальное безопасное расстояние
-            if vertical_distance < min_safe_distance:
-                return False
-        
+
+        for y in range(piece_min_y - 7, piece_max_y + 2):
+            for x in range(piece_min_x - 1, piece_max_x + 2):
+                if self.occupancy.is_occupied(x, y):
+                    return False
+
         return True
 
     def find_best_target_row(self):
@@ -373,19 +470,19 @@ class GameView(arcade.View):
         best_score = -1
         max_filled = 0
 
-        # Анализируем нижние 15 рядов (игровую зону)
-        for y in range(max(0, GRID_HEIGHT - 15), GRID_HEIGHT):
-            filled_count = sum(1 for x in range(GRID_WIDTH)
-                               if self.grid[y][x] is not None)
+        # Анализируем 15 рядов под точкой появления фигуры (игровую зону)
+        spawn_row = self.get_spawn_row()
+        for y in range(max(0, spawn_row - 14), spawn_row + 1):
+            filled_count = self.row_stats.fill[y]
 
             # Пропускаем полностью заполненные ряды
-            if filled_count >= GRID_WIDTH:
+            if filled_count >= self.grid_width:
                 continue
 
             # Вычисляем "ценность" ряда: чем больше заполнен и чем ниже, тем лучше
-            fill_ratio = filled_count / GRID_WIDTH
-            height_bonus = (GRID_HEIGHT - y) / \
-                GRID_HEIGHT  # Нижние ряды важнее
+            fill_ratio = filled_count / self.grid_width
+            height_bonus = (self.grid_height - y) / \
+                self.grid_height  # Нижние ряды важнее
 
             # Улучшенная оценка: приоритет рядам с заполнением 30-95%
             if fill_ratio >= 0.3:
@@ -406,7 +503,7 @@ class GameView(arcade.View):
                 consecutive_bonus = 0
                 max_consecutive = 0
                 current_consecutive = 0
-                for x in range(GRID_WIDTH):
+                for x in range(self.grid_width):
                     if self.grid[y][x] is not None:
                         current_consecutive += 1
                         max_consecutive = max(
@@ -437,7 +534,7 @@ class GameView(arcade.View):
 
         # Находим пробелы в целевом ряду
         gaps = []
-        for x in range(GRID_WIDTH):
+        for x in range(self.grid_width):
             if self.grid[target_row][x] is None:
                 gaps.append(x)
 
@@ -488,7 +585,7 @@ class GameView(arcade.View):
                 score = 100 - abs(gap_length - piece_width)
                 # Бонус за центрирование
                 position_x = gap_center - piece_center_x + current_x
-                if 0 <= position_x <= GRID_WIDTH - piece_width:
+                if 0 <= position_x <= self.grid_width - piece_width:
                     score += 20
                     if score > best_score:
                         best_score = score
@@ -497,24 +594,24 @@ class GameView(arcade.View):
                 # Почти подходит - можно попробовать
                 score = 50
                 position_x = gap_center - piece_center_x + current_x
-                if 0 <= position_x <= GRID_WIDTH - piece_width:
+                if 0 <= position_x <= self.grid_width - piece_width:
                     if score > best_score:
                         best_score = score
                         best_position = int(position_x)
 
         # Ограничиваем границами поля
-        best_position = max(0, min(GRID_WIDTH - 1, best_position))
+        best_position = max(0, min(self.grid_width - 1, best_position))
 
         # Проверяем, что фигура не выходит за границы
         test_piece_x = best_position
         piece_x_positions_test = [test_piece_x + dx for dx, dy in shape]
         if min(piece_x_positions_test) < 0:
             best_position = -min(piece_x_positions_test)
-        if max(piece_x_positions_test) >= GRID_WIDTH:
-            best_position = GRID_WIDTH - 1 - \
+        if max(piece_x_positions_test) >= self.grid_width:
+            best_position = self.grid_width - 1 - \
                 max(piece_x_positions_test) + current_x
 
-        return max(0, min(GRID_WIDTH - 1, best_position))
+        return max(0, min(self.grid_width - 1, best_position))
 
     def analyze_grid_for_spawn(self):
         """Анализирует поле и возвращает подходящую позицию X и тип фигуры"""
@@ -523,7 +620,7 @@ class GameView(arcade.View):
         # Если нашли заполненный ряд, ищем пробелы
         if best_row >= 0 and max_filled > 0:
             gaps = []
-            for x in range(GRID_WIDTH):
+            for x in range(self.grid_width):
                 if self.grid[best_row][x] is None:
                     gaps.append(x)
 
@@ -551,7 +648,7 @@ class GameView(arcade.View):
 
                 # Выбираем центр пробела
                 target_x = best_gap_start + best_gap_length // 2
-                target_x = max(2, min(GRID_WIDTH - 3, target_x))
+                target_x = max(2, min(self.grid_width - 3, target_x))
 
                 # Выбираем фигуру по ширине пробела
                 piece_types = list(TETROMINOES.keys())
@@ -566,56 +663,103 @@ class GameView(arcade.View):
                 # Выбираем из предпочтительных, если они есть, иначе любую
                 available_preferred = [
                     p for p in preferred_pieces if p in piece_types]
-                piece_type = random.choice(
+                piece_type = self.rng.choice(
                     available_preferred if available_preferred else piece_types)
 
                 return target_x, piece_type
 
         # Если не нашли подходящий ряд, выбираем случайно (но ближе к заполненным рядам)
         # Находим среднюю X позицию заполненных блоков
-        filled_x_positions = []
-        for y in range(max(0, GRID_HEIGHT - 10), GRID_HEIGHT):
-            for x in range(GRID_WIDTH):
-                if self.grid[y][x] is not None:
-                    filled_x_positions.append(x)
+        spawn_row = self.get_spawn_row()
+        rows = range(max(0, spawn_row - 9), spawn_row + 1)
+        filled_count = sum(self.row_stats.fill[y] for y in rows)
 
-        if filled_x_positions:
-            avg_x = sum(filled_x_positions) // len(filled_x_positions)
-            target_x = max(2, min(GRID_WIDTH - 3, avg_x))
+        if filled_count:
+            avg_x = sum(self.row_stats.x_sum[y] for y in rows) // filled_count
+            target_x = max(2, min(self.grid_width - 3, avg_x))
         else:
-            target_x = random.randint(2, max(2, GRID_WIDTH - 3))
+            target_x = self.rng.randint(2, max(2, self.grid_width - 3))
 
-        piece_type = random.choice(list(TETROMINOES.keys()))
+        piece_type = self.rng.choice(list(TETROMINOES.keys()))
         return target_x, piece_type
 
+    def get_spawn_row(self):
+        """Ряд появления новой фигуры (на большой арене - над змейкой)"""
+        if not self.big_arena:
+            return self.grid_height - 1
+        head_y = self.snake.get_head()[1]
+        return max(0, min(self.grid_height - 1, head_y + BIG_ARENA_SPAWN_OFFSET))
+
+    def get_search_area(self):
+        """Область поиска места для яблока и проверки его доступности
+
+        Возвращает (x0, x1, y0, y1) включительно. На обычном поле это все поле,
+        на большой арене - квадрат вокруг головы змейки, чтобы поиск не зависел
+        от размера поля.
+        """
+        if not self.big_arena:
+            return 0, self.grid_width - 1, 0, self.grid_height - 1
+        head_x, head_y = self.snake.get_head()
+        radius = BIG_ARENA_SEARCH_RADIUS
+        head_x = max(0, min(self.grid_width - 1, head_x))
+        head_y = max(0, min(self.grid_height - 1, head_y))
+        return (max(0, head_x - radius), min(self.grid_width - 1, head_x + radius),
+                max(0, head_y - radius), min(self.grid_height - 1, head_y + radius))
+
+    @profiled('spawn_piece')
     def spawn_new_piece(self):
         """Создает новую фигуру вверху поля с учетом анализа поля"""
-        x, piece_type = self.analyze_grid_for_spawn()
-        color = random.choice(COLORS)
-        y = GRID_HEIGHT - 1
-
+        y = self.get_spawn_row()
+        placements = []
+        if self.planner:
+            # Фигура из предпросмотра; размещение выбирает поиск на 2 хода
+            piece_type = self.piece_preview.pop(0)
+            self.piece_preview.append(self.rng.choice(list(TETROMINOES.keys())))
+            placements = self.planner.plan(self, piece_type, self.piece_preview[0], y)
+        if not placements:
+            x, spawn_type = self.analyze_grid_for_spawn()
+            if not self.planner:
+                piece_type = spawn_type
+        color = self.rng.choice(COLORS)
+        self.piece_spawn_y = y
+
+        if placements:
+            rotations, x = placements[0]
+        else:
+            # Случайный поворот фигуры перед появлением (0, 90, 180 или 270 градусов)
+            rotations = self.rng.randint(0, 3)
         self.current_piece = Tetromino(piece_type, color, x, y)
-
-        # Случайный поворот фигуры перед появлением (0, 90, 180 или 270 градусов)
-        rotations = random.randint(0, 3)
         for _ in range(rotations):
             self.current_piece.rotate()
 
+        # Планировщик штрафует падение на змейку; если лучшее размещение
+        # все же опасно, пробуем следующие по оценке
+        if placements and not self._is_piece_safe_from_snake(self.current_piece):
+            for rotations, x in placements[1:PLANNER_FALLBACKS + 1]:
+                self.profiler.count('piece_spawn_attempts')
+                self.current_piece.x = x
+                self.current_piece.shape = list(TETROMINOES[piece_type])
+                for _ in range(rotations):
+                    self.current_piece.rotate()
+                if self._is_piece_safe_from_snake(self.current_piece):
+                    break
+
         # Проверяем, не находится ли фигура в опасной позиции относительно змейки
         # Если да, пытаемся найти безопасную позицию
         if not self._is_piece_safe_from_snake(self.current_piece):
             # Пытаемся найти безопасную позицию
             safe_found = False
             for attempt in range(50):  # Максимум 50 попыток
+                self.profiler.count('piece_spawn_attempts')
                 # Пробуем разные X позиции
-                test_x = random.randint(2, GRID_WIDTH - 3)
+                test_x = self.rng.randint(2, self.grid_width - 3)
                 self.current_piece.x = test_x
-                self.current_piece.y = GRID_HEIGHT - 1
+                self.current_piece.y = y
                 
                 # Пробуем разные повороты
-                test_rotations = random.randint(0, 3)
+                test_rotations = self.rng.randint(0, 3)
                 # Сбрасываем поворот
-                self.current_piece.shape = copy.deepcopy(TETROMINOES[piece_type])
+                self.current_piece.shape = list(TETROMINOES[piece_type])
                 for _ in range(test_rotations):
                     self.current_piece.rotate()
                 
@@ -626,6 +770,14 @@ class GameView(arcade.View):
             # Если не нашли безопасную позицию, оставляем как есть
             # (лучше чем ничего, и задержка спавна даст время игроку)
 
+        # Новая фигура не должна "подъезжать" с прошлой позиции
+        self.current_piece.save_previous_state()
+
+        # Пока фигура падает, следующее появление считается в фоне
+        if self.planner:
+            self.planner.speculate(self, self.current_piece, self.get_spawn_row(),
+                                   *self.piece_preview)
+
         # Сбрасываем таймер задержки после появления
         self.piece_spawn_delay_timer = 0.0
         self.piece_spawn_delay_cycles = 0
@@ -635,11 +787,11 @@ class GameView(arcade.View):
         """Проверяет, свободна ли клетка (не занята блоками, фигурой, змейкой)
         ignore_snake: если True, не учитывает змейку как препятствие"""
         # Проверяем границы
-        if x < 0 or x >= GRID_WIDTH or y < 0 or y >= GRID_HEIGHT:
+        if x < 0 or x >= self.grid_width or y < 0 or y >= self.grid_height:
             return False
 
         # Проверяем блоки
-        if 0 <= y < GRID_HEIGHT and 0 <= x < GRID_WIDTH:
+        if 0 <= y < self.grid_height and 0 <= x < self.grid_width:
             if self.grid[y][x] is not None:
                 return False
 
@@ -651,146 +803,213 @@ class GameView(arcade.View):
         # Проверяем змейку (игнорируем яблоко, если указано)
         if ignore_apple and (x, y) == ignore_apple:
             return True
-        if not ignore_snake and self.snake.check_collision_with_position(x, y):
+        if not ignore_snake and self.occupancy.is_occupied(x, y):
             return False
 
         return True
 
+    @profiled('is_apple_accessible')
     def is_apple_accessible(self, apple_x, apple_y):
-        """Проверяет доступность яблока для змейки:
-        1. Находит кратчайший путь от змейки до яблока (не учитывая змейку как препятствие)
-        2. Если путь найден, занимает пространство размером змейки от яблока
-        3. Проверяет путь от яблока до центра/пустого места для возврата"""
-        snake_head = self.snake.get_head()
-        snake_length = len(self.snake.get_body())
+        """Проверяет, может ли змейка съесть яблоко и не оказаться в ловушке
+
+        Поиск в ширину по (клетка, шаг): клетку под змейкой можно пройти
+        на том шаге, к которому с нее уйдет сегмент (сегмент i змейки длины L
+        уходит через L - i ходов). Змейка не может стоять на месте, поэтому
+        приход в клетку позже иногда открывает путь, которого не было при
+        раннем приходе; состояния различаются по шагу, пока он не больше
+        самого позднего освобождения (дальше все клетки под змейками свободны
+        и шаг уже ничего не меняет). Клетки своего пути змейка проходит
+        только после хвоста: последние клетки пути проверяются по цепочке
+        родителей.
+        1. От головы до яблока.
+        2. После яблока змейка длиннее на 1, ее тело - пройденный путь и остаток
+           старого тела. От яблока нужно дойти до клетки, которую тело уже
+           покинуло (дальше можно идти за хвостом), или отойти от яблока на
+           длину змейки (к этому времени освободятся все клетки под змейками).
+           Если с этим путем выбраться нельзя, пробуются другие приходы к яблоку.
+        Сначала идет быстрый поиск только по самым ранним приходам в клетки;
+        полный поиск по шагам запускается, если быстрый пути не нашел.
+        Путь ищется от ближайшей к яблоку змейки"""
+        snake = min(self.snakes, key=lambda s: abs(s.body[0][0] - apple_x)
+                    + abs(s.body[0][1] - apple_y))
+        apple = (apple_x, apple_y)
+        head = snake.get_head()
+        length = len(snake.body)
+        lengths = {other.snake_id: len(other.body) for other in self.snakes}
+        area_x0, area_x1, area_y0, area_y1 = self.get_search_area()
+        grid = self.grid
+        occupancy = self.occupancy
+        piece_cells = set(self.current_piece.get_positions()) if self.current_piece else ()
         # Вверх, вправо, вниз, влево
         directions = [(0, 1), (1, 0), (0, -1), (-1, 0)]
+        # После этого шага свободны все клетки под змейками
+        horizon = max(lengths.values()) + 1
 
-        # Шаг 1: Находим кратчайший путь от змейки до яблока
-        # НЕ учитываем змейку как препятствие (только блоки тетриса)
-        start = snake_head
-        queue = [(start, [start])]  # (позиция, путь)
-        visited = {start}
-        path_to_apple = None
-
-        while queue:
-            current, path = queue.pop(0)
-
-            if current == (apple_x, apple_y):
-                path_to_apple = path
-                break
-
-            for dx, dy in directions:
-                nx, ny = current[0] + dx, current[1] + dy
-                neighbor = (nx, ny)
-
-                # Проверяем границы
-                if nx < 0 or nx >= GRID_WIDTH or ny < 0 or ny >= GRID_HEIGHT:
-                    continue
-
-                # Проверяем, свободна ли клетка (игнорируем яблоко и змейку)
-                if not self.is_cell_free(nx, ny, ignore_apple=(apple_x, apple_y), ignore_snake=True):
-                    continue
-
-                if neighbor not in visited:
-                    visited.add(neighbor)
-                    new_path = path + [neighbor]
-                    queue.append((neighbor, new_path))
-
-        if not path_to_apple:
-            return False  # Не можем добраться до яблока
-
-        # Шаг 2: Занимаем пространство размером змейки от яблока
-        # Берем последние snake_length клеток пути от яблока
-        occupied_cells = set()
-        if len(path_to_apple) >= snake_length:
-            # Берем последние snake_length клеток пути (включая яблоко)
-            for i in range(len(path_to_apple) - snake_length, len(path_to_apple)):
-                occupied_cells.add(path_to_apple[i])
-        else:
-            # Если путь короче длины змейки, занимаем весь путь
-            occupied_cells = set(path_to_apple)
-
-        # Шаг 3: Проверяем путь от яблока до центра/пустого места
-        # Ищем центр поля или ближайшее пустое место
-        center_x = GRID_WIDTH // 2
-        center_y = GRID_HEIGHT // 2
-
-        # Ищем ближайшее пустое место к центру
-        target_positions = []
-        for y in range(max(0, center_y - 5), min(GRID_HEIGHT, center_y + 6)):
-            for x in range(max(0, center_x - 5), min(GRID_WIDTH, center_x + 6)):
-                if self.is_cell_free(x, y, ignore_apple=(apple_x, apple_y), ignore_snake=True):
-                    target_positions.append((x, y))
-
-        # Если не нашли пустых мест около центра, ищем любое пустое место выше
-        if not target_positions:
-            for y in range(GRID_HEIGHT // 2, GRID_HEIGHT):
-                for x in range(GRID_WIDTH):
-                    if self.is_cell_free(x, y, ignore_apple=(apple_x, apple_y), ignore_snake=True):
-                        target_positions.append((x, y))
-                        if len(target_positions) >= 5:
-                            break
-                if len(target_positions) >= 5:
-                    break
-
-        if not target_positions:
-            return False  # Нет пустых мест для возврата
-
-        # Проверяем путь от яблока до любого из целевых мест
-        # При этом учитываем занятые клетки (пространство змейки)
-        escape_found = False
-        # Проверяем первые 3 целевых места
-        for target_x, target_y in target_positions[:3]:
-            escape_queue = [(apple_x, apple_y)]
-            escape_visited = {(apple_x, apple_y)}
-
-            while escape_queue:
-                current = escape_queue.pop(0)
-                cx, cy = current
-
-                if current == (target_x, target_y):
-                    escape_found = True
-                    break
+        adjacent = {}
 
+        def neighbors(cell):
+            """Соседние клетки в области поиска без блоков и падающей фигуры
+            (список запоминается: поиски проходят одну клетку много раз)"""
+            result = adjacent.get(cell)
+            if result is None:
+                result = adjacent[cell] = []
                 for dx, dy in directions:
-                    nx, ny = cx + dx, cy + dy
-                    neighbor = (nx, ny)
-
-                    # Проверяем границы
-                    if nx < 0 or nx >= GRID_WIDTH or ny < 0 or ny >= GRID_HEIGHT:
+                    nx, ny = cell[0] + dx, cell[1] + dy
+                    if nx < area_x0 or nx > area_x1 or ny < area_y0 or ny > area_y1:
                         continue
-
-                    # Проверяем, свободна ли клетка (игнорируем яблоко, змейку, но учитываем занятые клетки)
-                    if neighbor in occupied_cells:
-                        continue  # Клетка занята пространством змейки
-
-                    if not self.is_cell_free(nx, ny, ignore_apple=(apple_x, apple_y), ignore_snake=True):
+                    if grid[ny][nx] is not None or (nx, ny) in piece_cells:
                         continue
+                    result.append((nx, ny))
+            return result
+
+        def release_of(cell, trail, eaten_at):
+            """С какого шага клетка свободна и принадлежит ли она змейке"""
+            if trail is not None and cell in trail:
+                return trail[cell], True
+            occupant = occupancy.get(cell)
+            if occupant is None:
+                return 0, False
+            occupant_id, index = occupant
+            release = lengths[occupant_id] - index
+            if occupant_id != snake.snake_id:
+                return release, False
+            # На шаге съедания хвост стоит на месте
+            if eaten_at is not None and release >= eaten_at:
+                release += 1
+            return release, True
+
+        def on_path(cell, state, chain, depth):
+            """Лежит ли клетка среди depth последних клеток пути, ведущего в state"""
+            while state is not None and depth > 0:
+                if state[0] == cell:
+                    return True
+                state = chain[state]
+                depth -= 1
+            return False
 
-                    if neighbor not in escape_visited:
-                        escape_visited.add(neighbor)
-                        escape_queue.append(neighbor)
-
-            if escape_found:
-                break
+        def can_leave(state, eaten_at, parents, exact):
+            """Шаг 2: выберется ли змейка, съевшая яблоко на шаге eaten_at
+            (путь к яблоку - цепочка parents от state)"""
+            trail = {}
+            step = eaten_at + 1
+            while state is not None:
+                step -= 1
+                release = step + length
+                release = release + 1 if release >= eaten_at else release
+                cell = state[0]
+                # Путь может проходить клетку дважды: важен последний проход
+                trail[cell] = max(trail.get(cell, 0), release)
+                state = parents[state]
+            # Состояние (клетка, шаг) -> откуда пришли. Шаг 2 короче длины
+            # змейки, поэтому его клетки до конца остаются под телом
+            tail = {(apple, eaten_at): None}
+            frontier = [(apple, eaten_at)]
+            t = eaten_at
+            while frontier:
+                if t - eaten_at > length:
+                    return True  # Змейка целиком ушла от яблока
+                t += 1
+                next_frontier = []
+                for state in frontier:
+                    self.profiler.count('bfs_nodes')
+                    for neighbor in neighbors(state[0]):
+                        key = (neighbor, t if exact else 0)
+                        if key in tail or exact and on_path(neighbor, state, tail, length + 1):
+                            continue
+                        release, own = release_of(neighbor, trail, eaten_at)
+                        if t < release:
+                            continue
+                        if own:
+                            return True  # Дальше змейка может идти за своим хвостом
+                        tail[key] = state
+                        next_frontier.append(key)
+                frontier = next_frontier
+            return False
 
-        return escape_found
+        def reach(exact):
+            """Шаг 1: состояние (клетка, min(шаг, horizon)) -> откуда пришли.
+            Без exact у клетки одно состояние - самый ранний приход: пути
+            кратчайшие и сами себя не пересекают, так что найденный путь
+            проходим, но обход и повторный заход в клетку не пробуются"""
+            start = (head, 0)
+            parents = {start: None}
+            frontier = [start]
+            t = 0
+            while frontier:
+                t += 1
+                layer = min(t, horizon) if exact else 0
+                next_frontier = []
+                for state in frontier:
+                    self.profiler.count('bfs_nodes')
+                    for neighbor in neighbors(state[0]):
+                        key = (neighbor, layer)
+                        if neighbor == apple:
+                            # Тело после съедания зависит от того, откуда вошли в яблоко
+                            key = (neighbor, layer, state[0])
+                        if key in parents:
+                            continue
+                        # В клетку своего пути змейка войдет только после хвоста
+                        if exact and on_path(neighbor, state, parents, length - 1):
+                            continue
+                        release, _ = release_of(neighbor, None, None)
+                        if t < release:
+                            continue
+                        parents[key] = state
+                        if neighbor == apple:
+                            # Яблоко съедается при входе: дальше этот путь не идет
+                            if can_leave(key, t, parents, exact):
+                                return True
+                            continue
+                        next_frontier.append(key)
+                frontier = next_frontier
+            return False
 
+        # Быстрый поиск по самым ранним приходам почти всегда находит путь;
+        # полный поиск по шагам нужен только если он не нашел
+        if reach(exact=False):
+            return True
+        # Яблоко вне области головы: пути нет ни на каком шаге
+        region = {head}
+        stack = [head]
+        while stack:
+            for neighbor in neighbors(stack.pop()):
+                if neighbor not in region:
+                    region.add(neighbor)
+                    stack.append(neighbor)
+        return apple in region and reach(exact=True)
+
+    @profiled('spawn_apple')
     def spawn_apple(self):
-        """Создает яблоко в случайной позиции (не на змейке, не на блоках, не на падающей фигуре, не в верхних 4 линиях, не под падающей фигурой)"""
+        """Создает яблоко сразу (все попытки в этом вызове)"""
+        for _ in self.apple_spawn_steps():
+            pass
+
+    def schedule_apple_spawn(self):
+        """Ищет место для яблока по шагам в бюджете кадра; поиск
+        доделывается до следующего логического тика"""
+        self.apple = None
+        self.apple_sprite_list.clear()
+        self.jobs.submit(self.apple_spawn_steps(), CRITICAL, key='apple')
+
+    def apple_spawn_steps(self):
+        """Шаги поиска места для яблока (одна попытка - один шаг): не на змейке, не на блоках, не на падающей фигуре, не в верхних 4 линиях, не под падающей фигурой"""
         max_attempts = 200
-        for _ in range(max_attempts):
-            apple_x = random.randint(0, GRID_WIDTH - 1)
-            # Не спавним в верхних 4 линиях (GRID_HEIGHT - 1, GRID_HEIGHT - 2, GRID_HEIGHT - 3, GRID_HEIGHT - 4)
-            apple_y = random.randint(0, GRID_HEIGHT - 5)
+        area_x0, area_x1, area_y0, area_y1 = self.get_search_area()
+        # Не спавним в верхних 4 линиях поля
+        area_y1 = max(area_y0, min(area_y1, self.grid_height - 5))
+        for attempt in range(max_attempts):
+            if attempt:
+                yield
+            self.profiler.count('apple_spawn_attempts')
+            apple_x = self.rng.randint(area_x0, area_x1)
+            apple_y = self.rng.randint(area_y0, area_y1)
 
             # Проверяем, что яблоко не на змейке
-            if self.snake.check_collision_with_position(apple_x, apple_y):
+            if self.occupancy.is_occupied(apple_x, apple_y):
                 continue
 
             # Проверяем, что яблоко не на блоке
-            if 0 <= apple_y < GRID_HEIGHT and 0 <= apple_x < GRID_WIDTH:
+            if 0 <= apple_y < self.grid_height and 0 <= apple_x < self.grid_width:
                 if self.grid[apple_y][apple_x] is not None:
                     continue
 
@@ -833,14 +1052,15 @@ class GameView(arcade.View):
             x = piece.get_x() + dx + x_offset
             y = piece.get_y() + dy + y_offset
 
-            if x < 0 or x >= GRID_WIDTH or y < 0:
+            if x < 0 or x >= self.grid_width or y < 0:
                 return False
 
-            if y < GRID_HEIGHT and self.grid[y][x] is not None:
+            if y < self.grid_height and self.grid[y][x] is not None:
                 return False
 
         return True
 
+    @profiled('lock_piece')
     def lock_piece(self):
         """Фиксирует текущую фигуру на поле"""
         # Проверяем, не раздавили ли яблоко падающей фигурой (используя collide)
@@ -859,30 +1079,43 @@ class GameView(arcade.View):
                 pixel_x = MARGIN + apple_x * CELL_SIZE + CELL_SIZE // 2
                 pixel_y = MARGIN + apple_y * CELL_SIZE + CELL_SIZE // 2
                 self.particle_system.add_explosion(
-                    pixel_x, pixel_y, (255, 0, 0), count=15)
-                self.apple = None
-                self.apple_sprite_list.clear()
-                self.spawn_apple()
+                    pixel_x, pixel_y, (255, 0, 0), count=15, important=True)
+                self.schedule_apple_spawn()
 
         # Создаем спрайты для блоков и добавляем в список для collide
+        locked_columns = set()
         for dx, dy in self.current_piece.get_shape():
             x = self.current_piece.get_x() + dx
             y = self.current_piece.get_y() + dy
 
-            if 0 <= y < GRID_HEIGHT and 0 <= x < GRID_WIDTH:
+            if 0 <= y < self.grid_height and 0 <= x < self.grid_width:
+                if self.grid[y][x] is None:
+                    self.row_stats.add(x, y)
                 self.grid[y][x] = self.current_piece.get_color()
-                # Создаем спрайт блока
-                block_sprite = BlockSprite(
-                    x, y, self.current_piece.get_color())
-                self.block_sprites.append(block_sprite)
-                # Анимация появления
+                locked_columns.add(x)
+                if self.board_renderer:
+                    self.board_renderer.mark_cell_dirty(x, y)
+                if self.spectators:
+                    self.spectators.mark_cell(x, y)
+                if self.use_block_sprites:
+                    # Создаем спрайт блока
+                    block_sprite = BlockSprite(
+                        x, y, self.current_piece.get_color())
+                    self.block_sprites.append(block_sprite)
+                    self.animations.add(block_sprite)
+                # Анимация появления (украшение: при нехватке времени кадра
+                # бюджет частиц урезает его первым)
                 pixel_x = MARGIN + x * CELL_SIZE + CELL_SIZE // 2
                 pixel_y = MARGIN + y * CELL_SIZE + CELL_SIZE // 2
-                self.particle_system.add_explosion(
-                    pixel_x, pixel_y, self.current_piece.get_color(), count=5)
+                self.jobs.call(COSMETIC, self.particle_system.add_explosion,
+                               pixel_x, pixel_y, self.current_piece.get_color(), count=5)
 
+        # Блоки могли лечь на змейку или сдвинуться на нее при очистке -
+        # на следующем тике тела змеек проверяются по полю
+        self.board_changed = True
         self.clear_lines()
-        self.clear_columns()
+        # Столбец может стать заполненным только там, куда легла фигура
+        self.clear_columns(sorted(locked_columns))
 
         # Увеличиваем счетчик фигур и постепенно ускоряем падение
         self.pieces_count += 1
@@ -890,21 +1123,23 @@ class GameView(arcade.View):
         # Минимальная скорость - 0.05 (максимальное ускорение)
         speed_reduction = (self.pieces_count // 10) * 0.001
         self.fall_speed = max(0.05, self.base_fall_speed - speed_reduction)
+        self.fall_clock.step = self.fall_speed
 
         self.spawn_new_piece()
 
         if not self.is_valid_position(self.current_piece):
             # Игра окончена - поле переполнено
+            self.death_cause = 'board_full'
             self.game_over()
 
     def clear_lines(self):
         """Удаляет заполненные линии"""
         lines_cleared = 0
-        y = GRID_HEIGHT - 1
+        y = self.grid_height - 1
         cleared_rows = []
 
         while y >= 0:
-            if all(self.grid[y][x] is not None for x in range(GRID_WIDTH)):
+            if self.row_stats.is_full(y):
                 # Собираем цвет для частиц
                 line_color = self.grid[y][0] if self.grid[y][0] else (
                     255, 255, 255)
@@ -915,19 +1150,21 @@ class GameView(arcade.View):
                 for sprite in self.block_sprites:
                     if sprite.grid_y == y:
                         # Частицы при удалении блока
-                        pixel_x = sprite.center_x
-                        pixel_y = sprite.center_y
-                        self.particle_system.add_line_clear_particles(
-                            pixel_x, pixel_y, line_color, count=3
-                        )
+                        self.jobs.call(COSMETIC, self.particle_system.add_line_clear_particles,
+                                       sprite.center_x, sprite.center_y, line_color, count=3)
                         sprites_to_remove.append(sprite)
 
-                for sprite in sprites_to_remove:
-                    self.block_sprites.remove(sprite)
+                self.fade_out_sprites(sprites_to_remove)
 
                 del self.grid[y]
-                self.grid.append([None for _ in range(GRID_WIDTH)])
+                self.grid.append([None for _ in range(self.grid_width)])
+                self.row_stats.delete_row(y)
+                if self.board_renderer:
+                    self.board_renderer.mark_rows_dirty(y)
+                if self.spectators:
+                    self.spectators.mark_rows(y)
                 lines_cleared += 1
+                self.total_lines_cleared += 1
             else:
                 y -= 1
 
@@ -940,30 +1177,32 @@ class GameView(arcade.View):
             self.add_score_message(score_gain)
 
             # Звук очистки линии
-            if self.sound_line_clear:
-                arcade.play_sound(self.sound_line_clear, volume=0.5)
+            audio.play('line_clear', volume=0.5)
 
             # Частицы для каждой очищенной линии
             for row_y, color in cleared_rows:
-                center_x = SCREEN_WIDTH // 2
+                center_x = MARGIN + self.grid_width * CELL_SIZE // 2
                 center_y = MARGIN + row_y * CELL_SIZE + CELL_SIZE // 2
-                self.particle_system.add_line_clear_particles(
-                    center_x, center_y, color, count=20)
+                self.jobs.call(COSMETIC, self.particle_system.add_line_clear_particles,
+                               center_x, center_y, color, count=20, important=True)
 
             # Обновляем позиции спрайтов после удаления линий
             for sprite in self.block_sprites:
                 sprite.center_y = MARGIN + sprite.grid_y * CELL_SIZE + CELL_SIZE // 2
 
-    def clear_columns(self):
-        """Удаляет заполненные столбцы (если в столбце COLUMN_CLEAR_THRESHOLD или больше блоков подряд снизу)"""
+    def clear_columns(self, columns=None):
+        """Удаляет заполненные столбцы (если в столбце COLUMN_CLEAR_THRESHOLD или больше блоков подряд снизу)
+        columns: какие столбцы проверять (по умолчанию все)"""
         columns_cleared = 0
         cleared_columns = []
+        # Столбец -> (сколько блоков снизу очищено, цвет частиц) для переноса спрайтов
+        sprite_shifts = {}
 
         # Проверяем каждый столбец
-        for x in range(GRID_WIDTH):
+        for x in (range(self.grid_width) if columns is None else columns):
             # Считаем количество блоков подряд снизу вверх
             blocks_count = 0
-            for y in range(GRID_HEIGHT):
+            for y in range(self.grid_height):
                 if self.grid[y][x] is not None:
                     blocks_count += 1
                 else:
@@ -974,34 +1213,28 @@ class GameView(arcade.View):
             if blocks_count >= COLUMN_CLEAR_THRESHOLD:
                 cleared_columns.append(x)
                 columns_cleared += 1
+                self.total_columns_cleared += 1
 
                 # Собираем цвет для частиц (берём цвет первого блока снизу)
                 column_color = self.grid[0][x] if self.grid[0][x] else (255, 255, 255)
 
-                # Удаляем спрайты блоков, которые находятся в удаляемых позициях (первые blocks_count снизу)
-                sprites_to_remove = []
-                for sprite in self.block_sprites:
-                    if sprite.grid_x == x and sprite.grid_y < blocks_count:
-                        # Частицы при удалении блока
-                        pixel_x = sprite.center_x
-                        pixel_y = sprite.center_y
-                        self.particle_system.add_line_clear_particles(
-                            pixel_x, pixel_y, column_color, count=3
-                        )
-                        sprites_to_remove.append(sprite)
+                # Спрайты столбца переносятся по шагам (см. shift_column_sprites)
+                sprite_shifts[x] = (blocks_count, column_color)
 
-                for sprite in sprites_to_remove:
-                    self.block_sprites.remove(sprite)
+                # Убираем столбец из статистики рядов (вернем после сдвига)
+                for y in range(self.grid_height):
+                    if self.grid[y][x] is not None:
+                        self.row_stats.remove(x, y)
 
                 # Удаляем блоки из столбца (снизу вверх, blocks_count штук)
                 for y in range(blocks_count):
-                    if y < GRID_HEIGHT:
+                    if y < self.grid_height:
                         self.grid[y][x] = None
 
                 # Сдвигаем все блоки выше удалённых вниз
                 # Создаём временный список для столбца
                 column_blocks = []
-                for y in range(blocks_count, GRID_HEIGHT):
+                for y in range(blocks_count, self.grid_height):
                     column_blocks.append(self.grid[y][x])
                     self.grid[y][x] = None
 
@@ -1009,15 +1242,18 @@ class GameView(arcade.View):
                 for i, block in enumerate(column_blocks):
                     if block is not None:
                         self.grid[i][x] = block
-
-                # Обновляем позиции спрайтов в этом столбце (только тех, что выше удалённых)
-                for sprite in self.block_sprites:
-                    if sprite.grid_x == x and sprite.grid_y >= blocks_count:
-                        sprite.grid_y = sprite.grid_y - blocks_count
-                        sprite.center_y = MARGIN + sprite.grid_y * CELL_SIZE + CELL_SIZE // 2
+                        self.row_stats.add(x, i)
+                if self.board_renderer:
+                    self.board_renderer.mark_column_dirty(x)
+                if self.spectators:
+                    self.spectators.mark_column(x)
 
         # Начисляем очки за очищенные столбцы
         if columns_cleared > 0:
+            # Логика тика спрайты не читает, поэтому они переносятся по шагам;
+            # перенос доделывается до следующего тика (clear_lines ищет спрайты по grid_y)
+            if self.block_sprites:
+                self.jobs.submit(self.shift_column_sprites(sprite_shifts), CRITICAL)
             score_gain = columns_cleared * 150  # Больше очков за столбцы, чем за линии
             self.score = max(0, self.score + score_gain)
             self.max_score = max(self.max_score, self.score)  # Обновляем максимальный счёт
@@ -1025,16 +1261,37 @@ class GameView(arcade.View):
             self.add_score_message(score_gain)
 
             # Звук очистки столбца
-            if self.sound_line_clear:
-                arcade.play_sound(self.sound_line_clear, volume=0.5)
+            audio.play('line_clear', volume=0.5)
 
             # Частицы для каждого очищенного столбца
             for col_x in cleared_columns:
                 center_x = MARGIN + col_x * CELL_SIZE + CELL_SIZE // 2
                 center_y = MARGIN + (COLUMN_CLEAR_THRESHOLD // 2) * CELL_SIZE + CELL_SIZE // 2
                 column_color = (255, 200, 0)  # Золотистый цвет для столбцов
-                self.particle_system.add_line_clear_particles(
-                    center_x, center_y, column_color, count=30)
+                self.jobs.call(COSMETIC, self.particle_system.add_line_clear_particles,
+                               center_x, center_y, column_color, count=30, important=True)
+
+    def shift_column_sprites(self, shifts):
+        """Шаги переноса спрайтов очищенных столбцов за один проход по спрайтам
+        shifts: столбец -> (сколько блоков снизу очищено, цвет частиц)"""
+        sprites_to_remove = []
+        for index, sprite in enumerate(list(self.block_sprites)):
+            if index and index % SPRITE_JOB_STEP == 0:
+                yield
+            shift = shifts.get(sprite.grid_x)
+            if shift is None:
+                continue
+            blocks_count, column_color = shift
+            if sprite.grid_y < blocks_count:
+                # Блок очищен: частицы и исчезновение
+                self.jobs.call(COSMETIC, self.particle_system.add_line_clear_particles,
+                               sprite.center_x, sprite.center_y, column_color, count=3)
+                sprites_to_remove.append(sprite)
+            else:
+                # Блок выше очищенных опускается
+                sprite.grid_y = sprite.grid_y - blocks_count
+                sprite.center_y = MARGIN + sprite.grid_y * CELL_SIZE + CELL_SIZE // 2
+        self.fade_out_sprites(sprites_to_remove)
 
     def move_piece(self, dx, dy):
         """Перемещает фигуру"""
@@ -1052,83 +1309,119 @@ class GameView(arcade.View):
                     self.max_score = max(self.max_score, self.score)  # Обновляем максимальный счёт
                     self.check_and_update_high_score()  # Проверяем и обновляем рекорд
                     self.add_score_message(-50, apple_x, apple_y)
-                    self.apple = None
-                    self.spawn_apple()
+                    self.schedule_apple_spawn()
 
             return True
         return False
 
-    def check_snake_collision(self):
-        """Проверяет столкновение змейки со стеной, фигурами или с собой (использует методы collide)"""
-        snake_body = self.snake.get_body()
+    def check_snake_collision(self, snake=None):
+        """Проверяет столкновение змейки со стеной, фигурами, с собой или другими змейками
 
-        # Проверка столкновения головы с телом (столкновение с собой)
+        Голова проверяется одним поиском в индексе занятости; тело проверяется
+        по полю, только если поле менялось с прошлого тика.
+        """
+        if snake is None:
+            snake = self.snake
+        snake_body = snake.get_body()
         head = snake_body[0]
-        if head in snake_body[1:]:
+        head_x, head_y = head
+
+        # Столкновение головы с собой или с другой змейкой
+        occupant = self.occupancy.get(head)
+        if occupant is not None and occupant != (snake.snake_id, 0):
+            self.death_cause = 'self' if occupant[0] == snake.snake_id else 'snake'
             return True
 
-        # Проверяем каждую часть змейки
-        for snake_x, snake_y in snake_body:
-            # Проверка столкновения со стеной
-            if snake_x < 0 or snake_x >= GRID_WIDTH or snake_y < 0 or snake_y >= GRID_HEIGHT:
-                return True
-
-            # Проверка столкновения с зафиксированными блоками (используя collide)
-            if 0 <= snake_y < GRID_HEIGHT and 0 <= snake_x < GRID_WIDTH:
-                if self.grid[snake_y][snake_x] is not None:
-                    # Создаем временный спрайт для проверки столкновения
-                    temp_sprite = arcade.Sprite()
-                    temp_sprite.center_x = MARGIN + snake_x * CELL_SIZE + CELL_SIZE // 2
-                    temp_sprite.center_y = MARGIN + snake_y * CELL_SIZE + CELL_SIZE // 2
-                    temp_sprite.width = CELL_SIZE
-                    temp_sprite.height = CELL_SIZE
-
-                    # Проверяем столкновение со спрайтами блоков
-                    hit_list = arcade.check_for_collision_with_list(
-                        temp_sprite, self.block_sprites)
-                    if hit_list:
-                        return True
+        # Проверка столкновения со стеной (тело повторяет путь головы)
+        if head_x < 0 or head_x >= self.grid_width or head_y < 0 or head_y >= self.grid_height:
+            self.death_cause = 'wall'
+            return True
+
+        # Проверка столкновения с зафиксированными блоками (используя collide)
+        cells = snake_body if self.board_changed else (head,)
+        for snake_x, snake_y in cells:
+            if not (0 <= snake_y < self.grid_height and 0 <= snake_x < self.grid_width):
+                continue
+            if self.grid[snake_y][snake_x] is not None:
+                if not self.use_block_sprites:
+                    # Без спрайтов блоков достаточно самого поля
+                    self.death_cause = 'block'
+                    return True
+                # Создаем временный спрайт для проверки столкновения
+                temp_sprite = arcade.Sprite()
+                temp_sprite.center_x = MARGIN + snake_x * CELL_SIZE + CELL_SIZE // 2
+                temp_sprite.center_y = MARGIN + snake_y * CELL_SIZE + CELL_SIZE // 2
+                temp_sprite.width = CELL_SIZE
+                temp_sprite.height = CELL_SIZE
+
+                # Проверяем столкновение со спрайтами блоков
+                hit_list = arcade.check_for_collision_with_list(
+                    temp_sprite, self.block_sprites)
+                if hit_list:
+                    self.death_cause = 'block'
+                    return True
 
         # Проверка столкновения с падающей фигурой (отдельно для головы и тела)
         if self.current_piece:
-            piece_positions = self.current_piece.get_positions()
-            head_pos = snake_body[0]
-
-            # Если фигура касается головы - игра заканчивается
-            if head_pos in piece_positions:
-                return True
-
-            # Если фигура касается тела - обрезаем тело
-            for idx, (snake_x, snake_y) in enumerate(snake_body[1:], start=1):
-                if (snake_x, snake_y) in piece_positions:
-                    # Нашли касание тела - обрезаем начиная с этого индекса
-                    removed_count = self.snake.cut_body_at_index(idx)
-                    if removed_count > 0:
-                        # Проверяем, что змейка не стала короче 3 клеточек
-                        if len(self.snake.body) < 3:
-                            # Игра заканчивается - змейка слишком короткая
-                            return True
-                        # Снимаем по 25 очков за каждый отрубленный кусок
-                        score_loss = removed_count * 25
-                        self.score = max(0, self.score - score_loss)
-                        self.max_score = max(self.max_score, self.score)  # Обновляем максимальный счёт
-                        self.check_and_update_high_score()  # Проверяем и обновляем рекорд
-                        # Показываем изменение очков
-                        self.add_score_message(-score_loss, snake_x, snake_y)
-                        # Частицы при обрезании
-                        pixel_x = MARGIN + snake_x * CELL_SIZE + CELL_SIZE // 2
-                        pixel_y = MARGIN + snake_y * CELL_SIZE + CELL_SIZE // 2
-                        self.particle_system.add_explosion(
-                            pixel_x, pixel_y, (255, 100, 0), count=10)
-                    break  # Обрабатываем только первое касание
+            # Ищем сегменты этой змейки под фигурой по индексу занятости
+            cut_index = None
+            for cell in self.current_piece.get_positions():
+                occupant = self.occupancy.get(cell)
+                if occupant is None or occupant[0] != snake.snake_id:
+                    continue
+                # Если фигура касается головы - змейка погибает
+                if occupant[1] == 0:
+                    self.death_cause = 'piece'
+                    return True
+                if cut_index is None or occupant[1] < cut_index:
+                    cut_index = occupant[1]
+
+            # Если фигура касается тела - обрезаем тело начиная с первого касания
+            if cut_index is not None:
+                snake_x, snake_y = snake_body[cut_index]
+                removed_cells = snake_body[cut_index:]
+                removed_count = snake.cut_body_at_index(cut_index)
+                if removed_count > 0:
+                    self.occupancy.release(snake.snake_id, removed_cells)
+                    # Проверяем, что змейка не стала короче 3 клеточек
+                    if len(snake.body) < 3:
+                        # Змейка слишком короткая
+                        self.death_cause = 'too_short'
+                        return True
+                    # Снимаем по 25 очков за каждый отрубленный кусок
+                    score_loss = removed_count * 25
+                    self.score = max(0, self.score - score_loss)
+                    self.max_score = max(self.max_score, self.score)  # Обновляем максимальный счёт
+                    self.check_and_update_high_score()  # Проверяем и обновляем рекорд
+                    # Показываем изменение очков
+                    self.add_score_message(-score_loss, snake_x, snake_y)
+                    # Частицы при обрезании
+                    pixel_x = MARGIN + snake_x * CELL_SIZE + CELL_SIZE // 2
+                    pixel_y = MARGIN + snake_y * CELL_SIZE + CELL_SIZE // 2
+                    self.particle_system.add_explosion(
+                        pixel_x, pixel_y, (255, 100, 0), count=10, important=True)
 
         return False
 
+    def kill_snake(self, snake):
+        """Убирает погибшую змейку с поля"""
+        self.snakes.remove(snake)
+        self.occupancy.remove_snake(snake.snake_id, snake.body)
+        if self.snakes:
+            # Игра продолжается, пока жива хотя бы одна змейка
+            head_x, head_y = snake.get_head()
+            self.particle_system.add_explosion(
+                MARGIN + head_x * CELL_SIZE + CELL_SIZE // 2,
+                MARGIN + head_y * CELL_SIZE + CELL_SIZE // 2,
+                snake.head_color, count=20, important=True)
+            if snake is self.snake:
+                self.snake = self.snakes[0]
+
     def check_and_update_high_score(self):
-        """Проверяет и обновляет рекорд, если текущий максимальный счёт больше"""
+        """Проверяет и обновляет рекорд, если текущий максимальный счёт больше
+        (в базу рекорд записывается в конце игры)"""
         if self.max_score > self.high_score:
             self.high_score = self.max_score
-            save_high_score(self.high_score)
 
     def add_score_message(self, score_change, x=None, y=None):
         """Добавляет сообщение об изменении очков (всегда показываем сверху по центру)"""
@@ -1144,61 +1437,116 @@ class GameView(arcade.View):
             text = str(score_change)
             color = (255, 0, 0)  # Красный
 
-        # Добавляем сообщение: (текст, x, y, время жизни, цвет)
-        self.score_messages.append({
-            'text': text,
-            'x': x,
-            'y': y,
-            'life': 1.5,  # Время жизни в секундах
-            'color': color
-        })
+        # Добавляем сообщение (время жизни 1.5 секунды)
+        self.score_messages.add(text, x, y, color, life=1.5)
+
+    def fade_out_sprites(self, sprites):
+        """Переносит спрайты удаленных блоков в список исчезающих"""
+        for sprite in sprites:
+            self.block_sprites.remove(sprite)
+            self.fading_sprites.append(sprite)
+            self.animations.add(FadeOut(sprite, self.fading_sprites))
+
+    def record_result(self):
+        """Передает итог игры в таблицу рекордов (один раз за игру).
+        Запись в базу выполняется в фоновом потоке"""
+        if self.result_recorded:
+            return
+        self.result_recorded = True
+        self.check_and_update_high_score()
+        scores.record_game(
+            self.difficulty, self.score, self.max_score, self.play_time,
+            self.total_lines_cleared, self.total_columns_cleared,
+            self.apples_eaten, self.death_cause or 'quit'
+        )
+
+    def on_hide_view(self):
+        """Игру покинули, не доиграв: результат все равно сохраняется"""
+        if not self.is_game_over:
+            self.record_result()
+
+    def on_close(self):
+        """Окно закрывается посреди игры: результат попадает в очередь
+        записи до сброса при выходе (atexit)"""
+        if not self.is_game_over:
+            self.record_result()
 
     def game_over(self):
         """Завершает игру и показывает экран проигрыша"""
+        if self.is_game_over:
+            return
+        self.is_game_over = True
+
+        # Дописываем последний тик и останавливаем телеметрию
+        if self.telemetry:
+            self.record_telemetry()
+            self.telemetry.close()
+            self.telemetry = None
+            self.profiler.set_telemetry(False)
+
         # Останавливаем фоновую музыку
-        if self.background_music_player:
-            arcade.stop_sound(self.background_music_player)
+        audio.stop_music()
+
+        # Закрываем сетевую сессию
+        if self.netplay:
+            self.netplay.close()
+
+        # Зрители получают последнее состояние, после чего трансляция закрывается
+        if self.spectators:
+            self.spectators.publish(self)
+            self.spectators.close()
+            self.spectators = None
+
+        # Отложенные работы больше не нужны
+        self.jobs.cancel()
+
+        # Останавливаем фоновый поиск появления фигур
+        if self.planner:
+            self.planner.close()
 
         # Звук окончания игры
-        if self.sound_game_over:
-            arcade.play_sound(self.sound_game_over, volume=0.8)
+        audio.play('game_over', volume=0.8)
 
-        # Обновляем рекорд, если максимальный счёт за игру больше
-        # (используем max_score, а не финальный score)
-        if self.max_score > self.high_score:
-            self.high_score = self.max_score
-            save_high_score(self.high_score)
+        # Сохраняем итог игры (рекорд считается по max_score, а не финальному score)
+        self.record_result()
+
+        # Локальную игру можно начать заново на этом же экране
+        global _finished_view
+        if not self.netplay:
+            _finished_view = self
 
         from menu import GameOverView
-        game_over_view = GameOverView(self.score)
+        game_over_view = GameOverView(self.score, None if self.netplay else self)
         self.window.show_view(game_over_view)
 
     def on_update(self, delta_time):
         """Обновление игры"""
-        # Обновление физического движка
-        self.space.step(delta_time)
+        self.last_update_time = time.perf_counter()
+        # Обновление физического движка (если какая-то механика его создала)
+        if self.space is not None:
+            self.space.step(delta_time)
 
         # Обновление анимаций
         self.piece_animation_timer += delta_time
+        self.play_time += delta_time
 
-        # Обновление анимации яблока
-        if self.apple:
-            self.apple.update_animation(delta_time)
-
-        # Обновление анимаций спрайтов блоков
-        for sprite in self.block_sprites:
-            if hasattr(sprite, 'update_animation'):
-                sprite.update_animation(delta_time)
+        # Обновление только активных анимаций
+        with self.profiler.phase('animations'):
+            self.animations.update(delta_time)
+            self.score_messages.update(delta_time)
 
         # Обновление системы частиц
-        self.particle_system.update(delta_time)
+        with self.profiler.phase('particles_update'):
+            self.particle_system.update(delta_time)
 
         # Обновление камеры (следует за змейкой)
         if self.camera_follow_snake:
-            snake_head = self.snake.get_head()
+            # Следуем за интерполированной позицией головы, а не за клеткой
+            head_x, head_y = self.snake.get_interpolated_position(
+                0, self.get_snake_alpha())
             # Преобразуем координаты змейки в пиксели
-            target_x = MARGIN + snake_head[0] * CELL_SIZE + CELL_SIZE // 2
-            target_y = MARGIN + snake_head[1] * CELL_SIZE + CELL_SIZE // 2
+            target_x = MARGIN + head_x * CELL_SIZE + CELL_SIZE // 2
+            target_y = MARGIN + head_y * CELL_SIZE + CELL_SIZE // 2
 
             # Плавное следование камеры (интерполяция)
             lerp_speed = 5.0  # Скорость следования
@@ -1207,22 +1555,31 @@ class GameView(arcade.View):
             self.camera_y += (target_y - self.camera_y) * \
                 lerp_speed * delta_time
 
-        # Обновление сообщений об изменении очков
-        for msg in self.score_messages[:]:
-            msg['life'] -= delta_time
-            msg['y'] += 30 * delta_time  # Движение вверх
-            if msg['life'] <= 0:
-                self.score_messages.remove(msg)
+        if self.netplay:
+            self.update_netplay(delta_time)
+        else:
+            self.advance_simulation(delta_time)
+
+        # Отложенные работы (поиск места для яблока, спрайты столбцов, частицы)
+        with self.profiler.phase('jobs'):
+            self.profiler.count('job_steps', self.jobs.run(JOB_BUDGET))
 
-        # Обновление падающих фигур
-        self.fall_timer += delta_time
+        # Изменения за кадр отправляются зрителям одним сообщением
+        if self.spectators:
+            with self.profiler.phase('spectators'):
+                self.spectators.publish(self)
+
+    def advance_simulation(self, delta_time):
+        """Продвигает логику игры (падение фигур и движение змеек) на delta_time"""
+        # Обновление падающих фигур (фиксированный шаг)
+        self.fall_clock.add_time(delta_time)
 
         # Проверяем задержку после появления фигуры (только один раз в самом верху)
         piece_can_fall = True
         if self.current_piece and not self.piece_spawn_delay_applied:
             piece_y = self.current_piece.get_y()
-            # Задержка применяется только если фигура в самом верху (y >= GRID_HEIGHT - 1)
-            if piece_y >= GRID_HEIGHT - 1:
+            # Задержка применяется только если фигура еще в точке появления
+            if piece_y >= self.piece_spawn_y:
                 if PIECE_SPAWN_DELAY_CYCLES > 0:
                     # Используем задержку в циклах
                     if self.piece_spawn_delay_cycles < PIECE_SPAWN_DELAY_CYCLES:
@@ -1240,99 +1597,318 @@ class GameView(arcade.View):
                         self.piece_spawn_delay_timer = 0.0
                         self.piece_spawn_delay_applied = True  # Задержка применена
 
-        if piece_can_fall and self.fall_timer >= self.fall_speed:
-            self.fall_timer = 0.0
+        if piece_can_fall:
+            while self.fall_clock.ready():
+                self.fall_clock.consume()
+                with self.profiler.phase('piece_tick'):
+                    self.update_piece_tick()
+                if self.is_game_over:
+                    return
+                if not self.piece_spawn_delay_applied:
+                    # Появилась новая фигура - ждем задержку в следующих кадрах
+                    self.fall_clock.hold()
+                    break
+        else:
+            # Во время задержки не копим тики падения
+            self.fall_clock.hold()
+
+        # Обновление змейки (фиксированный шаг)
+        self.snake_clock.add_time(delta_time)
+        while self.snake_clock.ready():
+            self.snake_clock.consume()
+            with self.profiler.phase('snake_tick'):
+                self.update_snake_tick()
+            if self.is_game_over:
+                return
+            self.record_telemetry()
+
+    def update_netplay(self, delta_time):
+        """Сетевая игра: моделирует тики, для которых пришел ввод всех игроков"""
+        session = self.netplay
+        session.poll()
+        if session.resync:
+            # Игрок 0 прислал правильное состояние после расхождения
+            self.load_state(session.take_resync()[1])
+
+        # Сетевые тики идут с шагом NET_TICK; пока нет ввода соперника - ждем
+        self.net_clock.add_time(delta_time)
+        while self.net_clock.ready():
+            if not session.ready():
+                self.net_clock.hold()
+                break
+            self.net_clock.consume()
+            for player, direction in session.begin_tick():
+                for snake in self.snakes:
+                    if snake.snake_id == player:
+                        snake.change_direction(direction)
+            self.advance_simulation(NET_TICK)
+            if self.is_game_over:
+                return
+            session.end_tick(self.serialize_state)
 
-            # Фигуры падают только вниз, без автоматического позиционирования по X
-            if not self.move_piece(0, -1):
-                # Если не можем двигаться вниз, фиксируем фигуру
-                self.lock_piece()
+        if session.resync_needed:
+            session.send_resync(self.serialize_state())
+        if (session.peer_left or session.closed) and not session.ready():
+            self.death_cause = 'disconnect'
+            self.game_over()
 
-        # Обновление змейки
-        self.snake_timer += delta_time
-        if self.snake_timer >= self.snake_speed:
-            self.snake_timer = 0.0
+    def serialize_state(self):
+        """Состояние логики игры в байтах (для сверки и ресинхронизации сетевой игры)"""
+        piece = self.current_piece
+        state = {
+            'grid': [''.join('.' if cell is None else COLOR_CODES[cell] for cell in row)
+                     for row in self.grid],
+            'snakes': [[snake.snake_id, snake.body, snake.direction,
+                        snake.next_direction, snake.direction_queue]
+                       for snake in self.snakes],
+            'piece': None if piece is None else [
+                piece.piece_type, COLOR_CODES[piece.color], piece.x, piece.y, piece.shape],
+            'apple': None if self.apple is None else list(self.apple.get_position()),
+            'score': [self.score, self.max_score, self.pieces_count],
+            'stats': [self.total_lines_cleared, self.total_columns_cleared,
+                      self.apples_eaten],
+            'clocks': [self.fall_speed, self.fall_clock.accumulator,
+                       self.snake_clock.accumulator],
+            'spawn': [self.piece_spawn_delay_timer, self.piece_spawn_delay_cycles,
+                      self.piece_spawn_delay_applied, self.piece_spawn_y],
+            'board_changed': self.board_changed,
+            'preview': self.piece_preview,
+            'rng': self.rng.getstate(),
+        }
+        return json.dumps(state, separators=(',', ':')).encode('utf-8')
+
+    def load_state(self, data):
+        """Восстанавливает состояние логики из serialize_state"""
+        state = json.loads(data)
+        self.grid = [[None if code == '.' else COLORS[int(code)] for code in row]
+                     for row in state['grid']]
+        self.row_stats.rebuild(self.grid)
+        if self.board_renderer:
+            self.board_renderer.mark_all_dirty()
+        if self.spectators:
+            self.spectators.mark_all()
+        self.block_sprites.clear()
+        if self.use_block_sprites:
+            for y, row in enumerate(self.grid):
+                for x, color in enumerate(row):
+                    if color is not None:
+                        sprite = BlockSprite(x, y, color)
+                        # Без анимации появления
+                        sprite.animation_scale = sprite.target_scale
+                        sprite.scale = sprite.target_scale
+                        self.block_sprites.append(sprite)
+
+        self.snakes = []
+        self.occupancy = OccupancyIndex()
+        for snake_id, body, direction, next_direction, queue in state['snakes']:
+            body = [grid_cell(x, y) for x, y in body]
+            snake = Snake(body[0][0], body[0][1], snake_id, SNAKE_COLORS[snake_id])
+            snake.body = body
+            snake.prev_body = list(body)
+            snake.direction = direction
+            snake.next_direction = next_direction
+            snake.direction_queue = list(queue)
+            snake.turn_times = [None] * len(queue)
+            self.snakes.append(snake)
+            self.occupancy.add_snake(snake_id, body)
+        local_id = self.netplay.player if self.netplay else 0
+        self.snake = next((snake for snake in self.snakes if snake.snake_id == local_id),
+                          self.snakes[0] if self.snakes else self.snake)
 
-            # Сохраняем хвост перед движением (для роста, если съедим яблоко)
-            old_tail = self.snake.body[-1] if len(
-                self.snake.body) > 1 else None
+        self.current_piece = None
+        if state['piece']:
+            piece_type, color_code, x, y, shape = state['piece']
+            self.current_piece = Tetromino(piece_type, COLORS[int(color_code)], x, y)
+            self.current_piece.shape = [tuple(cell) for cell in shape]
 
-            # Двигаем змейку (направление может измениться внутри move)
-            self.snake.move(grow=False)
+        self.apple = None
+        self.apple_sprite_list.clear()
+        if state['apple']:
+            self.apple = Apple(*state['apple'])
+            self.apple_sprite_list.append(self.apple)
 
-            # Проверяем яблоко ПОСЛЕ движения - проверяем точное совпадение координат сетки
-            new_head = self.snake.get_head()
-            if self.apple:
-                apple_pos = self.apple.get_position()
-                # Проверяем точное совпадение координат сетки (не спрайтов)
-                if new_head == apple_pos:
-                    # Яблоко съедено - змейка должна вырасти
-                    # Возвращаем удаленный хвост, чтобы змейка выросла
-                    if old_tail:
-                        self.snake.body.append(old_tail)
-                    apple_x, apple_y = self.apple.get_position()
-                    self.score += 100
-                    self.max_score = max(self.max_score, self.score)  # Обновляем максимальный счёт
-                    self.check_and_update_high_score()  # Проверяем и обновляем рекорд
-                    self.add_score_message(100, apple_x, apple_y)
+        self.score, self.max_score, self.pieces_count = state['score']
+        (self.total_lines_cleared, self.total_columns_cleared,
+         self.apples_eaten) = state['stats']
+        self.fall_speed, self.fall_clock.accumulator, self.snake_clock.accumulator = \
+            state['clocks']
+        self.fall_clock.step = self.fall_speed
+        (self.piece_spawn_delay_timer, self.piece_spawn_delay_cycles,
+         self.piece_spawn_delay_applied, self.piece_spawn_y) = state['spawn']
+        self.board_changed = state['board_changed']
+        self.piece_preview = state['preview']
+        version, internal, gauss = state['rng']
+        self.rng.setstate((version, tuple(internal), gauss))
+
+    def record_telemetry(self):
+        """Записывает телеметрию логического тика (если включена)"""
+        if not self.telemetry:
+            return
+        phase_times, counters = self.profiler.pop_tick_data()
+        self.telemetry.record(
+            self.snake_clock.ticks, self.play_time, phase_times, counters,
+            self.particle_system.active_count(), len(self.block_sprites),
+            sum(len(snake.body) for snake in self.snakes)
+        )
+
+    def get_snake_alpha(self):
+        """Доля времени между тиками змейки для интерполяции отрисовки"""
+        return self.snake_clock.alpha if self.render_interpolation else 1.0
+
+    def get_piece_alpha(self):
+        """Доля времени между тиками падения для интерполяции отрисовки"""
+        return self.fall_clock.alpha if self.render_interpolation else 1.0
+
+    def tick_stats(self):
+        """Возвращает статистику логических тиков (догнанные и отброшенные)"""
+        return {
+            'snake': self.snake_clock.stats(),
+            'piece': self.fall_clock.stats(),
+        }
+
+    def update_piece_tick(self):
+        """Один логический тик падения фигуры"""
+        self.jobs.finish(CRITICAL)
+        self.current_piece.save_previous_state()
+        # Фигуры падают только вниз, без автоматического позиционирования по X
+        if not self.move_piece(0, -1):
+            # Если не можем двигаться вниз, фиксируем фигуру
+            self.lock_piece()
+
+    def update_snake_tick(self):
+        """Один логический тик движения всех змеек"""
+        self.jobs.finish(CRITICAL)
+        if self.autopilots:
+            with self.profiler.phase('autopilot'):
+                self.steer_autopilots()
+        for snake in list(self.snakes):
+            if self.update_single_snake(snake):
+                self.kill_snake(snake)
+        self.board_changed = False
+
+        if not self.snakes:
+            self.game_over()
+            return
 
-                    # Звук съедания яблока
-                    if self.sound_eat_apple:
-                        arcade.play_sound(self.sound_eat_apple, volume=0.7)
+        # Проверяем доступность яблока после каждого обновления
+        # (ситуация может измениться, например, упала фигура)
+        if self.apple:
+            apple_pos = self.apple.get_position()
+            if not self.is_apple_accessible(apple_pos[0], apple_pos[1]):
+                # Яблоко стало недоступным - уничтожаем без снятия очков
+                self.schedule_apple_spawn()
+
+    def steer_autopilots(self):
+        """Автопилот выбирает направление своих змеек перед ходом"""
+        budget = AUTOPILOT_BUDGET / len(self.snakes)
+        for snake in self.snakes:
+            pilot = self.autopilots.get(snake.snake_id)
+            if pilot is None:
+                continue
+            nodes = pilot.nodes
+            direction = pilot.choose(self, snake, budget)
+            self.profiler.count('autopilot_nodes', pilot.nodes - nodes)
+            snake.direction_queue.clear()
+            snake.turn_times.clear()
+            snake.change_direction(direction)
+
+    def update_single_snake(self, snake):
+        """Ход одной змейки; возвращает True, если змейка погибла"""
+        snake.save_previous_state()
+
+        # Сохраняем хвост перед движением (для роста, если съедим яблоко)
+        tail = snake.body[-1]
+        old_tail = tail if len(snake.body) > 1 else None
+
+        # Двигаем змейку (направление может измениться внутри move)
+        snake.move(grow=False)
+        if snake.applied_turn_time is not None:
+            latency = time.perf_counter() - snake.applied_turn_time
+            self.input_latency.add(latency)
+            self.profiler.count('input_latency_us', int(latency * 1e6))
+
+        # Переносим змейку в индексе занятости: хвост освобождается, голова занимает клетку
+        new_head = snake.get_head()
+        self.occupancy.move_head(snake.snake_id, new_head, tail)
+
+        # Проверяем яблоко ПОСЛЕ движения - проверяем точное совпадение координат сетки
+        if self.apple:
+            apple_pos = self.apple.get_position()
+            # Проверяем точное совпадение координат сетки (не спрайтов)
+            if new_head == apple_pos:
+                # Яблоко съедено - змейка должна вырасти
+                # Возвращаем удаленный хвост, чтобы змейка выросла
+                if old_tail:
+                    snake.body.append(old_tail)
+                    self.occupancy.grow(snake.snake_id, old_tail, len(snake.body))
+                apple_x, apple_y = self.apple.get_position()
+                self.apples_eaten += 1
+                self.score += 100
+                self.max_score = max(self.max_score, self.score)  # Обновляем максимальный счёт
+                self.check_and_update_high_score()  # Проверяем и обновляем рекорд
+                self.add_score_message(100, apple_x, apple_y)
 
-                    # Частицы при съедании яблока
-                    pixel_x = self.apple.center_x
-                    pixel_y = self.apple.center_y
-                    self.particle_system.add_apple_particles(
-                        pixel_x, pixel_y, count=15)
+                # Звук съедания яблока
+                audio.play('eat_apple', volume=0.7)
 
-                    # Анимация вращения яблока перед исчезновением
-                    self.apple.start_rotation()
+                # Частицы при съедании яблока
+                pixel_x = self.apple.center_x
+                pixel_y = self.apple.center_y
+                self.particle_system.add_apple_particles(
+                    pixel_x, pixel_y, count=15)
 
-                    self.spawn_apple()
+                # Анимация вращения яблока перед исчезновением
+                self.apple.start_rotation()
+                self.animations.add(self.apple)
 
-            # Проверяем столкновения
-            if self.check_snake_collision():
-                self.game_over()
-                return
+                self.schedule_apple_spawn()
 
-            # Проверяем доступность яблока после каждого обновления
-            # (ситуация может измениться, например, упала фигура)
-            if self.apple:
-                apple_pos = self.apple.get_position()
-                if not self.is_apple_accessible(apple_pos[0], apple_pos[1]):
-                    # Яблоко стало недоступным - уничтожаем без снятия очков
-                    self.apple = None
-                    self.spawn_apple()
+        # Проверяем столкновения
+        return self.check_snake_collision(snake)
+
+    def get_visible_rect(self):
+        """Видимая область мира в пикселях (left, right, bottom, top)"""
+        if not self.camera_follow_snake:
+            return 0, SCREEN_WIDTH, 0, SCREEN_HEIGHT
+        half_width = SCREEN_WIDTH / 2 / self.camera_zoom
+        half_height = SCREEN_HEIGHT / 2 / self.camera_zoom
+        return (self.camera_x - half_width, self.camera_x + half_width,
+                self.camera_y - half_height, self.camera_y + half_height)
+
+    def get_visible_cells(self, view_rect):
+        """Видимые клетки поля (x0, x1, y0, y1 включительно)"""
+        left, right, bottom, top = view_rect
+        return (int((left - MARGIN) // CELL_SIZE), int((right - MARGIN) // CELL_SIZE),
+                int((bottom - MARGIN) // CELL_SIZE), int((top - MARGIN) // CELL_SIZE))
 
     def draw_grid(self):
         """Отрисовка сетки поля"""
         field_color = (30, 35, 50)
         arcade.draw_lrbt_rectangle_filled(
-            MARGIN, MARGIN + GRID_WIDTH * CELL_SIZE,
-            MARGIN, MARGIN + GRID_HEIGHT * CELL_SIZE,
+            MARGIN, MARGIN + self.grid_width * CELL_SIZE,
+            MARGIN, MARGIN + self.grid_height * CELL_SIZE,
             field_color
         )
 
         grid_color = (60, 70, 90)
-        for x in range(GRID_WIDTH + 1):
+        for x in range(self.grid_width + 1):
             start_x = MARGIN + x * CELL_SIZE
             start_y = MARGIN
             end_x = start_x
-            end_y = MARGIN + GRID_HEIGHT * CELL_SIZE
+            end_y = MARGIN + self.grid_height * CELL_SIZE
             arcade.draw_line(start_x, start_y, end_x, end_y, grid_color, 1)
 
-        for y in range(GRID_HEIGHT + 1):
+        for y in range(self.grid_height + 1):
             start_x = MARGIN
             start_y = MARGIN + y * CELL_SIZE
-            end_x = MARGIN + GRID_WIDTH * CELL_SIZE
+            end_x = MARGIN + self.grid_width * CELL_SIZE
             end_y = start_y
             arcade.draw_line(start_x, start_y, end_x, end_y, grid_color, 1)
 
     def draw_blocks(self):
         """Отрисовка всех блоков на поле"""
-        for y in range(GRID_HEIGHT):
-            for x in range(GRID_WIDTH):
+        for y in range(self.grid_height):
+            for x in range(self.grid_width):
                 if self.grid[y][x] is not None:
                     left = MARGIN + x * CELL_SIZE + 1
                     right = MARGIN + (x + 1) * CELL_SIZE - 1
@@ -1354,16 +1930,22 @@ class GameView(arcade.View):
                         arcade.draw_line(right, bottom, right,
                                          top, shadow_color, 2)
 
+    def draw_current_piece(self):
+        """Отрисовка падающей фигуры"""
         if self.current_piece:
+            # Плавная позиция фигуры между тиками падения
+            piece_x, piece_y = self.current_piece.get_interpolated_position(
+                self.get_piece_alpha())
             for dx, dy in self.current_piece.get_shape():
-                x = self.current_piece.get_x() + dx
                 y = self.current_piece.get_y() + dy
-
-                if 0 <= y < GRID_HEIGHT:
-                    left = MARGIN + x * CELL_SIZE + 1
-                    right = MARGIN + (x + 1) * CELL_SIZE - 1
-                    bottom = MARGIN + y * CELL_SIZE + 1
-                    top = MARGIN + (y + 1) * CELL_SIZE - 1
+                draw_x = piece_x + dx
+                draw_y = piece_y + dy
+
+                if 0 <= y < self.grid_height:
+                    left = MARGIN + draw_x * CELL_SIZE + 1
+                    right = MARGIN + (draw_x + 1) * CELL_SIZE - 1
+                    bottom = MARGIN + draw_y * CELL_SIZE + 1
+                    top = MARGIN + (draw_y + 1) * CELL_SIZE - 1
                     if top > bottom:
                         piece_color = self.current_piece.get_color()
                         arcade.draw_lrbt_rectangle_filled(
@@ -1383,14 +1965,33 @@ class GameView(arcade.View):
 
     def on_key_press(self, key, modifiers):
         """Обработка нажатий клавиш для управления змейкой"""
-        if key == arcade.key.W or key == arcade.key.UP:
-            self.snake.change_direction(0)  # Вверх
-        elif key == arcade.key.D or key == arcade.key.RIGHT:
-            self.snake.change_direction(1)  # Вправо
-        elif key == arcade.key.S or key == arcade.key.DOWN:
-            self.snake.change_direction(2)  # Вниз
-        elif key == arcade.key.A or key == arcade.key.LEFT:
-            self.snake.change_direction(3)  # Влево
+        if key == arcade.key.F3:
+            self.profiler.toggle()
+            return
+        binding = self.key_bindings.get(key)
+        if binding:
+            # У каждой змейки свои клавиши (0=вверх, 1=вправо, 2=вниз, 3=влево)
+            snake, direction = binding
+            if self.netplay:
+                # В сетевой игре нажатие применяется на общем тике у обоих игроков
+                self.netplay.add_local_input(direction)
+            elif snake in self.snakes:
+                pressed_at = time.perf_counter()
+                if snake.change_direction(direction, pressed_at):
+                    self.apply_input_grace(snake, pressed_at)
+
+    def apply_input_grace(self, snake, pressed_at):
+        """Выполняет ход досрочно, если поворот нажат сразу после хода
+
+        Работает, только когда змейка одна (тик общий для всех змеек)
+        и у нее нет других поворотов в очереди.
+        """
+        if not self.input_grace or len(self.snakes) != 1 or len(snake.direction_queue) != 1:
+            return
+        # Сколько времени симуляции прошло с последнего хода змейки
+        since_tick = self.snake_clock.accumulator + (pressed_at - self.last_update_time)
+        if since_tick <= self.input_grace:
+            self.snake_clock.pull_forward()
 
     def draw_apple(self):
         """Отрисовка яблока (спрайт)"""
@@ -1414,43 +2015,105 @@ class GameView(arcade.View):
             # Активируем камеру
             self._camera.use()
 
-        self.draw_grid()
-        self.draw_blocks()
-        # Отрисовка спрайтов блоков
-        self.block_sprites.draw()
+        profiler = self.profiler
+        view_rect = self.get_visible_rect()
+        with profiler.phase('draw_grid'):
+            if self.board_renderer:
+                # Сетка и блоки поля: только видимые чанки
+                self.board_renderer.draw(self.grid, view_rect)
+            else:
+                self.draw_grid()
+        with profiler.phase('draw_blocks'):
+            if not self.board_renderer:
+                self.draw_blocks()
+            # Отрисовка спрайтов блоков
+            self.block_sprites.draw()
+            self.fading_sprites.draw()
+            self.draw_current_piece()
         self.draw_apple()
-        self.snake.draw()
+        with profiler.phase('snake_draw'):
+            snake_alpha = self.get_snake_alpha()
+            visible_cells = self.get_visible_cells(view_rect)
+            for snake in self.snakes:
+                snake.draw(snake_alpha, self.grid_width, self.grid_height,
+                           visible_cells)
 
         # Отрисовка системы частиц
-        self.particle_system.draw()
+        with profiler.phase('particles_draw'):
+            self.particle_system.draw()
 
         # Отключаем камеру для UI элементов - используем камеру по умолчанию
         if self.camera_follow_snake:
             # Возвращаемся к обычному виду через UI камеру
             self._ui_camera.use()
 
-        # UI элементы отрисовываются без трансформации камеры
+        with profiler.phase('hud'):
+            self.draw_hud()
+
+        # Оверлей профилировщика
+        if profiler.enabled:
+            tick_stats = self.tick_stats()
+            extra_lines = [
+                "тики змейки: догнано {caught_up}, отброшено {dropped}".format(
+                    **tick_stats['snake']),
+                "тики фигур: догнано {caught_up}, отброшено {dropped}".format(
+                    **tick_stats['piece']),
+                "ввод -> ход: p50 {:.0f}  p95 {:.0f}  max {:.0f} мс".format(
+                    *self.input_latency.summary()),
+            ]
+            if self.autopilots:
+                extra_lines.append("автопилот: не хватило бюджета {}, без пути к яблоку {}".format(
+                    sum(pilot.overruns for pilot in self.autopilots.values()),
+                    sum(pilot.fallbacks for pilot in self.autopilots.values())))
+            extra_lines.append("звук: голосов занято {}/{}, перехвачено {}, пропущено {}".format(
+                audio.busy_voices(), audio.voice_count, audio.stolen, audio.skipped))
+            extra_lines.append("работы: в очереди {}, доделано перед тиком {} шагов".format(
+                self.jobs.pending(), self.jobs.forced_steps))
+            if self.planner:
+                extra_lines.append("появление фигур: посчитано заранее {}, пересчитано {}".format(
+                    self.planner.speculation_hits, self.planner.speculation_misses))
+            profiler.draw_overlay(10, SCREEN_HEIGHT - 45, extra_lines)
+            profiler.end_frame()
+
+    def draw_hud(self):
+        """Отрисовка счета, рекорда и сообщений об изменении очков"""
+        # UI элементы отрисовываются без трансформации камеры.
+        # Тексты пересобираются, только когда меняется число
         score_text = f"Счет: {self.score}"
-        arcade.draw_text(score_text, 10, SCREEN_HEIGHT -
-                         30, arcade.color.WHITE, 16)
-        
+        if self.score_text.text != score_text:
+            self.score_text.text = score_text
+        self.score_text.draw()
+
         # Отображаем рекорд справа от счёта жёлтым цветом
         high_score_text = f"Рекорд: {self.high_score}"
+        if self.high_score_text.text != high_score_text:
+            self.high_score_text.text = high_score_text
         # Вычисляем позицию справа от счёта (примерная ширина текста счёта + отступ)
         score_text_width = len(score_text) * 10  # Примерная ширина символа
         high_score_x = 10 + score_text_width + 30  # Отступ 30 пикселей
-        arcade.draw_text(high_score_text, high_score_x, SCREEN_HEIGHT -
-                         30, arcade.color.YELLOW, 16)
+        if self.high_score_text.x != high_score_x:
+            self.high_score_text.x = high_score_x
+        self.high_score_text.draw()
 
         # Отрисовка сообщений об изменении очков
-        for msg in self.score_messages:
+        for text, x, y, color in self.score_messages:
             arcade.draw_text(
-                msg['text'],
-                msg['x'],
-                msg['y'],
-                msg['color'],
+                text,
+                x,
+                y,
+                color,
                 20,
                 anchor_x='center',
                 anchor_y='center',
                 bold=True
             )
+
+        # Состояние сетевой игры
+        if self.netplay:
+            session = self.netplay
+            sent, _ = session.bandwidth()
+            rtt_text = f"{session.rtt * 1000:.0f} мс" if session.rtt is not None else "-"
+            arcade.draw_text(
+                f"RTT {rtt_text} · задержка {session.input_delay} т · "
+                f"{sent:.0f} Б/с · рассинхронизаций {session.desyncs}",
+                10, SCREEN_HEIGHT - 50, arcade.color.LIGHT_GRAY, 11)
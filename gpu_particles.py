@@ -0,0 +1,208 @@
+"""Частицы, которые движутся на GPU
+
+Путь частицы известен заранее: постоянная скорость, гравитация GRAVITY
+и линейное угасание. Поэтому частица загружается в буфер один раз при
+появлении (время появления, точка, скорость, время жизни, размер, цвет),
+а положение и прозрачность в каждом кадре считает вершинный шейдер по
+прошедшему времени. Геометрический шейдер превращает точку в квадрат,
+фрагментный вырезает из него круг.
+
+Буфер кольцевой: вспышки записываются подряд и убираются целиком с начала
+кольца, когда истекает время жизни их последней частицы. На CPU в кадре
+нет работы, пропорциональной числу частиц.
+"""
+import collections
+import struct
+
+from arcade.gl import BufferDescription
+
+from particles import ParticleSystem, GRAVITY, random_burst
+
+# Сколько частиц помещается в кольцевой буфер. Если места не хватает,
+# самые старые вспышки перезаписываются раньше времени
+GPU_PARTICLE_CAPACITY = 32768
+# Частица в буфере: точка, скорость, время появления, время жизни, размер, цвет
+PARTICLE_FORMAT = struct.Struct('<7f4B')
+
+VERTEX_SHADER = """
+#version 330
+
+uniform float time;
+uniform float gravity;
+
+in vec2 in_origin;
+in vec2 in_velocity;
+in float in_spawn;
+in float in_lifetime;
+in float in_size;
+in vec4 in_color;
+
+out vec2 v_position;
+out float v_size;
+out vec4 v_color;
+
+void main() {
+    float t = time - in_spawn;
+    v_position = in_origin + in_velocity * t - vec2(0.0, 0.5 * gravity * t * t);
+    v_size = in_size;
+    // Линейное угасание; после конца жизни альфа становится отрицательной
+    v_color = vec4(in_color.rgb, in_color.a * (1.0 - t / in_lifetime));
+}
+"""
+
+GEOMETRY_SHADER = """
+#version 330
+
+layout (points) in;
+layout (triangle_strip, max_vertices = 4) out;
+
+uniform WindowBlock {
+    mat4 projection;
+    mat4 view;
+} window;
+
+in vec2 v_position[];
+in float v_size[];
+in vec4 v_color[];
+
+out vec2 g_offset;
+out vec4 g_color;
+
+void main() {
+    if (v_color[0].a <= 0.0) {
+        return;
+    }
+    mat4 mvp = window.projection * window.view;
+    vec2 corners[4] = vec2[4](vec2(-1.0, -1.0), vec2(1.0, -1.0),
+                              vec2(-1.0, 1.0), vec2(1.0, 1.0));
+    for (int i = 0; i < 4; i++) {
+        g_offset = corners[i];
+        g_color = v_color[0];
+        gl_Position = mvp * vec4(v_position[0] + corners[i] * v_size[0], 0.0, 1.0);
+        EmitVertex();
+    }
+    EndPrimitive();
+}
+"""
+
+FRAGMENT_SHADER = """
+#version 330
+
+in vec2 g_offset;
+in vec4 g_color;
+
+out vec4 fragColor;
+
+void main() {
+    if (dot(g_offset, g_offset) > 1.0) {
+        discard;
+    }
+    fragColor = g_color;
+}
+"""
+
+Burst = collections.namedtuple('Burst', 'start count expires')
+
+
+class GpuParticleSystem(ParticleSystem):
+    """Система частиц на GPU (тот же интерфейс, что у ParticleSystem)"""
+
+    def __init__(self, ctx, capacity=GPU_PARTICLE_CAPACITY):
+        super().__init__()
+        self.ctx = ctx
+        self.capacity = capacity
+        self.program = ctx.program(vertex_shader=VERTEX_SHADER,
+                                   geometry_shader=GEOMETRY_SHADER,
+                                   fragment_shader=FRAGMENT_SHADER)
+        self.program['gravity'] = float(GRAVITY)
+        self.buffer = ctx.buffer(reserve=capacity * PARTICLE_FORMAT.size)
+        self.geometry = ctx.geometry(
+            [BufferDescription(self.buffer, '2f 2f 1f 1f 1f 4f1',
+                               ['in_origin', 'in_velocity', 'in_spawn',
+                                'in_lifetime', 'in_size', 'in_color'])],
+            mode=ctx.POINTS)
+        self.time = 0.0
+        self.bursts = collections.deque()  # Живые вспышки в порядке записи
+        self.write_pos = 0                 # Куда пишется следующая вспышка
+        self.lap_end = 0                   # Конец записанного на прошлом круге
+        self.live = 0
+
+    def add_burst(self, x, y, color, count, burst, lifetime_scale=1.0):
+        """Записывает вспышку в буфер (единственная загрузка ее частиц)"""
+        count = min(count, self.capacity)
+        if count <= 0:
+            return
+        data = bytearray()
+        red, green, blue = color[:3]
+        alpha = color[3] if len(color) > 3 else 255
+        longest = 0.0
+        for velocity_x, velocity_y, lifetime, size in random_burst(
+                count, burst, lifetime_scale):
+            data += PARTICLE_FORMAT.pack(x, y, velocity_x, velocity_y, self.time,
+                                         lifetime, size, red, green, blue, alpha)
+            longest = max(longest, lifetime)
+
+        start = self._allocate(count)
+        self.buffer.write(data, offset=start * PARTICLE_FORMAT.size)
+        self.bursts.append(Burst(start, count, self.time + longest))
+        self.live += count
+
+    def _allocate(self, count):
+        """Место для count частиц в кольце; вспышки на этом месте убираются"""
+        if self.write_pos + count > self.capacity:
+            # Переходим на начало кольца; остаток прошлого круга самый старый
+            while self.bursts and self.bursts[0].start >= self.write_pos:
+                self._retire()
+            self.lap_end = self.write_pos
+            self.write_pos = 0
+        start = self.write_pos
+        end = start + count
+        while (self.bursts and self.bursts[0].start < end
+               and self.bursts[0].start >= start):
+            self._retire()
+        self.write_pos = end
+        return start
+
+    def _retire(self):
+        """Убирает самую старую вспышку"""
+        self.live -= self.bursts.popleft().count
+
+    def active_count(self):
+        """Количество частиц в живых вспышках"""
+        return self.live
+
+    def update(self, delta_time):
+        """Продвигает время и убирает истекшие вспышки с начала кольца"""
+        if self.budget:
+            self.budget.record_frame(delta_time)
+        self.time += delta_time
+        while self.bursts and self.bursts[0].expires <= self.time:
+            self._retire()
+        if not self.bursts:
+            # Буфер пуст - начинаем кольцо и отсчет времени заново
+            self.time = 0.0
+            self.write_pos = 0
+            self.lap_end = 0
+
+    def draw(self):
+        """Рисует живые вспышки одним-двумя вызовами отрисовки"""
+        if not self.bursts:
+            return
+        self.program['time'] = self.time
+        first = self.bursts[0].start
+        if first < self.write_pos:
+            self.geometry.render(self.program, first=first,
+                                 vertices=self.write_pos - first)
+        else:
+            # Живые вспышки переходят через конец кольца
+            self.geometry.render(self.program, first=first,
+                                 vertices=self.lap_end - first)
+            self.geometry.render(self.program, first=0, vertices=self.write_pos)
+
+    def clear(self):
+        """Убирает все частицы"""
+        self.bursts.clear()
+        self.live = 0
+        self.time = 0.0
+        self.write_pos = 0
+        self.lap_end = 0
@@ -0,0 +1,111 @@
+"""Кооперативный планировщик работ с бюджетом времени кадра
+
+Работа - генератор: каждый next() выполняет один шаг и возвращает
+управление. Дорогая логика (поиск места для яблока, перенос спрайтов
+очищенных столбцов, вспышки частиц) разбивается на шаги, которые
+выполняются после логики кадра, пока не кончится бюджет. Остаток
+переходит на следующий кадр.
+
+Работы выполняются по приоритетам. Игровые (CRITICAL) меняют состояние,
+которое читает следующий логический тик, поэтому перед тиком они
+доделываются целиком (finish), даже если бюджет кадра кончился.
+"""
+import collections
+import time
+
+CRITICAL = 0  # Игровая логика: доделывается до следующего логического тика
+NORMAL = 1    # Обычные работы
+COSMETIC = 2  # Украшения (частицы)
+PRIORITIES = (CRITICAL, NORMAL, COSMETIC)
+
+# Время на работы в кадре (в секундах)
+JOB_BUDGET = 0.002
+
+
+def call_job(func, *args, **kwargs):
+    """Работа из одного шага: вызов func"""
+    yield func(*args, **kwargs)
+
+
+class JobScheduler:
+    """Очереди работ по приоритетам, выполняемые в бюджете кадра"""
+
+    def __init__(self, deterministic=False):
+        """deterministic: игровые работы выполняются сразу при добавлении
+        (сетевая игра: состояние не должно зависеть от скорости кадров)"""
+        self.deterministic = deterministic
+        self.queues = tuple(collections.deque() for _ in PRIORITIES)
+        self.keys = set()  # Ключи работ в очереди (одна работа на ключ)
+        # Статистика
+        self.steps = 0         # Всего выполнено шагов
+        self.forced_steps = 0  # Шагов, доделанных перед тиком вне бюджета
+
+    def submit(self, job, priority=NORMAL, key=None):
+        """Добавляет работу-генератор; если работа с ключом key уже
+        в очереди, новая не добавляется. Возвращает True, если добавлена"""
+        if key is not None and key in self.keys:
+            job.close()
+            return False
+        if self.deterministic and priority == CRITICAL:
+            self.steps += self._exhaust(job)
+            return True
+        if key is not None:
+            self.keys.add(key)
+        self.queues[priority].append((job, key))
+        return True
+
+    def call(self, priority, func, *args, **kwargs):
+        """Откладывает вызов func(*args, **kwargs) как работу из одного шага"""
+        return self.submit(call_job(func, *args, **kwargs), priority)
+
+    def run(self, budget=JOB_BUDGET):
+        """Выполняет шаги работ по приоритетам, пока не кончится бюджет
+        (хотя бы один шаг). Возвращает количество выполненных шагов"""
+        deadline = time.perf_counter() + budget
+        steps = 0
+        for queue in self.queues:
+            while queue:
+                if steps and time.perf_counter() >= deadline:
+                    self.steps += steps
+                    return steps
+                job, key = queue[0]
+                try:
+                    next(job)
+                except StopIteration:
+                    queue.popleft()
+                    self.keys.discard(key)
+                steps += 1
+        self.steps += steps
+        return steps
+
+    def finish(self, priority=CRITICAL):
+        """Доделывает все работы с приоритетом priority и выше"""
+        for queue in self.queues[:priority + 1]:
+            while queue:
+                job, key = queue.popleft()
+                steps = self._exhaust(job)
+                self.keys.discard(key)
+                self.steps += steps
+                self.forced_steps += steps
+
+    def cancel(self):
+        """Отменяет все работы"""
+        for queue in self.queues:
+            for job, _ in queue:
+                job.close()
+            queue.clear()
+        self.keys.clear()
+
+    def _exhaust(self, job):
+        """Выполняет работу до конца; возвращает количество шагов"""
+        steps = 0
+        for _ in job:
+            steps += 1
+        return steps + 1
+
+    def pending(self):
+        """Количество работ в очереди"""
+        return sum(len(queue) for queue in self.queues)
+
+    def __len__(self):
+        return self.pending()
@@ -0,0 +1,169 @@
+"""Таблица рекордов по сложностям и история игр (SQLite)"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from persistence import store
+
+DATABASE_FILE = "scores.db"
+# Старый файл с единственным рекордом (переносится в базу при первом запуске)
+LEGACY_HIGH_SCORE_FILE = "high_score.json"
+# Сколько лучших результатов хранится для каждой сложности
+TOP_SCORES_LIMIT = 10
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scores (
+    id INTEGER PRIMARY KEY,
+    difficulty TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS scores_by_difficulty
+    ON scores (difficulty, score DESC);
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY,
+    difficulty TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    max_score INTEGER NOT NULL,
+    duration REAL NOT NULL,
+    lines INTEGER NOT NULL,
+    columns INTEGER NOT NULL,
+    apples INTEGER NOT NULL,
+    cause TEXT,
+    created_at REAL NOT NULL
+);
+"""
+
+# Запросы - константные строки, поэтому sqlite3 подготавливает их один раз
+# и дальше берет из кэша подготовленных выражений соединения
+INSERT_SCORE = "INSERT INTO scores (difficulty, score, created_at) VALUES (?, ?, ?)"
+INSERT_GAME = (
+    "INSERT INTO games (difficulty, score, max_score, duration, lines, columns,"
+    " apples, cause, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+TRIM_SCORES = (
+    "DELETE FROM scores WHERE difficulty = ? AND id NOT IN"
+    " (SELECT id FROM scores WHERE difficulty = ? ORDER BY score DESC LIMIT ?)"
+)
+SELECT_TOP_SCORES = (
+    "SELECT difficulty, score FROM scores ORDER BY difficulty, score DESC"
+)
+
+
+class ScoreStore:
+    """Хранилище рекордов
+
+    Результаты игр копятся в памяти и записываются в базу одной транзакцией
+    в фоновом потоке сохранения. Лучшие результаты читаются из базы одним
+    запросом при первом обращении, а дальше обновляются в памяти.
+    """
+
+    def __init__(self, path=DATABASE_FILE):
+        self.path = path
+        self._conn = None
+        # _lock защищает данные в памяти, _db_lock - соединение с базой:
+        # запись в фоне не держит _lock, пока идет транзакция
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._pending_games = []
+        self._top_cache = None  # сложность -> список лучших результатов
+
+    def _connect(self):
+        """Открывает базу данных (вызывается под _db_lock)"""
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+            self._import_legacy_high_score()
+        return self._conn
+
+    def _import_legacy_high_score(self):
+        """Переносит рекорд из high_score.json в пустую базу"""
+        if self._conn.execute("SELECT 1 FROM scores LIMIT 1").fetchone():
+            return
+        if not os.path.exists(LEGACY_HIGH_SCORE_FILE):
+            return
+        try:
+            with open(LEGACY_HIGH_SCORE_FILE, 'r', encoding='utf-8') as f:
+                legacy_score = int(json.load(f).get('high_score', 0))
+        except (OSError, ValueError, AttributeError):
+            return
+        if legacy_score > 0:
+            # Старый рекорд был общим, считаем его рекордом средней сложности
+            with self._conn:
+                self._conn.execute(
+                    INSERT_SCORE, ('medium', legacy_score, time.time()))
+
+    def top_scores(self, difficulty, limit=TOP_SCORES_LIMIT):
+        """Возвращает лучшие результаты для сложности"""
+        return self._get_top_cache().get(difficulty, [])[:limit]
+
+    def best_score(self, difficulty):
+        """Возвращает рекорд для сложности"""
+        scores = self.top_scores(difficulty, 1)
+        return scores[0] if scores else 0
+
+    def _get_top_cache(self):
+        """Загружает лучшие результаты всех сложностей одним запросом"""
+        with self._lock:
+            if self._top_cache is not None:
+                return self._top_cache
+        with self._db_lock:
+            try:
+                rows = self._connect().execute(SELECT_TOP_SCORES).fetchall()
+            except sqlite3.Error:
+                rows = []
+        cache = {}
+        for difficulty, score in rows:
+            cache.setdefault(difficulty, []).append(score)
+        with self._lock:
+            if self._top_cache is None:
+                self._top_cache = cache
+            return self._top_cache
+
+    def record_game(self, difficulty, score, max_score, duration,
+                    lines, columns, apples, cause):
+        """Запоминает итог игры и планирует запись в базу в фоновом потоке"""
+        # Сразу обновляем кэш, чтобы меню показало новый рекорд без запроса
+        top = self._get_top_cache().setdefault(difficulty, [])
+        with self._lock:
+            top.append(max_score)
+            top.sort(reverse=True)
+            del top[TOP_SCORES_LIMIT:]
+            self._pending_games.append((
+                difficulty, score, max_score, duration,
+                lines, columns, apples, cause, time.time()
+            ))
+        store.schedule(self.path, self.flush)
+        store.request_flush()
+
+    def flush(self):
+        """Записывает накопленные игры одной транзакцией"""
+        with self._lock:
+            games = self._pending_games
+            self._pending_games = []
+        if not games:
+            return
+        try:
+            with self._db_lock:
+                conn = self._connect()
+                with conn:
+                    conn.executemany(INSERT_GAME, games)
+                    conn.executemany(
+                        INSERT_SCORE,
+                        [(game[0], game[2], game[8]) for game in games])
+                    for difficulty in {game[0] for game in games}:
+                        conn.execute(TRIM_SCORES, (
+                            difficulty, difficulty, TOP_SCORES_LIMIT))
+        except sqlite3.Error:
+            # Не потеряем результаты - попробуем записать в следующий раз
+            with self._lock:
+                self._pending_games = games + self._pending_games
+            store.schedule(self.path, self.flush)
+
+
+# Общее хранилище рекордов (база открывается при первом обращении)
+scores = ScoreStore()
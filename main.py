@@ -1,18 +1,63 @@
-"""Главный файл запуска игры"""
-import arcade
-from menu import MainMenuView
-from constants import SCREEN_WIDTH, SCREEN_HEIGHT
+"""Главный файл запуска игры
+
+Тяжелые модули импортируются внутри main (и замеряются для
+--startup-report); модуль игры, звуки и текстуры загружаются в фоне,
+пока показывается меню.
+"""
+import argparse
+from startup import report, start_warm_up
+
+
+def parse_args(argv=None):
+    """Разбирает аргументы командной строки"""
+    parser = argparse.ArgumentParser(description="Тетрис со змейкой")
+    parser.add_argument('--connect', metavar='HOST:PORT',
+                        help="сетевая игра через relay-сервер (relay_server.py)")
+    parser.add_argument('--room', default='default', help="комната на сервере")
+    parser.add_argument('--difficulty', default='medium',
+                        choices=('easy', 'medium', 'hard'),
+                        help="сложность сетевой игры (выбирает первый игрок)")
+    parser.add_argument('--startup-report', action='store_true',
+                        help="напечатать время импортов, первого кадра и прогрева")
+    return parser.parse_args(argv)
 
 
 def main():
     """Главная функция"""
-    # Ограничиваем частоту отрисовки до 60 FPS для предотвращения лагов при перетаскивании окна
-    window = arcade.Window(SCREEN_WIDTH, SCREEN_HEIGHT,
-                           "Тетрис со змейкой", draw_rate=1/60.0)
-    # Ограничиваем частоту обновления до 60 FPS для стабильной производительности
-    window.set_update_rate(1 / 60.0)
-    menu_view = MainMenuView()
-    window.show_view(menu_view)
+    args = parse_args()
+    report.enabled = args.startup_report
+    with report.measure('import arcade'):
+        import arcade
+    with report.measure('import menu'):
+        from menu import MainMenuView, NetplayWaitView, load_settings
+        from constants import SCREEN_WIDTH, SCREEN_HEIGHT
+    with report.measure('настройки'):
+        settings = load_settings()
+    # Частота отрисовки берется из настроек. Логика игры идет фиксированными
+    # тиками и не зависит от нее, а между тиками картинка интерполируется,
+    # поэтому на мониторах 120-144 Гц можно поднять target_fps или включить vsync
+    target_fps = max(1, int(settings.get('target_fps', 60)))
+    frame_interval = 1 / float(target_fps)
+    with report.measure('окно'):
+        window = arcade.Window(SCREEN_WIDTH, SCREEN_HEIGHT,
+                               "Тетрис со змейкой",
+                               draw_rate=frame_interval,
+                               vsync=bool(settings.get('vsync', False)))
+    # Обновление идет с той же частотой, что и отрисовка, чтобы доля
+    # интерполяции пересчитывалась к каждому кадру
+    window.set_update_rate(frame_interval)
+    with report.measure('первый экран'):
+        if args.connect:
+            from netplay import LockstepSession, DEFAULT_PORT
+            host, _, port = args.connect.partition(':')
+            session = LockstepSession()
+            session.connect(host, int(port or DEFAULT_PORT), args.room, args.difficulty)
+            window.show_view(NetplayWaitView(session))
+        else:
+            menu_view = MainMenuView()
+            window.show_view(menu_view)
+    # Модуль игры, звуки и текстуры готовятся, пока показывается меню
+    start_warm_up()
     arcade.run()
 
 
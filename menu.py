@@ -2,29 +2,72 @@
 import arcade
 import json
 import os
-from constants import SCREEN_WIDTH, SCREEN_HEIGHT
+from constants import SCREEN_WIDTH, SCREEN_HEIGHT, MAX_SNAKES
+from persistence import store
+from leaderboard import scores
+from startup import report
 
-HIGH_SCORE_FILE = "high_score.json"
 SETTINGS_FILE = "settings.json"
-
-
-def load_high_score():
-    """Загружает рекорд из файла"""
-    if os.path.exists(HIGH_SCORE_FILE):
-        try:
-            with open(HIGH_SCORE_FILE, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                return data.get('high_score', 0)
-        except:
-            return 0
-    return 0
+# Настройки по умолчанию (значения из settings.json их дополняют)
+DEFAULT_SETTINGS = {
+    'camera_follow_snake': False,
+    # Частота отрисовки (кадров в секунду) и вертикальная синхронизация
+    'target_fps': 60,
+    'vsync': False,
+    # Плавная отрисовка между логическими тиками
+    'render_interpolation': True,
+    # Отрисовка поля: immediate (каждый кадр заново) или batched (чанками)
+    'render_mode': 'immediate',
+    # Большая арена (размер в клетках, не больше 200x400)
+    'big_arena': False,
+    'arena_width': 100,
+    'arena_height': 200,
+    # Количество змеек на поле (1-4, у каждой свои клавиши)
+    'snake_count': 1,
+    # Телеметрия логических тиков: формат jsonl или csv, ротация по размеру
+    'telemetry_enabled': False,
+    'telemetry_format': 'jsonl',
+    'telemetry_path': '',
+    'telemetry_max_bytes': 5000000,
+    'telemetry_backups': 3,
+    # Если змейка одна и ее очередь поворотов пуста, нажатие в первые
+    # input_grace_ms после хода выполняет следующий ход сразу (0 - выключено)
+    'input_grace_ms': 0,
+    # Размещение фигур поиском на 2 хода (с учетом следующей фигуры);
+    # false - прежний выбор по самому заполненному ряду
+    'placement_planner': True,
+    # Появление следующей фигуры считается в фоновом потоке, пока падает текущая
+    'spawn_speculation': True,
+    # Змейками управляет автопилот (A* к яблоку с проверкой пути к хвосту)
+    'autopilot': False,
+    # Частицы на GPU (если видеокарта не поддерживает - на CPU)
+    'gpu_particles': True,
+    # Жесткий лимит живых частиц (при нехватке времени кадра украшения
+    # урезаются раньше, чем он будет достигнут)
+    'max_particles': 4000,
+    # Трансляция игры зрителям: "хост:порт" или "unix:путь" ('' - выключена)
+    'spectator_address': ''
+}
+
+# Настройки читаются из файла один раз за запуск (save_settings обновляет копию)
+_settings_cache = None
 
 
 def load_settings():
-    """Загружает настройки из файла"""
-    default_settings = {
-        'camera_follow_snake': False
-    }
+    """Загружает настройки (файл читается при первом вызове)"""
+    global _settings_cache
+    if _settings_cache is None:
+        _settings_cache = _read_settings()
+    return dict(_settings_cache)
+
+
+def _read_settings():
+    """Читает настройки из файла"""
+    default_settings = dict(DEFAULT_SETTINGS)
+    pending = store.get(SETTINGS_FILE)
+    if pending is not None:
+        default_settings.update(pending)
+        return default_settings
     if os.path.exists(SETTINGS_FILE):
         try:
             with open(SETTINGS_FILE, 'r', encoding='utf-8') as f:
@@ -38,12 +81,10 @@ def load_settings():
 
 
 def save_settings(settings):
-    """Сохраняет настройки в файл"""
-    try:
-        with open(SETTINGS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(settings, f, ensure_ascii=False, indent=2)
-    except:
-        pass
+    """Сохраняет настройки в файл (в фоновом потоке)"""
+    global _settings_cache
+    _settings_cache = dict(settings)
+    store.put(SETTINGS_FILE, settings, indent=2)
 
 
 class Button:
@@ -102,8 +143,11 @@ class MainMenuView(arcade.View):
         super().__init__()
         arcade.set_background_color((20, 25, 40))
 
-        # Загружаем рекорд
-        self.high_score = load_high_score()
+        # Рекорды по сложностям (из кэша, база читается один раз за запуск)
+        self.high_scores = {
+            difficulty: scores.best_score(difficulty)
+            for difficulty in ('easy', 'medium', 'hard')
+        }
 
         # Создаем кнопки выбора сложности
         button_y_start = SCREEN_HEIGHT // 2 + 40
@@ -145,6 +189,7 @@ class MainMenuView(arcade.View):
     def on_draw(self):
         """Отрисовка меню"""
         self.clear()
+        report.frame_drawn()
 
         # Заголовок
         arcade.draw_text(
@@ -171,11 +216,13 @@ class MainMenuView(arcade.View):
             anchor_x="center", anchor_y="center"
         )
 
-        # Рекорд
+        # Рекорды по сложностям
         arcade.draw_text(
-            f"Рекорд: {self.high_score}",
+            f"Рекорды: Л {self.high_scores['easy']} · "
+            f"С {self.high_scores['medium']} · "
+            f"Т {self.high_scores['hard']}",
             SCREEN_WIDTH // 2, SCREEN_HEIGHT - 300,
-            arcade.color.GOLD, 20,
+            arcade.color.GOLD, 18,
             anchor_x="center", anchor_y="center",
             bold=True
         )
@@ -198,17 +245,14 @@ class MainMenuView(arcade.View):
         """Обработка нажатия мыши"""
         if button == arcade.MOUSE_BUTTON_LEFT:
             if self.easy_button.contains_point(x, y):
-                from game import GameView
-                game_view = GameView(difficulty='easy')
-                self.window.show_view(game_view)
+                from game import start_game
+                self.window.show_view(start_game('easy'))
             elif self.medium_button.contains_point(x, y):
-                from game import GameView
-                game_view = GameView(difficulty='medium')
-                self.window.show_view(game_view)
+                from game import start_game
+                self.window.show_view(start_game('medium'))
             elif self.hard_button.contains_point(x, y):
-                from game import GameView
-                game_view = GameView(difficulty='hard')
-                self.window.show_view(game_view)
+                from game import start_game
+                self.window.show_view(start_game('hard'))
             elif self.settings_button.contains_point(x, y):
                 settings_view = SettingsView()
                 self.window.show_view(settings_view)
@@ -217,10 +261,22 @@ class MainMenuView(arcade.View):
 class GameOverView(arcade.View):
     """Экран проигрыша"""
 
-    def __init__(self, score=0):
+    def __init__(self, score=0, game_view=None):
+        """game_view: экран законченной локальной игры ("играть снова"
+        начинает новую игру на нем же); None - кнопки нет"""
         super().__init__()
         arcade.set_background_color((40, 20, 20))
         self.score = score
+        self.game_view = game_view
+
+        # Кнопка новой игры той же сложности
+        self.play_again_button = Button(
+            SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 20,
+            300, 60,
+            "ИГРАТЬ СНОВА",
+            (50, 150, 50),
+            (70, 200, 70)
+        )
 
         # Кнопка возврата в меню
         self.menu_button = Button(
@@ -260,20 +316,35 @@ class GameOverView(arcade.View):
             anchor_x="center", anchor_y="center"
         )
 
-        # Кнопка
+        # Кнопки
+        if self.game_view:
+            self.play_again_button.draw()
         self.menu_button.draw()
 
     def on_mouse_motion(self, x, y, dx, dy):
         """Обработка движения мыши"""
+        self.play_again_button.is_hovered = self.play_again_button.contains_point(x, y)
         self.menu_button.is_hovered = self.menu_button.contains_point(x, y)
 
     def on_mouse_press(self, x, y, button, modifiers):
         """Обработка нажатия мыши"""
         if button == arcade.MOUSE_BUTTON_LEFT:
-            if self.menu_button.contains_point(x, y):
+            if self.game_view and self.play_again_button.contains_point(x, y):
+                self.play_again()
+            elif self.menu_button.contains_point(x, y):
                 menu_view = MainMenuView()
                 self.window.show_view(menu_view)
 
+    def on_key_press(self, key, modifiers):
+        """Enter - играть снова"""
+        if self.game_view and key in (arcade.key.ENTER, arcade.key.RETURN):
+            self.play_again()
+
+    def play_again(self):
+        """Новая игра той же сложности на прежнем экране игры"""
+        from game import start_game
+        self.window.show_view(start_game(self.game_view.difficulty))
+
 
 class ToggleButton(Button):
     """Кнопка-переключатель для настроек"""
@@ -341,15 +412,39 @@ class SettingsView(arcade.View):
         self.camera_button.is_active = self.settings.get(
             'camera_follow_snake', False)
 
+        # Кнопка большой арены
+        self.arena_button = ToggleButton(
+            SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 25,
+            450, 60,
+            "Большая арена",
+            (100, 100, 150),
+            (130, 130, 200),
+            (50, 200, 50)  # Зеленый когда активно
+        )
+        self.arena_button.is_active = self.settings.get('big_arena', False)
+
+        # Кнопка количества змеек (переключается по кругу 1-4)
+        self.snakes_button = Button(
+            SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 100,
+            450, 60,
+            self._snakes_text(),
+            (100, 100, 150),
+            (130, 130, 200)
+        )
+
         # Кнопка возврата в меню
         self.back_button = Button(
-            SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 100,
+            SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 185,
             300, 60,
             "НАЗАД",
             (150, 50, 50),
             (200, 70, 70)
         )
 
+    def _snakes_text(self):
+        """Надпись кнопки количества змеек"""
+        return f"Змеек на поле: {self.settings.get('snake_count', 1)}"
+
     def on_draw(self):
         """Отрисовка экрана настроек"""
         self.clear()
@@ -365,11 +460,15 @@ class SettingsView(arcade.View):
 
         # Кнопки
         self.camera_button.draw()
+        self.arena_button.draw()
+        self.snakes_button.draw()
         self.back_button.draw()
 
     def on_mouse_motion(self, x, y, dx, dy):
         """Обработка движения мыши"""
         self.camera_button.is_hovered = self.camera_button.contains_point(x, y)
+        self.arena_button.is_hovered = self.arena_button.contains_point(x, y)
+        self.snakes_button.is_hovered = self.snakes_button.contains_point(x, y)
         self.back_button.is_hovered = self.back_button.contains_point(x, y)
 
     def on_mouse_press(self, x, y, button, modifiers):
@@ -380,6 +479,45 @@ class SettingsView(arcade.View):
                 self.camera_button.is_active = not self.camera_button.is_active
                 self.settings['camera_follow_snake'] = self.camera_button.is_active
                 save_settings(self.settings)
+            elif self.arena_button.contains_point(x, y):
+                self.arena_button.is_active = not self.arena_button.is_active
+                self.settings['big_arena'] = self.arena_button.is_active
+                save_settings(self.settings)
+            elif self.snakes_button.contains_point(x, y):
+                count = self.settings.get('snake_count', 1) % MAX_SNAKES + 1
+                self.settings['snake_count'] = count
+                self.snakes_button.text = self._snakes_text()
+                save_settings(self.settings)
             elif self.back_button.contains_point(x, y):
                 menu_view = MainMenuView()
                 self.window.show_view(menu_view)
+
+
+class NetplayWaitView(arcade.View):
+    """Ожидание второго игрока сетевой игры"""
+
+    def __init__(self, session):
+        super().__init__()
+        arcade.set_background_color((20, 25, 40))
+        self.session = session
+
+    def on_update(self, delta_time):
+        """Ждем начала партии от сервера"""
+        self.session.poll()
+        if self.session.started:
+            from game import GameView
+            self.window.show_view(GameView(netplay=self.session))
+        elif self.session.closed:
+            self.window.show_view(MainMenuView())
+
+    def on_draw(self):
+        """Отрисовка экрана ожидания"""
+        self.clear()
+        report.frame_drawn()
+        arcade.draw_text(
+            "Ожидание второго игрока...",
+            SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2,
+            arcade.color.WHITE, 28,
+            anchor_x="center", anchor_y="center",
+            bold=True
+        )
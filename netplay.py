@@ -0,0 +1,341 @@
+"""Сетевая игра вдвоем в режиме lockstep
+
+По сети передаются только нажатия клавиш с номером тика, на котором они
+применяются. Обе стороны моделируют игру одинаково (общее зерно случайных
+чисел и фиксированный шаг NET_TICK), поэтому само состояние не передается.
+Раз в HASH_INTERVAL тиков стороны обмениваются контрольными суммами состояния.
+При расхождении игрок 0 отправляет полное состояние, сжатое как XOR
+с последним совпавшим состоянием и zlib.
+
+Модуль не зависит от arcade: его протокол использует и relay_server.py.
+"""
+import math
+import queue
+import socket
+import struct
+import threading
+import time
+import zlib
+
+from constants import NET_TICK, HASH_INTERVAL
+
+DEFAULT_PORT = 7777
+
+# Типы сообщений (первый байт сообщения)
+MSG_HELLO = 1    # клиент -> сервер: комната и сложность
+MSG_START = 2    # сервер -> клиент: зерно, номер игрока, число игроков, сложность
+MSG_INPUT = 3    # тик, игрок, направление
+MSG_HASH = 4     # тик, эпоха, контрольная сумма состояния
+MSG_RESYNC = 5   # тик, эпоха, базовый тик, сжатое состояние
+MSG_PING = 6     # игрок, время отправки
+MSG_PONG = 7     # ответ на PING (то же содержимое)
+MSG_LEFT = 8     # сервер -> клиент: другой игрок отключился
+
+INPUT_FORMAT = struct.Struct('!BIBB')
+HASH_FORMAT = struct.Struct('!BIHI')
+RESYNC_HEADER = struct.Struct('!BIHi')
+PING_FORMAT = struct.Struct('!BBd')
+START_HEADER = struct.Struct('!BIBB')
+FRAME_HEADER = struct.Struct('!H')
+
+NO_INPUT = 255
+# Задержка ввода в тиках (подстраивается под время приема-передачи)
+MIN_INPUT_DELAY = 2
+MAX_INPUT_DELAY = 10
+PING_INTERVAL = 1.0
+# Сколько последних состояний хранится для сравнения контрольных сумм
+SNAPSHOTS_KEPT = 4
+
+
+def encode_frame(payload):
+    """Добавляет к сообщению двухбайтовую длину"""
+    return FRAME_HEADER.pack(len(payload)) + payload
+
+
+class FrameReader:
+    """Собирает сообщения из потока байтов"""
+
+    def __init__(self, header=FRAME_HEADER):
+        """header: формат длины перед сообщением"""
+        self.header = header
+        self.buffer = bytearray()
+
+    def feed(self, data):
+        """Добавляет данные и возвращает список готовых сообщений"""
+        self.buffer.extend(data)
+        frames = []
+        header = self.header
+        while len(self.buffer) >= header.size:
+            (length,) = header.unpack_from(self.buffer)
+            end = header.size + length
+            if len(self.buffer) < end:
+                break
+            frames.append(bytes(self.buffer[header.size:end]))
+            del self.buffer[:end]
+        return frames
+
+
+def xor_bytes(data, base):
+    """XOR данных с базой (база дополняется нулями или обрезается)"""
+    size = len(data)
+    base = base[:size].ljust(size, b'\0')
+    value = int.from_bytes(data, 'big') ^ int.from_bytes(base, 'big')
+    return value.to_bytes(size, 'big')
+
+
+def delta_encode(state, base):
+    """Сжимает состояние относительно базы: почти одинаковые байты дают нули"""
+    return struct.pack('!I', len(state)) + zlib.compress(xor_bytes(state, base), 9)
+
+
+def delta_decode(payload, base):
+    """Восстанавливает состояние из delta_encode"""
+    (size,) = struct.unpack_from('!I', payload)
+    return xor_bytes(zlib.decompress(payload[4:]), base)[:size]
+
+
+class LockstepSession:
+    """Соединение с relay-сервером и буфер ввода для lockstep
+
+    Сокет читается в фоновом потоке, а все сообщения обрабатываются в poll()
+    из игрового цикла, поэтому состояние сессии меняет только один поток.
+    """
+
+    def __init__(self):
+        self.sock = None
+        self.player = 0
+        self.players = 2
+        self.seed = 0
+        self.difficulty = 'medium'
+        self.started = False
+        self.closed = False
+        self.peer_left = False
+
+        self.tick = 0                       # Следующий тик моделирования
+        self.input_delay = MIN_INPUT_DELAY
+        self.next_send_tick = MIN_INPUT_DELAY  # Ввод для более ранних тиков пустой
+        self.local_inputs = []              # Нажатия, еще не назначенные тику
+        self.inputs = {}                    # тик -> {игрок: направление}
+
+        self.epoch = 0                      # Номер ресинхронизации
+        self.local_hashes = {}              # тик -> контрольная сумма
+        self.remote_hashes = {}
+        self.snapshots = {}                 # тик -> состояние (для базы дельты)
+        self.base_tick = -1
+        self.base_state = b''
+        self.resync_needed = False          # Игроку 0 нужно отправить состояние
+        self.resync = None                  # Полученное состояние (тик, байты)
+        self.desyncs = 0
+
+        self.rtt = None
+        self.rtt_var = 0.0
+        self._last_ping = 0.0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.started_at = None
+        self._incoming = queue.SimpleQueue()
+
+    # --- соединение ---------------------------------------------------------
+
+    def connect(self, host, port, room, difficulty='medium'):
+        """Подключается к серверу и входит в комнату"""
+        self.sock = socket.create_connection((host, port))
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        threading.Thread(target=self._read_loop, name='netplay', daemon=True).start()
+        room_bytes = room.encode('utf-8')[:255]
+        self._send(struct.pack('!BB', MSG_HELLO, len(room_bytes))
+                   + room_bytes + difficulty.encode('ascii'))
+
+    def close(self):
+        """Закрывает соединение"""
+        self.closed = True
+        if self.sock:
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+
+    def _read_loop(self):
+        """Фоновый поток: читает сообщения из сокета"""
+        reader = FrameReader()
+        try:
+            while True:
+                data = self.sock.recv(4096)
+                if not data:
+                    break
+                self.bytes_received += len(data)
+                for frame in reader.feed(data):
+                    self._incoming.put(frame)
+        except OSError:
+            pass
+        self._incoming.put(None)
+
+    def _send(self, payload):
+        """Отправляет сообщение (ошибка записи означает разрыв соединения)"""
+        frame = encode_frame(payload)
+        try:
+            self.sock.sendall(frame)
+            self.bytes_sent += len(frame)
+        except OSError:
+            self.closed = True
+
+    def poll(self):
+        """Обрабатывает пришедшие сообщения (вызывается каждый кадр)"""
+        while True:
+            try:
+                frame = self._incoming.get_nowait()
+            except queue.Empty:
+                break
+            if frame is None:
+                self.closed = True
+                break
+            self._handle(frame)
+
+        now = time.monotonic()
+        if self.started and now - self._last_ping >= PING_INTERVAL:
+            self._last_ping = now
+            self._send(PING_FORMAT.pack(MSG_PING, self.player, now))
+
+    def _handle(self, frame):
+        """Обрабатывает одно сообщение"""
+        kind = frame[0]
+        if kind == MSG_INPUT:
+            _, tick, player, direction = INPUT_FORMAT.unpack(frame)
+            self.inputs.setdefault(tick, {})[player] = direction
+        elif kind == MSG_HASH:
+            _, tick, epoch, crc = HASH_FORMAT.unpack(frame)
+            if epoch == self.epoch:
+                self.remote_hashes[tick] = crc
+                self._compare_hashes(tick)
+        elif kind == MSG_RESYNC:
+            _, tick, epoch, base_tick = RESYNC_HEADER.unpack_from(frame)
+            base = self.snapshots.get(base_tick, b'') if base_tick >= 0 else b''
+            self.epoch = epoch
+            self.resync = (tick, delta_decode(frame[RESYNC_HEADER.size:], base))
+        elif kind == MSG_PING:
+            self._send(bytes([MSG_PONG]) + frame[1:])
+        elif kind == MSG_PONG:
+            _, player, sent_at = PING_FORMAT.unpack(frame)
+            if player == self.player:
+                self._add_rtt_sample(time.monotonic() - sent_at)
+        elif kind == MSG_START:
+            _, self.seed, self.player, self.players = START_HEADER.unpack_from(frame)
+            self.difficulty = frame[START_HEADER.size:].decode('ascii') or 'medium'
+            self.started = True
+            self.started_at = time.monotonic()
+        elif kind == MSG_LEFT:
+            self.peer_left = True
+
+    def _add_rtt_sample(self, sample):
+        """Сглаживает время приема-передачи и пересчитывает задержку ввода"""
+        if self.rtt is None:
+            self.rtt = sample
+            self.rtt_var = sample / 2
+        else:
+            self.rtt_var = 0.75 * self.rtt_var + 0.25 * abs(self.rtt - sample)
+            self.rtt = 0.875 * self.rtt + 0.125 * sample
+        # Ввод должен дойти до соперника раньше, чем тот дойдет до этого тика
+        one_way = self.rtt / 2 + 2 * self.rtt_var
+        delay = math.ceil(one_way / NET_TICK) + 1
+        self.input_delay = max(MIN_INPUT_DELAY, min(MAX_INPUT_DELAY, delay))
+
+    # --- тики ---------------------------------------------------------------
+
+    def add_local_input(self, direction):
+        """Запоминает нажатие локального игрока (будет отправлено с ближайшим тиком)"""
+        self.local_inputs.append(direction)
+
+    def ready(self):
+        """Пришел ли ввод всех игроков для следующего тика"""
+        # Уже пришедший ввод доигрывается и после отключения соперника
+        if not self.started:
+            return False
+        if self.tick < MIN_INPUT_DELAY:
+            return True
+        return len(self.inputs.get(self.tick, ())) >= self.players
+
+    def begin_tick(self):
+        """Отправляет свой ввод на будущие тики и возвращает ввод текущего тика
+
+        Возвращает список (игрок, направление) в порядке номеров игроков.
+        """
+        target = self.tick + self.input_delay
+        # Номер тика отправки только растет: при уменьшении задержки ждем,
+        # при увеличении заполняем пропущенные тики
+        while self.next_send_tick <= target:
+            direction = self.local_inputs.pop(0) if self.local_inputs else NO_INPUT
+            tick = self.next_send_tick
+            self.inputs.setdefault(tick, {})[self.player] = direction
+            self._send(INPUT_FORMAT.pack(MSG_INPUT, tick, self.player, direction))
+            self.next_send_tick += 1
+
+        tick_inputs = self.inputs.get(self.tick, {})
+        # Старый ввод нужен только для повторного моделирования после ресинхронизации
+        self.inputs.pop(self.tick - 2 * MAX_INPUT_DELAY, None)
+        return [(player, tick_inputs[player]) for player in sorted(tick_inputs)
+                if tick_inputs[player] != NO_INPUT]
+
+    def end_tick(self, get_state):
+        """Завершает тик; на тиках сверки отправляет контрольную сумму состояния"""
+        tick = self.tick
+        self.tick += 1
+        if tick % HASH_INTERVAL:
+            return
+        state = get_state()
+        crc = zlib.crc32(state)
+        self.local_hashes[tick] = crc
+        self.snapshots[tick] = state
+        for old_tick in [t for t in self.snapshots if t < tick - HASH_INTERVAL * SNAPSHOTS_KEPT]:
+            if old_tick != self.base_tick:
+                del self.snapshots[old_tick]
+        self._send(HASH_FORMAT.pack(MSG_HASH, tick, self.epoch, crc))
+        self._compare_hashes(tick)
+
+    def _compare_hashes(self, tick):
+        """Сравнивает контрольные суммы тика, если известны обе"""
+        local = self.local_hashes.get(tick)
+        remote = self.remote_hashes.get(tick)
+        if local is None or remote is None:
+            return
+        del self.local_hashes[tick]
+        del self.remote_hashes[tick]
+        if local == remote:
+            # Совпавшее состояние - база для сжатия следующей ресинхронизации
+            if tick > self.base_tick and tick in self.snapshots:
+                self.base_tick = tick
+                self.base_state = self.snapshots[tick]
+        else:
+            self.desyncs += 1
+            if self.player == 0:
+                self.resync_needed = True
+
+    def send_resync(self, state):
+        """Игрок 0: отправляет полное состояние на начало тика self.tick"""
+        self.resync_needed = False
+        self.epoch = (self.epoch + 1) & 0xFFFF
+        header = RESYNC_HEADER.pack(MSG_RESYNC, self.tick, self.epoch, self.base_tick)
+        self._send(header + delta_encode(state, self.base_state))
+        self._reset_hashes(self.tick, state)
+
+    def take_resync(self):
+        """Игрок 1: возвращает полученное состояние (тик, байты) и переходит на него"""
+        tick, state = self.resync
+        self.resync = None
+        self.tick = tick
+        self._reset_hashes(tick, state)
+        return tick, state
+
+    def _reset_hashes(self, tick, state):
+        """После ресинхронизации старые контрольные суммы не сравниваются"""
+        self.local_hashes.clear()
+        self.remote_hashes.clear()
+        self.snapshots = {tick: state}
+        self.base_tick = tick
+        self.base_state = state
+
+    def bandwidth(self):
+        """Средний исходящий и входящий трафик (байт в секунду)"""
+        if not self.started_at:
+            return 0.0, 0.0
+        elapsed = max(1e-6, time.monotonic() - self.started_at)
+        return self.bytes_sent / elapsed, self.bytes_received / elapsed
@@ -0,0 +1,68 @@
+"""Общий индекс занятости клеток змейками"""
+
+
+class OccupancyIndex:
+    """Для каждой клетки хранит, какая змейка и какой ее сегмент в ней находится
+
+    В клетке лежит номер змейки и метка хода, на котором сегмент вошел в клетку.
+    Номер сегмента (0 - голова) - это разность метки головы змейки и метки
+    клетки, поэтому при движении меняются только клетки новой головы и
+    убранного хвоста. Проверка "голова против чего угодно" - один поиск в словаре,
+    сколько бы змеек ни было на поле.
+    """
+
+    def __init__(self):
+        self.cells = {}        # (x, y) -> (номер змейки, метка хода)
+        self.head_stamps = {}  # номер змейки -> метка хода головы
+
+    def add_snake(self, snake_id, body):
+        """Добавляет змейку (body[0] - голова)"""
+        head_stamp = len(body) - 1
+        self.head_stamps[snake_id] = head_stamp
+        for index, cell in enumerate(body):
+            self.cells[cell] = (snake_id, head_stamp - index)
+
+    def remove_snake(self, snake_id, body):
+        """Убирает змейку с поля"""
+        self.release(snake_id, body)
+        self.head_stamps.pop(snake_id, None)
+
+    def release(self, snake_id, cells):
+        """Освобождает клетки змейки (например, отрубленную часть тела)"""
+        for cell in cells:
+            entry = self.cells.get(cell)
+            if entry is not None and entry[0] == snake_id:
+                del self.cells[cell]
+
+    def move_head(self, snake_id, head, removed_tail=None):
+        """Учитывает ход змейки: освобождает хвост и занимает клетку головы
+
+        Возвращает (номер змейки, номер сегмента), который уже был в клетке
+        новой головы, или None. Занятую клетку голова не перезаписывает -
+        такая змейка все равно погибает.
+        """
+        if removed_tail is not None:
+            self.release(snake_id, (removed_tail,))
+        previous = self.get(head)
+        stamp = self.head_stamps[snake_id] + 1
+        self.head_stamps[snake_id] = stamp
+        if previous is None:
+            self.cells[head] = (snake_id, stamp)
+        return previous
+
+    def grow(self, snake_id, tail, length):
+        """Возвращает хвост на место, когда змейка выросла (length - новая длина)"""
+        if tail not in self.cells:
+            self.cells[tail] = (snake_id, self.head_stamps[snake_id] - (length - 1))
+
+    def get(self, cell):
+        """Возвращает (номер змейки, номер сегмента) в клетке или None"""
+        entry = self.cells.get(cell)
+        if entry is None:
+            return None
+        snake_id, stamp = entry
+        return snake_id, self.head_stamps[snake_id] - stamp
+
+    def is_occupied(self, x, y):
+        """Проверяет, занята ли клетка какой-нибудь змейкой"""
+        return (x, y) in self.cells
@@ -2,12 +2,102 @@
 import arcade
 import random
 import math
+from arcade.gl import ShaderException
 from constants import MARGIN, CELL_SIZE
+from profiler import profiler
+from startup import report
+
+# Ускорение свободного падения частиц (пикселей в секунду за секунду)
+GRAVITY = 200
+# Параметры вспышек: (скорость, время жизни, размер)
+EXPLOSION = ((50, 200), (0.5, 1.5), (3, 8))
+LINE_CLEAR = ((30, 100), (0.3, 0.8), (2, 6))
+APPLE = ((40, 120), (0.4, 1.0), (2, 5))
+APPLE_COLOR = (255, 50, 50)  # Красный
+
+# Бюджет частиц: жесткий лимит живых частиц по умолчанию (max_particles
+# в settings.json) и доля лимита, которая остается только важным вспышкам
+MAX_PARTICLES = 4000
+IMPORTANT_SHARE = 0.25
+# Сколько частиц-украшений может появиться за один кадр при полном масштабе
+MAX_DECORATION_PER_FRAME = 600
+# Масштаб украшений не опускается ниже этого значения
+MIN_PARTICLE_SCALE = 0.1
+# Кадр считается перегруженным, если сглаженное время кадра больше
+# целевого в PRESSURE_RATIO раз, и свободным - если меньше в RELIEF_RATIO
+PRESSURE_RATIO = 1.2
+RELIEF_RATIO = 1.05
+
+
+def random_burst(count, burst, lifetime_scale=1.0):
+    """Случайные параметры частиц вспышки: (скорость x, скорость y, время жизни, размер)"""
+    (min_speed, max_speed), (min_life, max_life), (min_size, max_size) = burst
+    for _ in range(count):
+        angle = random.uniform(0, 2 * math.pi)
+        speed = random.uniform(min_speed, max_speed)
+        yield (math.cos(angle) * speed, math.sin(angle) * speed,
+               random.uniform(min_life, max_life) * lifetime_scale,
+               random.randint(min_size, max_size))
+
+
+class ParticleBudget:
+    """Бюджет частиц по времени кадра
+
+    Следит за сглаженным временем кадра. Когда кадры не укладываются в целевое
+    время, масштаб украшений (искры зафиксированных блоков и удаленных линий)
+    быстро уменьшается, когда снова укладываются - медленно возвращается.
+    Масштаб уменьшает количество и время жизни частиц; дробные остатки
+    маленьких вспышек накапливаются, так что несколько вспышек по 1-3 частицы
+    сливаются в одну. Важные вспышки (яблоко, отрубленная змейка, очищенная
+    линия) не масштабируются и ограничены только жестким лимитом, часть
+    которого украшениям недоступна.
+    """
+
+    def __init__(self, max_particles=MAX_PARTICLES, target_fps=60):
+        self.max_particles = max(0, int(max_particles))
+        self.target_frame = 1 / max(1, target_fps)
+        self.frame_time = self.target_frame  # Сглаженное время кадра
+        self.scale = 1.0
+        self.frame_room = MAX_DECORATION_PER_FRAME
+        self.dropped = 0  # Сколько частиц не появилось из-за бюджета
+        self._carry = 0.0
+
+    def record_frame(self, delta_time):
+        """Учитывает время очередного кадра и пересчитывает масштаб"""
+        self.frame_time += (delta_time - self.frame_time) * 0.1
+        if self.frame_time > self.target_frame * PRESSURE_RATIO:
+            self.scale = max(MIN_PARTICLE_SCALE, self.scale * 0.85)
+        elif self.frame_time < self.target_frame * RELIEF_RATIO:
+            self.scale = min(1.0, self.scale + 0.01)
+        self.frame_room = int(MAX_DECORATION_PER_FRAME * self.scale)
+
+    def allow(self, count, active, important):
+        """Сколько частиц вспышки можно выпустить и множитель их времени жизни
+
+        active: сколько частиц уже живо
+        """
+        room = self.max_particles - active
+        if important:
+            allowed = max(0, min(count, room))
+            self.dropped += count - allowed
+            return allowed, 1.0
+
+        room = min(room - int(self.max_particles * IMPORTANT_SHARE), self.frame_room)
+        wanted = count * self.scale + self._carry
+        allowed = max(0, min(int(wanted), room))
+        # Остаток переходит к следующей вспышке (не больше одной частицы)
+        self._carry = min(1.0, wanted - allowed)
+        self.frame_room -= allowed
+        self.dropped += count - allowed
+        return allowed, 0.5 + 0.5 * self.scale
 
 
 class Particle:
     """Одна частица"""
 
+    __slots__ = ('x', 'y', 'color', 'velocity_x', 'velocity_y', 'lifetime',
+                 'max_lifetime', 'size', 'alpha')
+
     def __init__(self, x, y, color, velocity_x=0, velocity_y=0, lifetime=1.0, size=5):
         self.x = x
         self.y = y
@@ -27,7 +117,7 @@ class Particle:
         # Уменьшаем альфа-канал со временем
         self.alpha = int(255 * (self.lifetime / self.max_lifetime))
         # Гравитация
-        self.velocity_y -= 200 * delta_time
+        self.velocity_y -= GRAVITY * delta_time
 
     def is_alive(self):
         """Проверяет, жива ли частица"""
@@ -47,53 +137,58 @@ class ParticleSystem:
 
     def __init__(self):
         self.particles = []
+        # Бюджет частиц (None - без ограничений)
+        self.budget = None
 
-    def add_explosion(self, x, y, color, count=20):
-        """Добавляет взрыв частиц"""
-        for _ in range(count):
-            angle = random.uniform(0, 2 * math.pi)
-            speed = random.uniform(50, 200)
-            velocity_x = math.cos(angle) * speed
-            velocity_y = math.sin(angle) * speed
-            lifetime = random.uniform(0.5, 1.5)
-            size = random.randint(3, 8)
-            particle = Particle(x, y, color, velocity_x,
-                                velocity_y, lifetime, size)
-            self.particles.append(particle)
-
-    def add_line_clear_particles(self, x, y, color, count=15):
+    def add_explosion(self, x, y, color, count=20, important=False):
+        """Добавляет взрыв частиц
+        important: вспышка сообщает о событии игры (не урезается бюджетом)"""
+        self.emit(x, y, color, count, EXPLOSION, important)
+
+    def add_line_clear_particles(self, x, y, color, count=15, important=False):
         """Добавляет частицы при очистке линии"""
-        for _ in range(count):
-            angle = random.uniform(0, 2 * math.pi)
-            speed = random.uniform(30, 100)
-            velocity_x = math.cos(angle) * speed
-            velocity_y = math.sin(angle) * speed
-            lifetime = random.uniform(0.3, 0.8)
-            size = random.randint(2, 6)
-            particle = Particle(x, y, color, velocity_x,
-                                velocity_y, lifetime, size)
-            self.particles.append(particle)
+        self.emit(x, y, color, count, LINE_CLEAR, important)
 
     def add_apple_particles(self, x, y, count=10):
         """Добавляет частицы при съедании яблока"""
-        color = (255, 50, 50)  # Красный
-        for _ in range(count):
-            angle = random.uniform(0, 2 * math.pi)
-            speed = random.uniform(40, 120)
-            velocity_x = math.cos(angle) * speed
-            velocity_y = math.sin(angle) * speed
-            lifetime = random.uniform(0.4, 1.0)
-            size = random.randint(2, 5)
-            particle = Particle(x, y, color, velocity_x,
-                                velocity_y, lifetime, size)
-            self.particles.append(particle)
+        self.emit(x, y, APPLE_COLOR, count, APPLE, True)
+
+    def emit(self, x, y, color, count, burst, important=False):
+        """Выпускает вспышку с учетом бюджета"""
+        lifetime_scale = 1.0
+        if self.budget:
+            requested = count
+            count, lifetime_scale = self.budget.allow(
+                count, self.active_count(), important)
+            if count < requested:
+                profiler.count('particles_dropped', requested - count)
+        if count > 0:
+            self.add_burst(x, y, color, count, burst, lifetime_scale)
+
+    def add_burst(self, x, y, color, count, burst, lifetime_scale=1.0):
+        """Добавляет вспышку из count частиц с параметрами burst"""
+        for velocity_x, velocity_y, lifetime, size in random_burst(
+                count, burst, lifetime_scale):
+            self.particles.append(Particle(x, y, color, velocity_x,
+                                           velocity_y, lifetime, size))
+
+    def active_count(self):
+        """Количество живых частиц"""
+        return len(self.particles)
 
     def update(self, delta_time):
         """Обновление всех частиц"""
-        for particle in self.particles[:]:
+        if self.budget:
+            self.budget.record_frame(delta_time)
+        particles = self.particles
+        alive = 0
+        for particle in particles:
             particle.update(delta_time)
-            if not particle.is_alive():
-                self.particles.remove(particle)
+            if particle.is_alive():
+                # Сдвигаем живые частицы к началу списка без копии списка
+                particles[alive] = particle
+                alive += 1
+        del particles[alive:]
 
     def draw(self):
         """Отрисовка всех частиц"""
@@ -103,3 +198,22 @@ class ParticleSystem:
     def clear(self):
         """Очищает все частицы"""
         self.particles.clear()
+
+
+def create_particle_system(settings):
+    """Создает систему частиц с бюджетом: на GPU, если она включена
+    и поддерживается, иначе на CPU"""
+    system = None
+    if settings.get('gpu_particles', True):
+        try:
+            from gpu_particles import GpuParticleSystem
+            system = GpuParticleSystem(arcade.get_window().ctx)
+        except (ImportError, RuntimeError, ShaderException) as e:
+            # Шейдеры не поддерживаются - частицы на CPU (причина видна
+            # в отчете --startup-report)
+            report.note(f"частицы на CPU: {e}")
+    if system is None:
+        system = ParticleSystem()
+    system.budget = ParticleBudget(settings.get('max_particles', MAX_PARTICLES),
+                                   settings.get('target_fps', 60))
+    return system
@@ -0,0 +1,112 @@
+"""Отложенное сохранение файлов в фоновом потоке"""
+import atexit
+import copy
+import json
+import os
+import tempfile
+import threading
+
+# Как часто фоновый поток сбрасывает накопленные изменения на диск (в секундах)
+FLUSH_INTERVAL = 2.0
+
+
+def write_json_atomic(path, data, indent=None):
+    """Атомарно записывает JSON: сначала во временный файл, затем переименование"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(
+        prefix='.' + os.path.basename(path) + '.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=indent)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class WriteBehindStore:
+    """Хранилище с отложенной записью
+
+    put() только запоминает последнее значение для файла в памяти - несколько
+    обновлений подряд схлопываются в одно. Запись выполняет фоновый поток не
+    чаще раза в flush_interval секунд или сразу после request_flush(), поэтому
+    игровой цикл никогда не ждет диск.
+    """
+
+    def __init__(self, flush_interval=FLUSH_INTERVAL):
+        self.flush_interval = flush_interval
+        self._pending = {}  # путь -> (данные, отступ)
+        self._in_flight = {}  # данные, которые записываются прямо сейчас
+        self._tasks = {}  # ключ -> функция записи (например, в базу данных)
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def put(self, path, data, indent=None):
+        """Запоминает данные для записи в файл"""
+        with self._lock:
+            self._pending[path] = (copy.deepcopy(data), indent)
+            self._ensure_thread()
+
+    def _ensure_thread(self):
+        """Запускает фоновый поток при первой записи"""
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name='write-behind', daemon=True)
+            self._thread.start()
+
+    def schedule(self, key, task):
+        """Запоминает функцию записи, которая выполнится в фоновом потоке
+        (повторные задачи с тем же ключом схлопываются в одну)"""
+        with self._lock:
+            self._tasks[key] = task
+            self._ensure_thread()
+
+    def get(self, path):
+        """Возвращает еще не записанные данные для файла (или None)"""
+        with self._lock:
+            pending = self._pending.get(path) or self._in_flight.get(path)
+        return copy.deepcopy(pending[0]) if pending else None
+
+    def request_flush(self):
+        """Просит фоновый поток записать изменения немедленно (не блокирует)"""
+        self._wakeup.set()
+
+    def flush(self):
+        """Синхронно записывает все накопленные изменения (при выходе)"""
+        with self._write_lock:
+            with self._lock:
+                self._in_flight = self._pending
+                self._pending = {}
+                tasks = self._tasks
+                self._tasks = {}
+            for path, (data, indent) in self._in_flight.items():
+                try:
+                    write_json_atomic(path, data, indent)
+                except OSError:
+                    pass
+            with self._lock:
+                self._in_flight = {}
+            for task in tasks.values():
+                try:
+                    task()
+                except Exception:
+                    pass
+
+    def _run(self):
+        """Цикл фонового потока"""
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+
+# Общее хранилище для рекорда и настроек
+store = WriteBehindStore()
+atexit.register(store.flush)
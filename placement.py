@@ -0,0 +1,542 @@
+"""Планировщик размещения фигур (умное появление)
+
+Для новой фигуры перебираются все повороты и столбцы, с которых она может
+упасть вертикально, и для лучших из них - все размещения следующей фигуры
+(поиск на 2 хода). Поле после размещения оценивается взвешенной суммой
+признаков: дыры, неровность, высота, заполненные линии и столбцы, опасность
+для змейки (ее клетки под падающей фигурой).
+
+Поле хранится рядами-масками внутри окна: на обычном поле это все поле,
+на большой арене - полоса над змейкой. Оценки полей запоминаются в таблице
+транспозиций (LRU) по хешу Зобриста, поэтому поля второго хода на следующем
+появлении фигуры уже посчитаны. Поиск ограничен бюджетом времени: если его
+не хватило, оставшиеся варианты ранжируются по первому ходу.
+
+Пока падает текущая фигура, размещение следующей считается заранее в фоновом
+потоке: поле после предполагаемой фиксации (фигура падает вертикально)
+снимается в неизменяемый Board, и поиск идет по нему. В кадре фиксации
+остается прочитать поле и сравнить ключ; если поле сложилось иначе (фигура
+легла на змейку, змейка сдвинула окно арены), поиск выполняется как раньше.
+
+Модуль не зависит от arcade.
+"""
+import collections
+import queue
+import random
+import threading
+import time
+
+from constants import TETROMINOES, COLUMN_CLEAR_THRESHOLD
+
+# Бюджет планирования одной фигуры (в секундах)
+PLANNER_BUDGET = 0.003
+# Сколько лучших размещений первой фигуры проверяется вторым ходом
+PLANNER_BEAM = 6
+# То же без бюджета времени (в сетевой игре): поиск всегда одинаковый,
+# вместо времени его ограничивает число оцененных размещений (у T, J, L
+# около 50 на ход, так что второй ход успевает хотя бы для лучшего варианта)
+DETERMINISTIC_BEAM = 3
+DETERMINISTIC_NODES = 120
+# Размер таблицы транспозиций (оценок полей)
+TRANSPOSITION_SIZE = 8192
+# Сколько хешей рядов запоминается (после этого кэш начинается заново)
+ROW_HASH_SIZE = 65536
+# Сколько следующих по оценке размещений пробовать, если лучшее опасно для змейки
+PLANNER_FALLBACKS = 8
+# Окно планирования на большой арене (в клетках)
+PLANNER_COLUMNS = 16
+PLANNER_ROWS = 24
+# Бюджет предварительного поиска в фоновом потоке (в секундах): он не
+# задерживает кадр, поэтому может быть больше PLANNER_BUDGET
+SPECULATION_BUDGET = 0.02
+
+# Веса признаков поля
+WEIGHTS = {
+    'lines': 8.0,       # За каждую заполненную линию
+    'columns': 3.0,     # За каждый заполненный столбец
+    'holes': -3.5,      # Пустая клетка под блоком
+    'bumpiness': -1.0,  # Сумма перепадов высот соседних столбцов
+    'height': -0.5,     # Суммарная высота столбцов
+    'danger': -4.0,     # Клетка змейки под падающей фигурой
+    'head': -40.0,      # Голова змейки под падающей фигурой
+}
+
+ZOBRIST_SEED = 0x5EED
+
+
+def rotations(piece_type):
+    """Различные повороты фигуры: список (число поворотов, форма)
+
+    Формы совпадают с тем, что дает Tetromino.rotate() за столько поворотов
+    """
+    shape = list(TETROMINOES[piece_type])
+    result = []
+    seen = set()
+    for turns in range(1 if piece_type == 'O' else 4):
+        min_x = min(dx for dx, dy in shape)
+        min_y = min(dy for dx, dy in shape)
+        key = frozenset((dx - min_x, dy - min_y) for dx, dy in shape)
+        if key not in seen:
+            seen.add(key)
+            result.append((turns, tuple(shape)))
+        shape = [(-dy, dx) for dx, dy in shape]
+    return result
+
+
+if hasattr(int, 'bit_count'):
+    popcount = int.bit_count
+else:
+    def popcount(mask):
+        """Количество установленных бит"""
+        return bin(mask).count('1')
+
+
+class TranspositionTable:
+    """Ограниченная таблица оценок полей (вытесняется давно не использованное)"""
+
+    def __init__(self, size=TRANSPOSITION_SIZE):
+        self.size = size
+        self.entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+
+
+class Board:
+    """Окно поля: ряды-маски (бит i - столбец x0 + i), ряд 0 - нижний ряд окна
+
+    outside[r] - сколько клеток ряда заполнено вне окна (для проверки линий).
+    Ниже окна - пол (на большой арене это приближение).
+    """
+
+    __slots__ = ('x0', 'y0', 'width', 'rows', 'outside', 'grid_width', 'key')
+
+    def __init__(self, x0, y0, width, rows, outside, grid_width, key):
+        self.x0 = x0
+        self.y0 = y0
+        self.width = width
+        self.rows = rows
+        self.outside = outside
+        self.grid_width = grid_width
+        self.key = key
+
+    def heights(self):
+        """Высота каждого столбца окна (номер ряда над верхним блоком)"""
+        heights = [0] * self.width
+        seen = 0
+        for r in range(len(self.rows) - 1, -1, -1):
+            new = self.rows[r] & ~seen
+            if new:
+                seen |= new
+                while new:
+                    bit = new & -new
+                    heights[bit.bit_length() - 1] = r + 1
+                    new ^= bit
+        return heights
+
+
+class PlacementPlanner:
+    """Выбирает поворот и столбец появления фигуры поиском на 2 хода"""
+
+    def __init__(self, budget=PLANNER_BUDGET, beam=PLANNER_BEAM, weights=None,
+                 speculative=True, max_nodes=None):
+        """budget: время на фигуру в секундах; None - без ограничения
+        (результат не зависит от скорости машины, нужно для сетевой игры)
+        speculative: считать следующую фигуру заранее в фоновом потоке
+        max_nodes: сколько размещений оценивать за поиск; None - без ограничения"""
+        self.budget = budget
+        self.beam = beam
+        self.max_nodes = max_nodes
+        self.weights = dict(WEIGHTS, **(weights or {}))
+        self.speculative = speculative
+        self.table = TranspositionTable()
+        self._zobrist = {}  # Ряд -> числа клеток
+        self._row_hashes = {}  # (ряд, x0, маска) -> хеш ряда
+        self._zobrist_width = 0
+        self._zobrist_rng = random.Random(ZOBRIST_SEED)
+        self._rotations = {piece_type: rotations(piece_type) for piece_type in TETROMINOES}
+        # Фоновый поток (запускается при первом speculate). Таблицы и хеши
+        # общие, поэтому поиск в любом потоке идет под _lock
+        self._lock = threading.Lock()
+        self._requests = queue.SimpleQueue()
+        self._thread = None
+        self._generation = 0      # Номер последнего запроса; старые прерываются
+        self._speculation = None  # (ключ, размещения) последнего готового поиска
+        # Статистика последнего планирования
+        self.last_time = 0.0
+        self.last_second_ply = 0
+        self.speculation_hits = 0
+        self.speculation_misses = 0
+
+    def _row_keys(self, y):
+        """Случайные 64-битные числа клеток ряда y (хеш Зобриста)"""
+        keys = self._zobrist.get(y)
+        if keys is None:
+            keys = [self._zobrist_rng.getrandbits(64) for _ in range(self._zobrist_width)]
+            self._zobrist[y] = keys
+        return keys
+
+    def _hash_rows(self, x0, y0, rows):
+        """Хеш поля; хеши рядов запоминаются (после очистки линий те же
+        ряды встречаются в других размещениях)"""
+        row_hashes = self._row_hashes
+        if len(row_hashes) > ROW_HASH_SIZE:
+            row_hashes.clear()
+        key = 0
+        for r, mask in enumerate(rows):
+            if not mask:
+                continue
+            row_key = (y0 + r, x0, mask)
+            row_hash = row_hashes.get(row_key)
+            if row_hash is None:
+                keys = self._row_keys(y0 + r)
+                row_hash = 0
+                while mask:
+                    bit = mask & -mask
+                    row_hash ^= keys[x0 + bit.bit_length() - 1]
+                    mask ^= bit
+                row_hashes[row_key] = row_hash
+            key ^= row_hash
+        return key
+
+    def plan(self, view, piece_type, next_type, spawn_row):
+        """Размещения фигуры piece_type от лучшего к худшему: [(повороты, x)]
+
+        Если фоновый поиск уже посчитал это поле, возвращается его результат.
+        """
+        started = time.perf_counter()
+        if self.budget is not None:
+            # Незаконченный фоновый поиск прерывается; в сетевой игре
+            # (без бюджета) дожидаемся его, чтобы результат не зависел от потоков
+            self._generation += 1
+        with self._lock:
+            self._generation += 1
+            board = self._read_board(view, spawn_row)
+            top = spawn_row - board.y0
+            danger = self._column_danger(view, board, top)
+            key = self._speculation_key(board, top, piece_type, next_type, danger)
+            speculation, self._speculation = self._speculation, None
+            if speculation is not None and speculation[0] == key:
+                self.speculation_hits += 1
+                placements = speculation[1]
+            else:
+                if speculation is not None:
+                    self.speculation_misses += 1
+                deadline = None if self.budget is None else started + self.budget
+                placements = self._search(board, top, danger, piece_type,
+                                          next_type, deadline)
+        self.last_time = time.perf_counter() - started
+        return placements
+
+    def speculate(self, view, piece, spawn_row, piece_type, next_type):
+        """Запускает в фоне поиск для фигуры piece_type, которая появится
+        после фиксации piece (текущей фигуры) в ряду spawn_row"""
+        if not self.speculative or piece is None:
+            return
+        with self._lock:
+            self._generation += 1
+            self._speculation = None
+            board = self._read_board(view, spawn_row)
+            top = spawn_row - board.y0
+            shape = [(dx, dy) for dx, dy in piece.shape]
+            columns = [piece.x + dx - board.x0 for dx, dy in shape]
+            if min(columns) < 0 or max(columns) >= board.width:
+                return  # Фигура падает вне окна - предсказать поле нельзя
+            heights = board.heights()
+            landing = max(heights[i] - dy for i, (dx, dy) in zip(columns, shape))
+            if piece.y - board.y0 < landing:
+                return  # Фигура уже ниже верха своих столбцов
+            board, _ = self._drop(board, shape, piece.x, landing)
+            danger = self._column_danger(view, board, top)
+            key = self._speculation_key(board, top, piece_type, next_type, danger)
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name='spawn-planner', daemon=True)
+            self._thread.start()
+        self._requests.put((self._generation, key, board, top, danger,
+                            piece_type, next_type))
+
+    def close(self):
+        """Останавливает фоновый поток (следующий speculate запустит новый)"""
+        self._generation += 1
+        if self._thread is not None:
+            self._requests.put(None)
+            self._thread = None
+
+    def _run(self):
+        """Цикл фонового потока: поиск по снимку предсказанного поля"""
+        while True:
+            request = self._requests.get()
+            if request is None:
+                return
+            generation, key, board, top, danger, piece_type, next_type = request
+            if generation != self._generation:
+                continue  # Запрос уже устарел
+            with self._lock:
+                deadline = None
+                if self.budget is not None:
+                    deadline = time.perf_counter() + SPECULATION_BUDGET
+                placements = self._search(board, top, danger, piece_type, next_type,
+                                          deadline, generation)
+                if placements is not None and generation == self._generation:
+                    self._speculation = (key, placements)
+
+    def _speculation_key(self, board, top, piece_type, next_type, danger):
+        """Ключ, по которому результат фонового поиска сверяется с полем
+
+        Без бюджета (сетевая игра) в ключ входит и опасность для змеек:
+        результат должен совпасть с синхронным поиском. Иначе змейка могла
+        сдвинуться - это проверяется при появлении фигуры
+        """
+        key = (board.key, board.x0, board.y0, tuple(board.outside), top,
+               piece_type, next_type)
+        if self.budget is None:
+            key += (tuple(danger),)
+        return key
+
+    def _search(self, board, top, danger, piece_type, next_type, deadline,
+                generation=None):
+        """Поиск на 2 хода по полю board
+
+        generation: номер запроса фонового потока; когда он устаревает,
+        поиск прерывается и возвращает None. Между вариантами фоновый
+        поток отпускает GIL, чтобы не задерживать кадр
+
+        Бюджет (deadline или max_nodes) проверяется после каждого
+        размещения: если он кончился на первом ходе, ранжируются уже
+        найденные размещения; на втором - недосчитанный вариант отбрасывается
+        """
+        first = []
+        nodes = 0
+        for turns, shape, x, result, reward in self._placements(board, piece_type, top):
+            columns = {x + dx - board.x0 for dx, dy in shape}
+            score = reward + sum(danger[i] for i in columns)
+            first.append((score + self._evaluate(result), score, turns, x, result))
+            nodes += 1
+            if generation is not None:
+                time.sleep(0)
+                if generation != self._generation:
+                    return None
+            if self._out_of_budget(deadline, nodes):
+                break
+        first.sort(key=lambda item: item[0], reverse=True)
+
+        # Второй ход для лучших размещений, пока есть бюджет
+        ranked = []
+        self.last_second_ply = 0
+        if next_type is not None:
+            for index, (_, score, turns, x, result) in enumerate(first[:self.beam]):
+                if self._out_of_budget(deadline, nodes):
+                    break
+                best, nodes = self._best_next(result, next_type, top, deadline, nodes)
+                if best is None:
+                    break
+                ranked.append((score + best, turns, x))
+                self.last_second_ply = index + 1
+                if generation is not None:
+                    time.sleep(0)
+                    if generation != self._generation:
+                        return None
+            ranked.sort(key=lambda item: item[0], reverse=True)
+        placements = [(turns, x) for _, turns, x in ranked]
+        placements += [(turns, x) for _, _, turns, x, _ in first[len(ranked):]]
+        return placements
+
+    def _read_board(self, view, spawn_row):
+        """Окно поля вокруг места появления"""
+        grid = view.grid
+        grid_width = view.grid_width
+        if self._zobrist_width != grid_width:
+            self._zobrist.clear()
+            self._row_hashes.clear()
+            self._zobrist_width = grid_width
+            self.table.clear()
+        if view.big_arena:
+            head_x = view.snake.get_head()[0]
+            x0 = max(0, min(grid_width - PLANNER_COLUMNS, head_x - PLANNER_COLUMNS // 2))
+            width = min(PLANNER_COLUMNS, grid_width)
+            y0 = max(0, spawn_row - PLANNER_ROWS)
+        else:
+            x0, width, y0 = 0, grid_width, 0
+        y1 = min(view.grid_height - 1, spawn_row + 2)
+        rows = []
+        outside = []
+        for y in range(y0, y1 + 1):
+            row = grid[y]
+            mask = 0
+            for i in range(width):
+                if row[x0 + i] is not None:
+                    mask |= 1 << i
+            rows.append(mask)
+            outside.append(view.row_stats.fill[y] - popcount(mask))
+        return Board(x0, y0, width, rows, outside, grid_width,
+                     self._hash_rows(x0, y0, rows))
+
+    def _placements(self, board, piece_type, top):
+        """Все вертикальные падения фигуры: (повороты, форма, x, поле, награда)"""
+        heights = board.heights()
+        x0 = board.x0
+        for turns, shape in self._rotations[piece_type]:
+            min_dx = min(dx for dx, dy in shape)
+            max_dx = max(dx for dx, dy in shape)
+            for x in range(x0 - min_dx, x0 + board.width - max_dx):
+                # Фигура ложится на самый высокий столбец под своими клетками
+                landing = max(heights[x + dx - x0] - dy for dx, dy in shape)
+                if landing > top:
+                    continue  # Столбец занят выше места появления
+                result, reward = self._drop(board, shape, x, landing)
+                yield turns, shape, x, result, reward
+
+    def _drop(self, board, shape, x, landing):
+        """Поле после фиксации фигуры и очистки линий и столбцов"""
+        rows = list(board.rows)
+        key = board.key
+        height = len(rows)
+        placed = 0  # Столбцы окна, в которые легла фигура
+        for dx, dy in shape:
+            r = landing + dy
+            if r < height:
+                bit = 1 << (x + dx - board.x0)
+                rows[r] |= bit
+                key ^= self._row_keys(board.y0 + r)[x + dx]
+                placed |= bit
+
+        # Линия могла заполниться только в рядах фигуры (смещения не больше 2)
+        lines = 0
+        outside = board.outside
+        full = (1 << board.width) - 1
+        missing = board.grid_width - board.width
+        for r in range(min(landing + 2, height - 1), max(landing - 3, -1), -1):
+            if rows[r] == full and outside[r] == missing:
+                del rows[r]
+                rows.append(0)
+                if outside is board.outside:
+                    outside = list(outside)
+                del outside[r]
+                outside.append(0)
+                lines += 1
+
+        # Столбец очищается, если снизу подряд COLUMN_CLEAR_THRESHOLD блоков
+        columns = 0
+        if board.y0 == 0 and height >= COLUMN_CLEAR_THRESHOLD:
+            candidates = placed
+            for r in range(COLUMN_CLEAR_THRESHOLD):
+                candidates &= rows[r]
+                if not candidates:
+                    break
+            while candidates:
+                bit = candidates & -candidates
+                candidates ^= bit
+                count = COLUMN_CLEAR_THRESHOLD
+                while count < height and rows[count] & bit:
+                    count += 1
+                # Блоки столбца выше очищенных опускаются на count рядов
+                for r in range(height):
+                    above = r + count < height and rows[r + count] & bit
+                    rows[r] = rows[r] | bit if above else rows[r] & ~bit
+                columns += 1
+
+        if lines or columns:
+            key = self._hash_rows(board.x0, board.y0, rows)
+        reward = lines * self.weights['lines'] + columns * self.weights['columns']
+        return Board(board.x0, board.y0, board.width, rows, outside,
+                     board.grid_width, key), reward
+
+    def _evaluate(self, board):
+        """Оценка поля (дыры, неровность, высота) с таблицей транспозиций"""
+        value = self.table.get(board.key)
+        if value is not None:
+            return value
+        # Сверху вниз: первый блок столбца задает его высоту,
+        # пустые клетки под уже встреченными блоками - дыры
+        heights = [0] * board.width
+        holes = 0
+        seen = 0
+        rows = board.rows
+        for r in range(len(rows) - 1, -1, -1):
+            mask = rows[r]
+            if seen:
+                holes += popcount(seen & ~mask)
+            new = mask & ~seen
+            if new:
+                seen |= new
+                while new:
+                    bit = new & -new
+                    heights[bit.bit_length() - 1] = r + 1
+                    new ^= bit
+        bumpiness = sum(abs(a - b) for a, b in zip(heights, heights[1:]))
+        weights = self.weights
+        value = (holes * weights['holes'] + bumpiness * weights['bumpiness']
+                 + sum(heights) * weights['height'])
+        self.table.put(board.key, value)
+        return value
+
+    def _out_of_budget(self, deadline, nodes):
+        """Кончился ли бюджет поиска: время или число оцененных размещений"""
+        if self.max_nodes is not None and nodes >= self.max_nodes:
+            return True
+        return deadline is not None and time.perf_counter() >= deadline
+
+    def _best_next(self, board, piece_type, top, deadline=None, nodes=0):
+        """Лучшая оценка после размещения следующей фигуры и число
+        оцененных размещений; оценка None, если бюджет кончился раньше"""
+        best = None
+        for _, _, _, result, reward in self._placements(board, piece_type, top):
+            if self._out_of_budget(deadline, nodes):
+                return None, nodes
+            value = reward + self._evaluate(result)
+            nodes += 1
+            if best is None or value > best:
+                best = value
+        if best is None:
+            # Следующей фигуре некуда упасть
+            return self._evaluate(board) - 100.0, nodes
+        return best, nodes
+
+    def _column_danger(self, view, board, top):
+        """Штраф за каждый столбец окна: клетки змеек между верхом столбца
+        и местом появления (по ним пройдет упавшая в этот столбец фигура)"""
+        heights = board.heights()
+        danger = [0.0] * board.width
+        for snake in view.snakes:
+            for index, (x, y) in enumerate(snake.body):
+                i = x - board.x0
+                r = y - board.y0
+                if 0 <= i < board.width and heights[i] <= r <= top + 1:
+                    danger[i] += self.weights['head'] if index == 0 else self.weights['danger']
+        return danger
+
+
+def create_placement_planner(settings, deterministic=False):
+    """Планировщик размещения или None, если включено простое появление
+
+    deterministic: без бюджета времени (сетевая игра: у всех игроков
+    фигуры должны появляться одинаково). В сетевой игре планировщик есть
+    всегда, независимо от placement_planner: от него зависит, как расходуются
+    общие случайные числа, поэтому настройка у игроков может различаться
+    """
+    if not deterministic and not settings.get('placement_planner', True):
+        return None
+    speculative = settings.get('spawn_speculation', True)
+    if deterministic:
+        return PlacementPlanner(budget=None, beam=DETERMINISTIC_BEAM,
+                                speculative=speculative,
+                                max_nodes=DETERMINISTIC_NODES)
+    return PlacementPlanner(speculative=speculative)
@@ -0,0 +1,294 @@
+"""Профилировщик кадра с оверлеем"""
+import functools
+import time
+from array import array
+import arcade
+
+# Сколько последних кадров хранится для каждой фазы
+HISTORY_SIZE = 240
+# Как часто пересчитывать перцентили для оверлея (в кадрах)
+SUMMARY_INTERVAL = 30
+# Функции arcade, вызовы которых считаются вызовами отрисовки
+DRAW_FUNCTIONS = (
+    'draw_line',
+    'draw_lines',
+    'draw_lrbt_rectangle_filled',
+    'draw_lrbt_rectangle_outline',
+    'draw_circle_filled',
+    'draw_text',
+)
+
+
+class RingBuffer:
+    """Кольцевой буфер целых чисел фиксированного размера"""
+
+    def __init__(self, size):
+        self.values = array('q', bytes(8 * size))
+        self.size = size
+        self.index = 0
+        self.count = 0
+
+    def push(self, value):
+        """Добавляет значение, вытесняя самое старое"""
+        self.values[self.index] = value
+        self.index = (self.index + 1) % self.size
+        if self.count < self.size:
+            self.count += 1
+
+    def snapshot(self):
+        """Возвращает сохраненные значения (порядок не важен)"""
+        return self.values[:self.count]
+
+
+class LatencyMeter:
+    """Последние замеры задержки (например, от нажатия клавиши до хода змейки)"""
+
+    def __init__(self, size=HISTORY_SIZE):
+        self.samples = RingBuffer(size)
+        self.total = 0
+
+    def add(self, seconds):
+        """Добавляет замер"""
+        self.samples.push(int(seconds * 1e9))
+        self.total += 1
+
+    def summary(self):
+        """Возвращает (p50, p95, max) в миллисекундах"""
+        values = sorted(self.samples.snapshot())
+        if not values:
+            return 0.0, 0.0, 0.0
+        return (percentile(values, 0.50) / 1e6, percentile(values, 0.95) / 1e6,
+                values[-1] / 1e6)
+
+
+class _PhaseTimer:
+    """Замер одной фазы (переиспользуется, чтобы не создавать объекты каждый кадр)"""
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.profiler.add_sample(self.name, time.perf_counter_ns() - self.start)
+        return False
+
+
+class _NullTimer:
+    """Пустой замер для выключенного профилировщика"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NULL_TIMER = _NullTimer()
+
+
+def percentile(sorted_values, fraction):
+    """Возвращает перцентиль из отсортированного списка"""
+    if not sorted_values:
+        return 0
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * fraction))
+    return sorted_values[index]
+
+
+class FrameProfiler:
+    """Замеряет время фаз кадра и количество вызовов отрисовки
+
+    Замеры включены, пока показан оверлей, пишется телеметрия или идет бенчмарк
+    отрисовки. В выключенном состоянии phase() возвращает общий пустой замер,
+    а функции отрисовки arcade не подменяются, поэтому профилировщик почти
+    ничего не стоит.
+    """
+
+    def __init__(self, history=HISTORY_SIZE):
+        self.enabled = False
+        self.overlay_visible = False
+        self.telemetry_enabled = False
+        self.benchmark_enabled = False
+        self.history = history
+        self.phases = {}        # фаза -> RingBuffer с временем за кадр (нс)
+        self._timers = {}       # фаза -> _PhaseTimer
+        self._frame_times = {}  # фаза -> суммарное время в текущем кадре
+        self._tick_times = {}   # фаза -> суммарное время с прошлого логического тика
+        self._tick_counters = {}  # счетчик -> значение с прошлого логического тика
+        self.draw_calls = RingBuffer(history)
+        self.frame_draw_calls = 0
+        self.total_draw_calls = 0  # Всего вызовов с момента включения (для бенчмарков)
+        self._counting_draw_calls = True
+        self._original_draw_functions = {}
+        self._frames_since_summary = SUMMARY_INTERVAL
+        self.summary = []
+
+    def toggle(self):
+        """Показывает или скрывает оверлей"""
+        self.overlay_visible = not self.overlay_visible
+        self._update_enabled()
+
+    def set_telemetry(self, enabled):
+        """Включает или выключает замеры для телеметрии"""
+        self.telemetry_enabled = enabled
+        self._update_enabled()
+
+    def set_benchmark(self, enabled):
+        """Включает или выключает замеры для бенчмарка отрисовки"""
+        self.benchmark_enabled = enabled
+        self._update_enabled()
+
+    def _update_enabled(self):
+        """Включает замеры, если они кому-то нужны"""
+        enabled = (self.overlay_visible or self.telemetry_enabled
+                   or self.benchmark_enabled)
+        if enabled == self.enabled:
+            return
+        self.enabled = enabled
+        if enabled:
+            self._install_draw_counters()
+        else:
+            # Возвращаем оригинальные функции отрисовки
+            self._remove_draw_counters()
+            self._frame_times.clear()
+            self._tick_times.clear()
+            self._tick_counters.clear()
+            self.frame_draw_calls = 0
+
+    def phase(self, name):
+        """Возвращает контекстный менеджер для замера фазы"""
+        if not self.enabled:
+            return NULL_TIMER
+        timer = self._timers.get(name)
+        if timer is None:
+            timer = _PhaseTimer(self, name)
+            self._timers[name] = timer
+        return timer
+
+    def add_sample(self, name, duration_ns):
+        """Добавляет время фазы к текущему кадру"""
+        self._frame_times[name] = self._frame_times.get(name, 0) + duration_ns
+        if self.telemetry_enabled:
+            self._tick_times[name] = self._tick_times.get(name, 0) + duration_ns
+
+    def count(self, name, value=1):
+        """Увеличивает счетчик текущего логического тика (для телеметрии)"""
+        if self.telemetry_enabled:
+            self._tick_counters[name] = self._tick_counters.get(name, 0) + value
+
+    def pop_tick_data(self):
+        """Возвращает время фаз и счетчики с прошлого тика и сбрасывает их"""
+        tick_times = self._tick_times
+        tick_counters = self._tick_counters
+        self._tick_times = {}
+        self._tick_counters = {}
+        return tick_times, tick_counters
+
+    def end_frame(self):
+        """Завершает кадр: переносит замеры в историю"""
+        if not self.enabled:
+            return
+        for name, duration in self._frame_times.items():
+            buffer = self.phases.get(name)
+            if buffer is None:
+                buffer = RingBuffer(self.history)
+                self.phases[name] = buffer
+            buffer.push(duration)
+        self._frame_times.clear()
+        self.draw_calls.push(self.frame_draw_calls)
+        self.frame_draw_calls = 0
+
+        self._frames_since_summary += 1
+        if self._frames_since_summary >= SUMMARY_INTERVAL:
+            self._frames_since_summary = 0
+            self.summary = self._build_summary()
+
+    def _build_summary(self):
+        """Считает p50/p95/max для каждой фазы (в миллисекундах)"""
+        rows = []
+        for name in sorted(self.phases):
+            values = sorted(self.phases[name].snapshot())
+            rows.append((
+                name,
+                percentile(values, 0.50) / 1e6,
+                percentile(values, 0.95) / 1e6,
+                (values[-1] if values else 0) / 1e6,
+            ))
+        return rows
+
+    def _install_draw_counters(self):
+        """Подменяет функции отрисовки arcade обертками со счетчиком"""
+        for name in DRAW_FUNCTIONS:
+            original = getattr(arcade, name, None)
+            if original is None:
+                continue
+            self._original_draw_functions[(arcade, name)] = original
+            setattr(arcade, name, self._counted(original))
+        original_draw = arcade.SpriteList.draw
+        self._original_draw_functions[(arcade.SpriteList, 'draw')] = original_draw
+        arcade.SpriteList.draw = self._counted(original_draw)
+
+    def _remove_draw_counters(self):
+        """Возвращает оригинальные функции отрисовки"""
+        for (owner, name), original in self._original_draw_functions.items():
+            setattr(owner, name, original)
+        self._original_draw_functions.clear()
+
+    def _counted(self, function):
+        """Оборачивает функцию отрисовки счетчиком вызовов"""
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if self._counting_draw_calls:
+                self.frame_draw_calls += 1
+                self.total_draw_calls += 1
+            return function(*args, **kwargs)
+        return wrapper
+
+    def draw_overlay(self, x, y, extra_lines=()):
+        """Рисует таблицу фаз (левый верхний угол таблицы в точке x, y)"""
+        if not self.overlay_visible:
+            return
+        # Вызовы отрисовки самого оверлея не учитываем
+        self._counting_draw_calls = False
+        lines = ["фаза               p50    p95    max  (мс)"]
+        for name, p50, p95, worst in self.summary:
+            lines.append(f"{name:<17} {p50:6.2f} {p95:6.2f} {worst:6.2f}")
+        draw_calls = sorted(self.draw_calls.snapshot())
+        lines.append(
+            f"draw calls: p50 {percentile(draw_calls, 0.5)}"
+            f"  max {draw_calls[-1] if draw_calls else 0}")
+        lines.extend(extra_lines)
+
+        line_height = 14
+        height = line_height * len(lines) + 10
+        arcade.draw_lrbt_rectangle_filled(
+            x - 5, x + 320, y - height, y + 5, (0, 0, 0, 180))
+        for index, line in enumerate(lines):
+            arcade.draw_text(
+                line, x, y - (index + 1) * line_height,
+                arcade.color.LIGHT_GREEN, 10, font_name="Courier New")
+        self._counting_draw_calls = True
+
+
+def profiled(name):
+    """Декоратор метода: замеряет фазу профилировщиком объекта (self.profiler)"""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            profiler = self.profiler
+            if not profiler.enabled:
+                return method(self, *args, **kwargs)
+            with profiler.phase(name):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# Общий профилировщик (состояние сохраняется между играми)
+profiler = FrameProfiler()
@@ -0,0 +1,140 @@
+"""Relay-сервер для сетевой игры (asyncio)
+
+Сервер ничего не моделирует: он собирает игроков в комнаты, раздает общее
+зерно случайных чисел и пересылает сообщения каждого игрока остальным
+игрокам комнаты.
+
+Запуск для проверки на одной машине:
+    python relay_server.py
+    python main.py --connect 127.0.0.1:7777 --room test   # в двух окнах
+"""
+import argparse
+import asyncio
+import random
+import struct
+
+from netplay import (
+    DEFAULT_PORT, FRAME_HEADER, MSG_HELLO, MSG_LEFT, START_HEADER, MSG_START,
+    encode_frame
+)
+
+PLAYERS_PER_ROOM = 2
+# Сколько байт может ждать отправки одному игроку; кто отстал сильнее,
+# того сервер отключает, чтобы не копить кадры в памяти
+MAX_PEER_BUFFER = 1 << 20
+
+
+class Room:
+    """Комната: игроки и параметры партии"""
+
+    def __init__(self, name):
+        self.name = name
+        self.writers = []
+        self.difficulty = 'medium'
+        self.started = False
+
+
+class RelayServer:
+    """Сервер комнат"""
+
+    def __init__(self, players_per_room=PLAYERS_PER_ROOM,
+                 max_peer_buffer=MAX_PEER_BUFFER):
+        self.players_per_room = players_per_room
+        self.max_peer_buffer = max_peer_buffer
+        self.rooms = {}
+
+    async def handle_client(self, reader, writer):
+        """Обслуживает одно подключение"""
+        room = None
+        try:
+            room = await self._join(reader, writer)
+            if room is None:
+                return
+            while True:
+                header = await reader.readexactly(FRAME_HEADER.size)
+                (length,) = FRAME_HEADER.unpack(header)
+                payload = await reader.readexactly(length)
+                frame = header + payload
+                for other in room.writers:
+                    if other is not writer:
+                        self._send(other, frame)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            if room is not None:
+                self._leave(room, writer)
+            writer.close()
+
+    async def _join(self, reader, writer):
+        """Читает HELLO и добавляет игрока в комнату"""
+        header = await reader.readexactly(FRAME_HEADER.size)
+        (length,) = FRAME_HEADER.unpack(header)
+        payload = await reader.readexactly(length)
+        if not payload or payload[0] != MSG_HELLO:
+            return None
+        room_length = payload[1]
+        name = payload[2:2 + room_length].decode('utf-8', 'replace')
+        difficulty = payload[2 + room_length:].decode('ascii', 'replace')
+
+        room = self.rooms.get(name)
+        if room is None or room.started:
+            room = Room(name)
+            self.rooms[name] = room
+        if not room.writers:
+            # Сложность выбирает первый игрок
+            room.difficulty = difficulty or 'medium'
+        room.writers.append(writer)
+
+        if len(room.writers) >= self.players_per_room:
+            room.started = True
+            seed = random.getrandbits(32)
+            for player, other in enumerate(room.writers):
+                self._send(other, encode_frame(
+                    START_HEADER.pack(MSG_START, seed, player, len(room.writers))
+                    + room.difficulty.encode('ascii')))
+        return room
+
+    def _send(self, writer, frame):
+        """Отправляет кадр игроку без ожидания drain(). Игрока, который
+        не успевает читать, отключает сразу, не дожидаясь отправки буфера:
+        его обработчик получит конец потока и уберет его из комнаты"""
+        if writer.is_closing():
+            return
+        if writer.transport.get_write_buffer_size() > self.max_peer_buffer:
+            writer.transport.abort()
+            return
+        writer.write(frame)
+
+    def _leave(self, room, writer):
+        """Убирает игрока из комнаты и сообщает остальным"""
+        if writer in room.writers:
+            room.writers.remove(writer)
+        for other in room.writers:
+            self._send(other, encode_frame(struct.pack('!B', MSG_LEFT)))
+        if not room.writers and self.rooms.get(room.name) is room:
+            del self.rooms[room.name]
+
+
+async def serve(host, port):
+    """Запускает сервер"""
+    relay = RelayServer()
+    server = await asyncio.start_server(relay.handle_client, host, port)
+    print(f"Relay-сервер слушает {host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    """Точка входа сервера"""
+    parser = argparse.ArgumentParser(description="Relay-сервер сетевой игры")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
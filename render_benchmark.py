@@ -0,0 +1,222 @@
+"""Бенчмарк отрисовки в невидимом окне
+
+Сцены рисуются через настоящий GameView.on_draw. Для каждой сцены считаются
+кадры в секунду, процессорное время на кадр, количество вызовов отрисовки
+и количество примитивов, которые сгенерировал GPU.
+
+Запуск:
+    python render_benchmark.py --label immediate --output immediate.json
+    python render_benchmark.py --render-mode batched --label batched --compare immediate.json
+"""
+import argparse
+import json
+import random
+import sys
+import time
+
+import arcade
+
+from constants import (
+    SCREEN_WIDTH, SCREEN_HEIGHT, MARGIN, CELL_SIZE, GRID_WIDTH, GRID_HEIGHT,
+    MAX_ARENA_WIDTH, MAX_ARENA_HEIGHT
+)
+from benchmark import make_board, make_snake_body, set_snake_body, add_particles, SEED
+from audio import audio
+from block_sprite import BlockSprite
+from board_chunks import ChunkedBoardRenderer
+from board_stats import RowStats
+from particles import ParticleSystem
+from profiler import profiler
+
+DEFAULT_FRAMES = 300
+WARMUP_FRAMES = 20
+
+
+def setup_full_board(view):
+    """Почти заполненное поле со спрайтами блоков"""
+    set_board(view, make_board('nearly_full', random.Random(SEED)))
+    view.block_sprites.clear()
+    for y in range(GRID_HEIGHT):
+        for x in range(GRID_WIDTH):
+            if view.grid[y][x] is not None:
+                sprite = BlockSprite(x, y, view.grid[y][x])
+                # Анимация появления уже завершена
+                sprite.animation_scale = sprite.target_scale
+                sprite.scale = sprite.target_scale
+                view.block_sprites.append(sprite)
+
+
+def setup_long_snake(view):
+    """Змейка из 200 сегментов на пустом поле"""
+    set_board(view, make_board('empty', random.Random(SEED)))
+    view.block_sprites.clear()
+    set_snake_body(view, make_snake_body(view.grid, 200))
+
+
+def setup_particles(view):
+    """2000 частиц на пустом поле"""
+    set_board(view, make_board('empty', random.Random(SEED)))
+    view.block_sprites.clear()
+    view.particle_system.clear()
+    # Сцена измеряет отрисовку частиц, бюджет не должен их урезать
+    view.particle_system.budget = None
+    add_particles(view.particle_system, 2000)
+
+
+def setup_big_arena(view):
+    """Почти заполненная большая арена 200x400 без спрайтов блоков"""
+    set_board(view, make_board('nearly_full', random.Random(SEED),
+                               MAX_ARENA_WIDTH, MAX_ARENA_HEIGHT))
+    view.big_arena = True
+    view.use_block_sprites = False
+    view.render_mode = 'batched'
+    view.block_sprites.clear()
+    set_snake_body(view, [(MAX_ARENA_WIDTH // 2 - i, MAX_ARENA_HEIGHT - 3)
+                          for i in range(3)])
+
+
+SCENES = {
+    'full_board': setup_full_board,
+    'snake_200': setup_long_snake,
+    'particles_2000': setup_particles,
+    'big_arena': setup_big_arena,
+}
+
+
+def set_board(view, grid):
+    """Подменяет поле игрового экрана (вместе с размером и статистикой рядов)"""
+    view.grid = grid
+    view.big_arena = False
+    view.use_block_sprites = True
+    view.grid_height = len(grid)
+    view.grid_width = len(grid[0])
+    view.row_stats = RowStats(view.grid_width, view.grid_height)
+    view.row_stats.rebuild(grid)
+
+
+def apply_render_mode(view, render_mode):
+    """Включает выбранный способ отрисовки поля"""
+    if view.big_arena:
+        render_mode = 'batched'  # Большая арена рисуется только чанками
+    view.render_mode = render_mode
+    view.board_renderer = None
+    if render_mode == 'batched':
+        view.board_renderer = ChunkedBoardRenderer(view.grid_width, view.grid_height)
+
+
+def make_view(particles='gpu'):
+    """Создает игровой экран без музыки"""
+    from game import GameView
+    view = GameView(difficulty='medium', seed=SEED)
+    if particles == 'cpu':
+        view.particle_system = ParticleSystem()
+    audio.stop_music()
+    return view
+
+
+def run_scene(window, view, frames):
+    """Рисует сцену frames раз и возвращает метрики"""
+    ctx = window.ctx
+    for _ in range(WARMUP_FRAMES):
+        view.on_draw()
+    ctx.finish()
+
+    try:
+        query = ctx.query()
+    except Exception:
+        query = None  # Запросы к GPU поддерживаются не везде
+
+    draw_calls_start = profiler.total_draw_calls
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    for _ in range(frames):
+        if query is not None:
+            with query:
+                view.on_draw()
+        else:
+            view.on_draw()
+        # Ждем, пока GPU закончит кадр, чтобы время кадра было честным
+        ctx.finish()
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    draw_calls = profiler.total_draw_calls - draw_calls_start
+
+    result = {
+        'fps': frames / wall if wall > 0 else 0.0,
+        'frame_ms': wall / frames * 1000,
+        'cpu_ms_per_frame': cpu / frames * 1000,
+        'draw_calls_per_frame': draw_calls / frames,
+    }
+    if query is not None:
+        # Значения запроса относятся к последнему кадру
+        result['primitives_per_frame'] = query.primitives_generated
+        result['gpu_ms_per_frame'] = query.time_elapsed / 1e6
+    return result
+
+
+def main(argv=None):
+    """Точка входа бенчмарка отрисовки"""
+    parser = argparse.ArgumentParser(description="Бенчмарк отрисовки")
+    parser.add_argument('--frames', type=int, default=DEFAULT_FRAMES)
+    parser.add_argument('--scene', action='append', choices=sorted(SCENES),
+                        help="сцена (можно указать несколько раз)")
+    parser.add_argument('--render-mode', choices=('immediate', 'batched'),
+                        default='immediate', help="способ отрисовки поля")
+    parser.add_argument('--particles', choices=('cpu', 'gpu'), default='gpu',
+                        help="система частиц (на GPU - если поддерживается)")
+    parser.add_argument('--label', default='current',
+                        help="метка варианта отрисовки в результатах")
+    parser.add_argument('--output', help="файл для сохранения результатов (JSON)")
+    parser.add_argument('--compare', help="файл с результатами для сравнения")
+    args = parser.parse_args(argv)
+
+    window = arcade.Window(SCREEN_WIDTH, SCREEN_HEIGHT,
+                           "render benchmark", visible=False, vsync=False)
+    profiler.set_benchmark(True)
+
+    results = {}
+    for scene_name in args.scene or sorted(SCENES):
+        for camera_follow in (False, True):
+            view = make_view(args.particles)
+            window.show_view(view)
+            SCENES[scene_name](view)
+            apply_render_mode(view, args.render_mode)
+            # Большая арена всегда рисуется с камерой
+            view.camera_follow_snake = camera_follow or view.big_arena
+            head_x, head_y = view.snake.get_head()
+            view.camera_x = MARGIN + head_x * CELL_SIZE + CELL_SIZE // 2
+            view.camera_y = MARGIN + head_y * CELL_SIZE + CELL_SIZE // 2
+            name = f"{scene_name}[camera={'on' if view.camera_follow_snake else 'off'}]"
+            results[name] = run_scene(window, view, args.frames)
+
+    profiler.set_benchmark(False)
+    window.close()
+
+    other = {}
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            other = json.load(f)
+    other_results = other.get('results', {})
+
+    print(f"[{args.label}]" + (f" против [{other.get('label')}]" if other else ""))
+    print(f"{'сцена':<30} {'fps':>8} {'кадр мс':>8} {'cpu мс':>8} {'вызовы':>8} {'примитивы':>10}")
+    for name, result in results.items():
+        line = (f"{name:<30} {result['fps']:8.1f} {result['frame_ms']:8.2f}"
+                f" {result['cpu_ms_per_frame']:8.2f}"
+                f" {result['draw_calls_per_frame']:8.0f}"
+                f" {result.get('primitives_per_frame', '-'):>10}")
+        previous = other_results.get(name)
+        if previous and previous.get('frame_ms'):
+            ratio = result['frame_ms'] / previous['frame_ms']
+            line += f"  x{ratio:.2f} времени кадра"
+        print(line)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'label': args.label, 'frames': args.frames,
+                       'results': results}, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,6 +1,6 @@
 """Класс змейки с улучшенной графикой"""
 import arcade
-from constants import GRID_WIDTH, GRID_HEIGHT, MARGIN, CELL_SIZE
+from constants import GRID_WIDTH, GRID_HEIGHT, MARGIN, CELL_SIZE, MAX_QUEUED_TURNS
 
 
 def get_rgb(color):
@@ -13,32 +13,71 @@ def get_rgb(color):
         return (255, 255, 255)
 
 
+# Таблица клеток поля: CELLS[x][y] - кортеж (x, y), созданный один раз.
+# Тело змейки ссылается на эти кортежи, а не создает новый на каждом ходу
+CELLS = [[(x, y) for y in range(GRID_HEIGHT)] for x in range(GRID_WIDTH)]
+
+
+def reserve_cells(width, height):
+    """Расширяет таблицу клеток до поля width x height (большая арена)"""
+    for x, column in enumerate(CELLS):
+        column.extend((x, y) for y in range(len(column), height))
+    for x in range(len(CELLS), width):
+        CELLS.append([(x, y) for y in range(max(height, GRID_HEIGHT))])
+
+
+def grid_cell(x, y):
+    """Кортеж клетки (x, y) из таблицы (вне таблицы - новый кортеж)"""
+    if 0 <= x < len(CELLS):
+        column = CELLS[x]
+        if 0 <= y < len(column):
+            return column[y]
+    return (x, y)
+
+
 class Snake:
     """Класс для управления змейкой с красивой графикой"""
 
-    def __init__(self, x, y):
+    def __init__(self, x, y, snake_id=0, colors=None):
         """
         Создает змейку
         x, y: начальная позиция головы змейки
+        snake_id: номер змейки (когда на поле несколько змеек)
+        colors: цвета (голова, тело, хвост); по умолчанию зеленые
         """
+        self.snake_id = snake_id
         # Тело змейки: список кортежей (x, y), первый элемент - голова
-        self.body = [(x, y), (x - 1, y), (x - 2, y)]
+        self.body = [grid_cell(x, y), grid_cell(x - 1, y), grid_cell(x - 2, y)]
+        # Тело на предыдущем логическом тике (для интерполяции отрисовки)
+        self.prev_body = list(self.body)
         # Направление движения: 0=вверх, 1=вправо, 2=вниз, 3=влево
         self.direction = 1  # Изначально движется вправо
         # Следующее направление (меняется при нажатии клавиш)
         self.next_direction = 1
         # Очередь направлений для обработки быстро нажатых клавиш
+        # (не больше MAX_QUEUED_TURNS) и время нажатия каждого из них
         self.direction_queue = []
+        self.turn_times = []
+        # Время нажатия поворота, примененного на последнем ходе (или None)
+        self.applied_turn_time = None
         # Градиентные цвета для змейки (от головы к хвосту)
         self.head_color = (100, 255, 100)  # Яркий зеленый для головы
         self.body_color = (50, 200, 50)    # Средний зеленый для тела
         self.tail_color = (20, 150, 20)    # Темный зеленый для хвоста
+        if colors:
+            self.head_color, self.body_color, self.tail_color = colors
 
-    def change_direction(self, new_direction):
+    def change_direction(self, new_direction, pressed_at=None):
         """
         Добавляет направление в очередь (для обработки быстро нажатых клавиш)
         new_direction: 0=вверх, 1=вправо, 2=вниз, 3=влево
+        pressed_at: время нажатия (time.perf_counter) для замера задержки
+        Возвращает True, если поворот поставлен в очередь
         """
+        if len(self.direction_queue) >= MAX_QUEUED_TURNS:
+            # Очередь полна: поворот сыграл бы слишком поздно
+            return False
+
         # Определяем направление, против которого проверяем (последнее в очереди или следующее)
         if self.direction_queue:
             # Проверяем против последнего в очереди
@@ -51,14 +90,19 @@ class Snake:
             # Проверяем, что такое направление еще не в очереди (чтобы избежать дубликатов)
             if not self.direction_queue or self.direction_queue[-1] != new_direction:
                 self.direction_queue.append(new_direction)
+                self.turn_times.append(pressed_at)
+                return True
+        return False
 
     def move(self, grow=False):
         """Перемещает змейку в текущем направлении
         grow: если True, змейка растет (не удаляется хвост)
         """
         # Берем направление из очереди, если есть, иначе используем текущее
+        self.applied_turn_time = None
         if self.direction_queue:
             self.next_direction = self.direction_queue.pop(0)
+            self.applied_turn_time = self.turn_times.pop(0) if self.turn_times else None
 
         self.direction = self.next_direction
 
@@ -67,13 +111,13 @@ class Snake:
 
         # Вычисляем новую позицию головы в зависимости от направления
         if self.direction == 0:  # Вверх
-            new_head = (head_x, head_y + 1)
+            new_head = grid_cell(head_x, head_y + 1)
         elif self.direction == 1:  # Вправо
-            new_head = (head_x + 1, head_y)
+            new_head = grid_cell(head_x + 1, head_y)
         elif self.direction == 2:  # Вниз
-            new_head = (head_x, head_y - 1)
+            new_head = grid_cell(head_x, head_y - 1)
         else:  # Влево
-            new_head = (head_x - 1, head_y)
+            new_head = grid_cell(head_x - 1, head_y)
 
         # Добавляем новую голову
         self.body.insert(0, new_head)
@@ -81,6 +125,19 @@ class Snake:
         if not grow:
             self.body.pop()
 
+    def save_previous_state(self):
+        """Запоминает положение тела перед логическим тиком"""
+        self.prev_body = list(self.body)
+
+    def get_interpolated_position(self, index, alpha):
+        """Возвращает положение сегмента между прошлым и текущим тиком
+        alpha: 0 - положение на прошлом тике, 1 - на текущем"""
+        x, y = self.body[index]
+        if alpha >= 1.0 or index >= len(self.prev_body):
+            return x, y
+        prev_x, prev_y = self.prev_body[index]
+        return prev_x + (x - prev_x) * alpha, prev_y + (y - prev_y) * alpha
+
     def get_body(self):
         """Возвращает список позиций тела змейки"""
         return self.body
@@ -116,16 +173,27 @@ class Snake:
         self.body = self.body[:index]
         return removed_count
 
-    def draw(self):
-        """Отрисовка змейки с градиентом и эффектами"""
+    def draw(self, alpha=1.0, grid_width=GRID_WIDTH, grid_height=GRID_HEIGHT,
+             visible=None):
+        """Отрисовка змейки с градиентом и эффектами
+        alpha: доля времени между прошлым и текущим тиком (для плавного движения)
+        grid_width, grid_height: размер поля
+        visible: видимые клетки (x0, x1, y0, y1 включительно); сегменты вне их не рисуются"""
         body_len = len(self.body)
+        if visible is None:
+            visible = (0, grid_width - 1, 0, grid_height - 1)
+        min_x = max(0, visible[0])
+        max_x = min(grid_width - 1, visible[1])
+        min_y = max(0, visible[2])
+        max_y = min(grid_height - 1, visible[3])
 
         for idx, (x, y) in enumerate(self.body):
-            if 0 <= x < GRID_WIDTH and 0 <= y < GRID_HEIGHT:
-                left = MARGIN + x * CELL_SIZE + 2
-                right = MARGIN + (x + 1) * CELL_SIZE - 2
-                bottom = MARGIN + y * CELL_SIZE + 2
-                top = MARGIN + (y + 1) * CELL_SIZE - 2
+            if min_x <= x <= max_x and min_y <= y <= max_y:
+                draw_x, draw_y = self.get_interpolated_position(idx, alpha)
+                left = MARGIN + draw_x * CELL_SIZE + 2
+                right = MARGIN + (draw_x + 1) * CELL_SIZE - 2
+                bottom = MARGIN + draw_y * CELL_SIZE + 2
+                top = MARGIN + (draw_y + 1) * CELL_SIZE - 2
 
                 if top > bottom:
                     # Градиент цвета от головы к хвосту
@@ -0,0 +1,481 @@
+"""Трансляция игры зрителям
+
+Игра после каждого кадра, в котором изменилась логика, отправляет зрителям
+компактную разницу: изменившиеся клетки поля, новые головы и число убранных
+клеток хвоста каждой змейки, фигуру, яблоко и изменение счета. Разница
+вычисляется только по помеченным областям поля и по меткам ходов змеек,
+поэтому ее цена не зависит от размера поля.
+
+Сокет и все подключения зрителей обслуживаются в фоновом потоке (asyncio).
+Поток держит свою копию поля (BoardMirror), раз в KEYFRAME_INTERVAL разниц
+собирает из нее ключевой кадр и отправляет его всем зрителям. Новый зритель
+получает последний ключевой кадр и разницы после него. Зритель, который не
+успевает читать, пропускает разницы до следующего ключевого кадра - игра
+его не ждет.
+
+Адрес задается в settings.json (spectator_address): "127.0.0.1:7780"
+или "unix:/tmp/snake.sock". Зритель - spectator_viewer.py.
+
+Модуль не зависит от arcade.
+"""
+import asyncio
+import collections
+import json
+import struct
+import threading
+import zlib
+
+from constants import COLORS, TETROMINOES
+
+DEFAULT_SPECTATOR_PORT = 7780
+
+# Типы сообщений (первый байт сообщения)
+SPEC_KEYFRAME = 1  # тик, полное состояние (JSON, zlib)
+SPEC_DIFF = 2      # тик, разница с предыдущим сообщением
+
+# Разница: тип, тик, изменение счета, число клеток, число змеек, флаги
+DIFF_HEADER = struct.Struct('!BIiHBB')
+CELL_FORMAT = struct.Struct('!HHB')         # x, y, код цвета (EMPTY_CODE - пусто)
+SNAKE_HEADER = struct.Struct('!BHH')        # номер, новых голов, убрано с хвоста
+HEAD_FORMAT = struct.Struct('!hh')
+PIECE_FORMAT = struct.Struct('!BBhh8b')     # тип, код цвета, x, y, форма
+APPLE_FORMAT = struct.Struct('!hh')
+
+EMPTY_CODE = 255
+# Число новых голов, означающее, что змейка погибла и убрана с поля
+SNAKE_REMOVED = 0xFFFF
+FLAG_PIECE = 1     # в сообщении есть фигура
+FLAG_NO_PIECE = 2  # фигуры больше нет
+FLAG_APPLE = 4     # в сообщении есть яблоко
+FLAG_NO_APPLE = 8  # яблока больше нет
+
+PIECE_TYPES = sorted(TETROMINOES)
+COLOR_INDEX = {color: index for index, color in enumerate(COLORS)}
+
+# Длина перед сообщением: ключевой кадр большой арены может не поместиться
+# в двухбайтовую длину сообщений netplay
+LONG_FRAME_HEADER = struct.Struct('!I')
+
+# Через сколько разниц фоновый поток рассылает ключевой кадр
+KEYFRAME_INTERVAL = 100
+# Сколько байт может скопиться в буфере отправки зрителя, прежде чем
+# он начнет пропускать разницы до ключевого кадра
+MAX_CLIENT_BUFFER = 256 * 1024
+
+
+def parse_address(address):
+    """Разбирает адрес: ('unix', путь) или ('tcp', (хост, порт))"""
+    if address.startswith('unix:'):
+        return 'unix', address[len('unix:'):]
+    host, _, port = address.rpartition(':')
+    if not host:
+        host, port = port, ''
+    return 'tcp', (host or '127.0.0.1', int(port or DEFAULT_SPECTATOR_PORT))
+
+
+def encode_frame_long(payload):
+    """Добавляет к сообщению четырехбайтовую длину"""
+    return LONG_FRAME_HEADER.pack(len(payload)) + payload
+
+
+def encode_piece(piece):
+    """Фигура в виде кортежа (тип, код цвета, x, y, форма) или None"""
+    if piece is None:
+        return None
+    return (PIECE_TYPES.index(piece.piece_type), COLOR_INDEX.get(piece.color, 0),
+            piece.x, piece.y, tuple(piece.shape))
+
+
+class BoardMirror:
+    """Копия видимого состояния игры, собранная из сообщений трансляции
+
+    Используется фоновым потоком трансляции (для ключевых кадров) и зрителем.
+    """
+
+    def __init__(self):
+        self.tick = 0
+        self.width = 0
+        self.height = 0
+        self.grid = []
+        self.snakes = {}  # номер -> deque клеток (голова первая)
+        self.piece = None
+        self.apple = None
+        self.score = 0
+        self.has_keyframe = False
+
+    def apply(self, payload):
+        """Применяет сообщение; возвращает изменившиеся клетки поля или None,
+        если изменилось все поле (ключевой кадр)"""
+        if payload[0] == SPEC_KEYFRAME:
+            self.apply_keyframe(payload)
+            return None
+        return self.apply_diff(payload)
+
+    def apply_keyframe(self, payload):
+        """Загружает ключевой кадр"""
+        (self.tick,) = struct.unpack_from('!I', payload, 1)
+        state = json.loads(zlib.decompress(payload[5:]))
+        self.width, self.height = state['size']
+        self.grid = [[None if code == '.' else COLORS[int(code)] for code in row]
+                     for row in state['grid']]
+        self.snakes = {snake_id: collections.deque(tuple(cell) for cell in body)
+                       for snake_id, body in state['snakes']}
+        self.piece = None
+        if state['piece']:
+            piece_type, color, x, y, shape = state['piece']
+            self.piece = (piece_type, color, x, y, tuple(tuple(cell) for cell in shape))
+        self.apple = tuple(state['apple']) if state['apple'] else None
+        self.score = state['score']
+        self.has_keyframe = True
+
+    def apply_diff(self, payload):
+        """Применяет разницу; возвращает список изменившихся клеток поля"""
+        if not self.has_keyframe:
+            return []
+        (_, self.tick, score_delta, cell_count, snake_count,
+         flags) = DIFF_HEADER.unpack_from(payload)
+        self.score += score_delta
+        offset = DIFF_HEADER.size
+
+        changed = []
+        for _ in range(cell_count):
+            x, y, code = CELL_FORMAT.unpack_from(payload, offset)
+            offset += CELL_FORMAT.size
+            if 0 <= x < self.width and 0 <= y < self.height:
+                self.grid[y][x] = None if code == EMPTY_CODE else COLORS[code]
+                changed.append((x, y))
+
+        for _ in range(snake_count):
+            snake_id, heads, removed = SNAKE_HEADER.unpack_from(payload, offset)
+            offset += SNAKE_HEADER.size
+            if heads == SNAKE_REMOVED:
+                self.snakes.pop(snake_id, None)
+                continue
+            body = self.snakes.setdefault(snake_id, collections.deque())
+            new_heads = []
+            for _ in range(heads):
+                new_heads.append(HEAD_FORMAT.unpack_from(payload, offset))
+                offset += HEAD_FORMAT.size
+            # Головы идут от новой к старой
+            body.extendleft(reversed(new_heads))
+            for _ in range(min(removed, len(body))):
+                body.pop()
+
+        if flags & FLAG_PIECE:
+            values = PIECE_FORMAT.unpack_from(payload, offset)
+            offset += PIECE_FORMAT.size
+            shape = tuple(zip(values[4::2], values[5::2]))
+            self.piece = values[:4] + (shape,)
+        elif flags & FLAG_NO_PIECE:
+            self.piece = None
+        if flags & FLAG_APPLE:
+            self.apple = APPLE_FORMAT.unpack_from(payload, offset)
+            offset += APPLE_FORMAT.size
+        elif flags & FLAG_NO_APPLE:
+            self.apple = None
+        return changed
+
+    def keyframe(self):
+        """Собирает ключевой кадр из текущего состояния"""
+        return encode_keyframe(
+            self.tick, self.width, self.height,
+            [''.join('.' if cell is None else str(COLOR_INDEX[cell]) for cell in row)
+             for row in self.grid],
+            [[snake_id, list(body)] for snake_id, body in self.snakes.items()],
+            self.piece, self.apple, self.score)
+
+
+def encode_keyframe(tick, width, height, grid_rows, snakes, piece, apple, score):
+    """Кодирует ключевой кадр"""
+    state = {
+        'size': [width, height],
+        'grid': grid_rows,
+        'snakes': snakes,
+        'piece': piece,
+        'apple': apple,
+        'score': score,
+    }
+    body = json.dumps(state, separators=(',', ':')).encode('utf-8')
+    return struct.pack('!BI', SPEC_KEYFRAME, tick) + zlib.compress(body, 6)
+
+
+class SpectatorBroadcaster:
+    """Трансляция игры зрителям
+
+    Методы mark_* и publish вызываются из игрового цикла; сеть обслуживается
+    в фоновом потоке.
+    """
+
+    def __init__(self, address):
+        """address: "хост:порт" или "unix:путь" """
+        self.address = address
+        # Что было отправлено зрителям в прошлый раз
+        self.shadow_grid = None
+        self.shadow_snakes = {}  # номер -> (метка хода головы, длина)
+        self.shadow_piece = None
+        self.shadow_apple = None
+        self.shadow_score = 0
+        # Помеченные изменения поля с прошлой отправки
+        self.dirty_cells = set()
+        self.dirty_from_row = None
+        self.dirty_columns = set()
+        self.needs_keyframe = True
+
+        self.mirror = BoardMirror()
+        self.clients = {}  # writer -> пропускает разницы до ключевого кадра
+        self.backlog = []  # последний ключевой кадр и разницы после него
+        self.diffs_since_keyframe = 0
+        self.messages_sent = 0
+        self.closed = False
+        self._loop = asyncio.new_event_loop()
+        self._server = None
+        self._handlers = set()
+        self._started = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name='spectator', daemon=True)
+        self._thread.start()
+        self._started.wait()
+
+    # --- игровой поток ------------------------------------------------------
+
+    def mark_cell(self, x, y):
+        """Клетка поля изменилась"""
+        self.dirty_cells.add((x, y))
+
+    def mark_rows(self, from_y):
+        """Ряды начиная с from_y сдвинулись (после удаления линии)"""
+        if self.dirty_from_row is None or from_y < self.dirty_from_row:
+            self.dirty_from_row = from_y
+
+    def mark_column(self, x):
+        """Столбец сдвинулся (после удаления столбца)"""
+        self.dirty_columns.add(x)
+
+    def mark_all(self):
+        """Состояние заменено целиком (следующим сообщением будет ключевой кадр)"""
+        self.needs_keyframe = True
+
+    def publish(self, view):
+        """Отправляет зрителям изменения с прошлого вызова (если они есть)"""
+        if self.closed:
+            return
+        tick = view.snake_clock.ticks
+        if self.needs_keyframe or self.shadow_grid is None:
+            self._publish_keyframe(view, tick)
+            return
+
+        cells = self._changed_cells(view.grid)
+        snakes = self._changed_snakes(view)
+        piece = encode_piece(view.current_piece)
+        apple = view.apple.get_position() if view.apple else None
+        score_delta = view.score - self.shadow_score
+        flags = 0
+        if piece != self.shadow_piece:
+            flags |= FLAG_PIECE if piece else FLAG_NO_PIECE
+        if apple != self.shadow_apple:
+            flags |= FLAG_APPLE if apple else FLAG_NO_APPLE
+        if not (cells or snakes or flags or score_delta):
+            return
+
+        parts = [DIFF_HEADER.pack(SPEC_DIFF, tick, score_delta, len(cells),
+                                  len(snakes), flags)]
+        for x, y, color in cells:
+            parts.append(CELL_FORMAT.pack(
+                x, y, EMPTY_CODE if color is None else COLOR_INDEX.get(color, 0)))
+        for snake_id, heads, removed in snakes:
+            parts.append(SNAKE_HEADER.pack(
+                snake_id, SNAKE_REMOVED if heads is None else len(heads), removed))
+            for head in heads or ():
+                parts.append(HEAD_FORMAT.pack(*head))
+        if flags & FLAG_PIECE:
+            piece_type, color, x, y, shape = piece
+            parts.append(PIECE_FORMAT.pack(
+                piece_type, color, x, y, *[v for cell in shape for v in cell]))
+        if flags & FLAG_APPLE:
+            parts.append(APPLE_FORMAT.pack(*apple))
+        self.shadow_piece = piece
+        self.shadow_apple = apple
+        self.shadow_score = view.score
+        self._submit(b''.join(parts))
+
+    def close(self):
+        """Закрывает сокет и отключает зрителей"""
+        if self.closed:
+            return
+        self.closed = True
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop)
+
+    def _publish_keyframe(self, view, tick):
+        """Отправляет полное состояние и запоминает его как отправленное"""
+        self.shadow_grid = [list(row) for row in view.grid]
+        self.shadow_snakes = {
+            snake.snake_id: (view.occupancy.head_stamps.get(snake.snake_id, 0),
+                             len(snake.body))
+            for snake in view.snakes}
+        self.shadow_piece = encode_piece(view.current_piece)
+        self.shadow_apple = view.apple.get_position() if view.apple else None
+        self.shadow_score = view.score
+        self.dirty_cells.clear()
+        self.dirty_from_row = None
+        self.dirty_columns.clear()
+        self.needs_keyframe = False
+        self._submit(encode_keyframe(
+            tick, view.grid_width, view.grid_height,
+            [''.join('.' if cell is None else str(COLOR_INDEX.get(cell, 0))
+                     for cell in row) for row in view.grid],
+            [[snake.snake_id, snake.body] for snake in view.snakes],
+            self.shadow_piece, self.shadow_apple, view.score))
+
+    def _changed_cells(self, grid):
+        """Сравнивает помеченные области поля с отправленной копией"""
+        cells = []
+        shadow = self.shadow_grid
+        width = len(grid[0]) if grid else 0
+        rows = range(self.dirty_from_row, len(grid)) \
+            if self.dirty_from_row is not None else ()
+        for y in rows:
+            row = grid[y]
+            shadow_row = shadow[y]
+            if row == shadow_row:
+                continue
+            for x in range(width):
+                if row[x] != shadow_row[x]:
+                    cells.append((x, y, row[x]))
+                    shadow_row[x] = row[x]
+        for x in self.dirty_columns:
+            for y in range(len(grid)):
+                if grid[y][x] != shadow[y][x]:
+                    cells.append((x, y, grid[y][x]))
+                    shadow[y][x] = grid[y][x]
+        for x, y in self.dirty_cells:
+            if grid[y][x] != shadow[y][x]:
+                cells.append((x, y, grid[y][x]))
+                shadow[y][x] = grid[y][x]
+        self.dirty_cells.clear()
+        self.dirty_from_row = None
+        self.dirty_columns.clear()
+        return cells
+
+    def _changed_snakes(self, view):
+        """Новые головы и число убранных клеток хвоста каждой змейки
+
+        Возвращает список (номер, головы от новой к старой или None, если
+        змейка погибла, убрано с хвоста). Сколько ходов сделала змейка,
+        видно по метке хода головы в индексе занятости.
+        """
+        changes = []
+        alive = set()
+        head_stamps = view.occupancy.head_stamps
+        for snake in view.snakes:
+            snake_id = snake.snake_id
+            alive.add(snake_id)
+            stamp = head_stamps.get(snake_id, 0)
+            length = len(snake.body)
+            old_stamp, old_length = self.shadow_snakes.get(snake_id, (stamp - length, 0))
+            if (stamp, length) == (old_stamp, old_length):
+                continue
+            heads = snake.body[:min(length, stamp - old_stamp)]
+            changes.append((snake_id, heads, max(0, old_length + len(heads) - length)))
+            self.shadow_snakes[snake_id] = (stamp, length)
+        for snake_id in [snake_id for snake_id in self.shadow_snakes
+                         if snake_id not in alive]:
+            del self.shadow_snakes[snake_id]
+            changes.append((snake_id, None, 0))
+        return changes
+
+    def _submit(self, payload):
+        """Передает сообщение фоновому потоку"""
+        self.messages_sent += 1
+        self._loop.call_soon_threadsafe(self._broadcast, payload)
+
+    # --- фоновый поток ------------------------------------------------------
+
+    def _run(self):
+        """Цикл фонового потока"""
+        asyncio.set_event_loop(self._loop)
+        kind, target = parse_address(self.address)
+        try:
+            if kind == 'unix':
+                self._server = self._loop.run_until_complete(
+                    asyncio.start_unix_server(self._handle_client, target))
+            else:
+                self._server = self._loop.run_until_complete(
+                    asyncio.start_server(self._handle_client, *target))
+        except OSError:
+            # Адрес занят или недоступен: игра идет без трансляции
+            self.closed = True
+            self._started.set()
+            return
+        self._started.set()
+        self._loop.run_forever()
+        self._loop.close()
+
+    def _broadcast(self, payload):
+        """Применяет сообщение к копии поля и рассылает его зрителям"""
+        if payload[0] == SPEC_DIFF and self.diffs_since_keyframe >= KEYFRAME_INTERVAL:
+            # Периодический ключевой кадр: новым и отставшим зрителям
+            # не нужно получать длинную цепочку разниц
+            self.mirror.apply(payload)
+            payload = self.mirror.keyframe()
+        else:
+            self.mirror.apply(payload)
+
+        if payload[0] == SPEC_KEYFRAME:
+            self.backlog = [payload]
+            self.diffs_since_keyframe = 0
+        else:
+            self.backlog.append(payload)
+            self.diffs_since_keyframe += 1
+
+        frame = encode_frame_long(payload)
+        for writer, waiting in list(self.clients.items()):
+            if writer.is_closing():
+                self.clients.pop(writer, None)
+                continue
+            if waiting and payload[0] != SPEC_KEYFRAME:
+                continue
+            if writer.transport.get_write_buffer_size() > MAX_CLIENT_BUFFER:
+                # Зритель не успевает читать - ждет следующего ключевого кадра
+                self.clients[writer] = True
+                continue
+            self.clients[writer] = False
+            writer.write(frame)
+
+    async def _handle_client(self, reader, writer):
+        """Новый зритель: получает последний ключевой кадр и разницы после него"""
+        for payload in self.backlog:
+            writer.write(encode_frame_long(payload))
+        self.clients[writer] = not self.backlog
+        self._handlers.add(asyncio.current_task())
+        try:
+            # Зритель ничего не отправляет; ждем отключения
+            while await reader.read(1024):
+                pass
+        except ConnectionError:
+            pass
+        finally:
+            self._handlers.discard(asyncio.current_task())
+            self.clients.pop(writer, None)
+            writer.close()
+
+    async def _shutdown(self):
+        """Закрывает сервер и подключения (в фоновом потоке)"""
+        if self._server:
+            self._server.close()
+        for writer in list(self.clients):
+            writer.close()
+        # Обработчики зрителей завершаются, увидев закрытое соединение
+        if self._handlers:
+            await asyncio.wait(list(self._handlers), timeout=1.0)
+        self._loop.stop()
+
+
+def create_broadcaster(settings):
+    """Создает трансляцию по настройкам (или None, если адрес не задан)"""
+    address = settings.get('spectator_address', '')
+    if not address:
+        return None
+    broadcaster = SpectatorBroadcaster(address)
+    if broadcaster.closed:
+        return None
+    return broadcaster
@@ -0,0 +1,173 @@
+"""Зритель трансляции игры
+
+Подключается к трансляции (spectator_address в settings.json игры)
+и рисует поле, змеек, фигуру и яблоко из полученных сообщений.
+
+Запуск:
+    python spectator_viewer.py 127.0.0.1:7780
+    python spectator_viewer.py unix:/tmp/snake.sock
+"""
+import argparse
+import queue
+import socket
+import threading
+
+import arcade
+
+from constants import (
+    SCREEN_WIDTH, SCREEN_HEIGHT, MARGIN, CELL_SIZE, COLORS, SNAKE_COLORS
+)
+from board_chunks import ChunkedBoardRenderer
+from netplay import FrameReader
+from snake import Snake
+from spectator import BoardMirror, LONG_FRAME_HEADER, parse_address
+
+
+class SpectatorClient:
+    """Подключение к трансляции; сокет читается в фоновом потоке"""
+
+    def __init__(self, address):
+        kind, target = parse_address(address)
+        if kind == 'unix':
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.connect(target)
+        else:
+            self.sock = socket.create_connection(target)
+        self.closed = False
+        self._incoming = queue.SimpleQueue()
+        threading.Thread(target=self._read_loop, name='spectator', daemon=True).start()
+
+    def _read_loop(self):
+        """Фоновый поток: читает сообщения из сокета"""
+        reader = FrameReader(LONG_FRAME_HEADER)
+        try:
+            while True:
+                data = self.sock.recv(65536)
+                if not data:
+                    break
+                for frame in reader.feed(data):
+                    self._incoming.put(frame)
+        except OSError:
+            pass
+        self._incoming.put(None)
+
+    def poll(self):
+        """Возвращает пришедшие сообщения"""
+        frames = []
+        while True:
+            try:
+                frame = self._incoming.get_nowait()
+            except queue.Empty:
+                break
+            if frame is None:
+                self.closed = True
+                break
+            frames.append(frame)
+        return frames
+
+
+class SpectatorWindow(arcade.Window):
+    """Окно зрителя: поле целиком, масштаб подбирается под размер окна"""
+
+    def __init__(self, client):
+        super().__init__(SCREEN_WIDTH, SCREEN_HEIGHT, "Тетрис со змейкой - зритель",
+                         resizable=True)
+        arcade.set_background_color((20, 25, 40))
+        self.client = client
+        self.mirror = BoardMirror()
+        self.board_renderer = None
+        self.snakes = {}
+        self.camera = arcade.Camera2D()
+        self.ui_camera = arcade.Camera2D()
+
+    def on_update(self, delta_time):
+        """Применяет пришедшие сообщения"""
+        mirror = self.mirror
+        for payload in self.client.poll():
+            changed = mirror.apply(payload)
+            if changed is None:
+                # Ключевой кадр: поле могло смениться целиком
+                renderer = self.board_renderer
+                if (renderer is None or renderer.grid_width != mirror.width
+                        or renderer.grid_height != mirror.height):
+                    self.board_renderer = ChunkedBoardRenderer(mirror.width, mirror.height)
+                else:
+                    renderer.mark_all_dirty()
+            else:
+                for x, y in changed:
+                    self.board_renderer.mark_cell_dirty(x, y)
+
+        # Змейки рисуются так же, как в игре
+        for snake_id in [snake_id for snake_id in self.snakes
+                         if snake_id not in mirror.snakes]:
+            del self.snakes[snake_id]
+        for snake_id, body in mirror.snakes.items():
+            snake = self.snakes.get(snake_id)
+            if snake is None:
+                snake = Snake(0, 0, snake_id, SNAKE_COLORS[snake_id % len(SNAKE_COLORS)])
+                self.snakes[snake_id] = snake
+            snake.body = list(body)
+            snake.prev_body = snake.body
+
+    def on_draw(self):
+        """Рисует поле и счет"""
+        self.clear()
+        mirror = self.mirror
+        if self.board_renderer:
+            board_width = mirror.width * CELL_SIZE + MARGIN * 2
+            board_height = mirror.height * CELL_SIZE + MARGIN * 2
+            self.camera.position = (board_width / 2, board_height / 2)
+            self.camera.zoom = min(self.width / board_width, self.height / board_height)
+            self.camera.use()
+            self.board_renderer.draw(mirror.grid, (0, board_width, 0, board_height))
+
+            for snake in self.snakes.values():
+                snake.draw(1.0, mirror.width, mirror.height)
+
+            if mirror.piece:
+                _, color_code, piece_x, piece_y, shape = mirror.piece
+                color = COLORS[color_code]
+                for dx, dy in shape:
+                    x = piece_x + dx
+                    y = piece_y + dy
+                    if 0 <= x < mirror.width and 0 <= y < mirror.height:
+                        arcade.draw_lrbt_rectangle_filled(
+                            MARGIN + x * CELL_SIZE + 1, MARGIN + (x + 1) * CELL_SIZE - 1,
+                            MARGIN + y * CELL_SIZE + 1, MARGIN + (y + 1) * CELL_SIZE - 1,
+                            color)
+
+            if mirror.apple:
+                apple_x, apple_y = mirror.apple
+                arcade.draw_circle_filled(
+                    MARGIN + apple_x * CELL_SIZE + CELL_SIZE / 2,
+                    MARGIN + apple_y * CELL_SIZE + CELL_SIZE / 2,
+                    CELL_SIZE * 0.4, (220, 40, 40))
+
+        self.ui_camera.use()
+        if not mirror.has_keyframe:
+            status = "Трансляция закончилась" if self.client.closed else "Ожидание трансляции..."
+        else:
+            status = f"Счёт: {mirror.score}   Тик: {mirror.tick}"
+            if self.client.closed:
+                status += "   (трансляция закончилась)"
+        arcade.draw_text(status, 10, self.height - 30, arcade.color.WHITE, 16)
+
+    def on_resize(self, width, height):
+        """Камеры подстраиваются под новый размер окна"""
+        super().on_resize(width, height)
+        self.camera.match_window()
+        self.ui_camera.match_window()
+
+
+def main(argv=None):
+    """Точка входа зрителя"""
+    parser = argparse.ArgumentParser(description="Зритель трансляции игры")
+    parser.add_argument('address', nargs='?', default='127.0.0.1:7780',
+                        help='адрес трансляции: "хост:порт" или "unix:путь"')
+    args = parser.parse_args(argv)
+    SpectatorWindow(SpectatorClient(args.address))
+    arcade.run()
+
+
+if __name__ == '__main__':
+    main()
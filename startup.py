@@ -0,0 +1,113 @@
+"""Быстрый запуск: прогрев ресурсов в фоне и отчет о времени запуска
+
+Окно с меню показывается сразу, а модуль игры, звуки и текстуры готовятся
+в фоновом потоке, пока игрок смотрит на меню. Первый кадр игры их уже
+не ждет (если игру начали раньше, чем прогрев закончился, ждется только
+оставшаяся часть).
+
+С флагом --startup-report после первого кадра меню и конца прогрева
+печатается, сколько заняли импорты, создание окна, первый кадр и прогрев.
+"""
+import contextlib
+import threading
+import time
+
+
+class StartupReport:
+    """Время этапов запуска (от импорта этого модуля)"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.enabled = False
+        self.steps = []           # (начало, длительность, имя, поток) в секундах
+        self.first_frame = None   # Время первого кадра от старта
+        self.warm_up_done = False
+        self.warm_up_error = None  # Исключение фонового прогрева (или None)
+        self.notes = []            # Замечания (например, откат на запасной путь)
+        self.printed = False
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def measure(self, name):
+        """Замеряет этап запуска"""
+        begin = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            with self._lock:
+                self.steps.append((begin - self.started, end - begin, name,
+                                   threading.current_thread().name))
+
+    def frame_drawn(self):
+        """Отмечает кадр; отчет печатается после первого кадра и прогрева"""
+        if self.first_frame is None:
+            self.first_frame = time.perf_counter() - self.started
+            self._maybe_print()
+
+    def finish_warm_up(self):
+        """Отмечает конец прогрева"""
+        self.warm_up_done = True
+        self._maybe_print()
+
+    def note(self, message):
+        """Запоминает замечание для отчета; если отчет уже напечатан,
+        замечание печатается сразу (только с --startup-report)"""
+        with self._lock:
+            self.notes.append(message)
+            late = self.enabled and self.printed
+        if late:
+            print(message)
+
+    def _maybe_print(self):
+        with self._lock:
+            if (not self.enabled or self.printed or self.first_frame is None
+                    or not self.warm_up_done):
+                return
+            self.printed = True
+            steps = sorted(self.steps)
+        print(self.format(steps))
+
+    def format(self, steps):
+        """Текст отчета"""
+        lines = ["Запуск (мс):", f"{'этап':<28}{'начало':>10}{'длительность':>14}  поток"]
+        for begin, duration, name, thread in steps:
+            lines.append(f"{name:<28}{begin * 1000:>10.1f}{duration * 1000:>14.1f}  {thread}")
+        lines.append(f"{'первый кадр меню':<28}{self.first_frame * 1000:>10.1f}")
+        if self.warm_up_error is not None:
+            lines.append(f"Прогрев не удался: {self.warm_up_error}")
+        lines.extend(self.notes)
+        return "\n".join(lines)
+
+
+def warm_up():
+    """Готовит то, что нужно первому кадру игры (вызывается в фоновом потоке)"""
+    try:
+        with report.measure('import game'):
+            import game  # noqa: F401  (модуль игры и все его зависимости)
+        with report.measure('звуки'):
+            from audio import audio
+            audio.load()
+        with report.measure('текстуры'):
+            from constants import COLORS
+            from apple import apple_texture
+            from block_sprite import block_texture
+            apple_texture()
+            for color in COLORS:
+                block_texture(color)
+    except Exception as e:
+        # Прогрев необязателен: все это загрузится и при старте игры
+        # (ошибка видна только в отчете --startup-report)
+        report.warm_up_error = e
+    finally:
+        report.finish_warm_up()
+
+
+def start_warm_up():
+    """Запускает прогрев в фоновом потоке"""
+    thread = threading.Thread(target=warm_up, name='warm-up', daemon=True)
+    thread.start()
+    return thread
+
+
+report = StartupReport()
@@ -0,0 +1,211 @@
+"""Телеметрия логических тиков (запись в JSONL или CSV)"""
+import csv
+import gc
+import io
+import json
+import os
+import queue
+import threading
+import time
+
+# Фазы, для которых в CSV есть отдельные колонки (в JSONL пишутся все фазы)
+CSV_PHASES = (
+    'snake_tick', 'autopilot', 'piece_tick', 'lock_piece', 'spawn_piece', 'spawn_apple',
+    'is_apple_accessible', 'animations', 'particles_update', 'jobs',
+    'draw_grid', 'draw_blocks', 'snake_draw', 'particles_draw', 'hud',
+)
+# Счетчики, которые пишутся в каждую запись
+COUNTERS = ('bfs_nodes', 'apple_spawn_attempts', 'piece_spawn_attempts',
+            'particles_dropped', 'input_latency_us', 'autopilot_nodes', 'job_steps')
+CSV_FIELDS = (
+    ('tick', 'time', 'particles', 'block_sprites', 'snake_length')
+    + COUNTERS
+    + ('gc_collections', 'gc_pause_us')
+    + tuple(f'{phase}_us' for phase in CSV_PHASES)
+)
+# Как часто фоновый поток сбрасывает записи в файл (в секундах)
+WRITE_INTERVAL = 1.0
+
+
+class GCPauseMeter:
+    """Считает паузы сборщика мусора через gc.callbacks"""
+
+    def __init__(self):
+        self.collections = 0
+        self.pause_ns = 0
+        self._start = 0
+
+    def install(self):
+        """Подключает обработчик к сборщику мусора"""
+        if self._callback not in gc.callbacks:
+            gc.callbacks.append(self._callback)
+
+    def remove(self):
+        """Отключает обработчик"""
+        if self._callback in gc.callbacks:
+            gc.callbacks.remove(self._callback)
+
+    def _callback(self, phase, info):
+        """Вызывается сборщиком мусора в начале и в конце сборки"""
+        if phase == 'start':
+            self._start = time.perf_counter_ns()
+        elif self._start:
+            self.pause_ns += time.perf_counter_ns() - self._start
+            self.collections += 1
+            self._start = 0
+
+    def pop(self):
+        """Возвращает количество сборок и суммарную паузу и сбрасывает их"""
+        result = (self.collections, self.pause_ns)
+        self.collections = 0
+        self.pause_ns = 0
+        return result
+
+
+class TelemetrySink:
+    """Приемник телеметрии
+
+    Запись тика только кладется в очередь; сериализация, запись на диск
+    и ротация файлов по размеру выполняются в фоновом потоке, чтобы
+    телеметрия не искажала время кадров, которое она измеряет.
+    """
+
+    def __init__(self, path, fmt='jsonl', max_bytes=5_000_000, backups=3):
+        """
+        path: путь к файлу телеметрии
+        fmt: формат файла ('jsonl' или 'csv')
+        max_bytes: размер файла, после которого начинается новый файл
+        backups: сколько старых файлов хранить (path.1, path.2, ...)
+        """
+        self.path = path
+        self.fmt = 'csv' if fmt == 'csv' else 'jsonl'
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.gc_meter = GCPauseMeter()
+        self._queue = queue.SimpleQueue()
+        self._closed = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name='telemetry', daemon=True)
+        self._file = None
+        self.gc_meter.install()
+        self._thread.start()
+
+    def record(self, tick, sim_time, phase_times, counters,
+               particles, block_sprites, snake_length):
+        """Добавляет запись о логическом тике (вызывается из игрового цикла)"""
+        gc_collections, gc_pause_ns = self.gc_meter.pop()
+        self._queue.put((
+            tick, sim_time, phase_times, counters,
+            particles, block_sprites, snake_length,
+            gc_collections, gc_pause_ns,
+        ))
+
+    def close(self):
+        """Останавливает фоновый поток, дописав оставшиеся записи"""
+        self.gc_meter.remove()
+        self._closed.set()
+
+    def _run(self):
+        """Цикл фонового потока"""
+        while True:
+            closed = self._closed.wait(WRITE_INTERVAL)
+            self._write_pending()
+            if closed:
+                break
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def _write_pending(self):
+        """Записывает все накопившиеся записи одним блоком"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer) if self.fmt == 'csv' else None
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if writer:
+                writer.writerow(self._csv_row(item))
+            else:
+                buffer.write(json.dumps(self._json_record(item),
+                                        separators=(',', ':')))
+                buffer.write('\n')
+        data = buffer.getvalue()
+        if not data:
+            return
+        try:
+            self._open_file()
+            self._file.write(data)
+            self._file.flush()
+            if self._file.tell() >= self.max_bytes:
+                self._rotate()
+        except OSError:
+            pass
+
+    def _json_record(self, item):
+        """Компактная запись для JSONL"""
+        (tick, sim_time, phase_times, counters, particles, block_sprites,
+         snake_length, gc_collections, gc_pause_ns) = item
+        return {
+            'tick': tick,
+            't': round(sim_time, 4),
+            'phases_us': {name: duration // 1000
+                          for name, duration in phase_times.items()},
+            'particles': particles,
+            'blocks': block_sprites,
+            'snake': snake_length,
+            **{name: counters.get(name, 0) for name in COUNTERS},
+            'gc': gc_collections,
+            'gc_us': gc_pause_ns // 1000,
+        }
+
+    def _csv_row(self, item):
+        """Строка для CSV (колонки - CSV_FIELDS)"""
+        (tick, sim_time, phase_times, counters, particles, block_sprites,
+         snake_length, gc_collections, gc_pause_ns) = item
+        return (
+            [tick, round(sim_time, 4), particles, block_sprites, snake_length]
+            + [counters.get(name, 0) for name in COUNTERS]
+            + [gc_collections, gc_pause_ns // 1000]
+            + [phase_times.get(phase, 0) // 1000 for phase in CSV_PHASES]
+        )
+
+    def _open_file(self):
+        """Открывает файл (для нового CSV пишет заголовок)"""
+        if self._file:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        is_new = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        self._file = open(self.path, 'a', encoding='utf-8', newline='')
+        if self.fmt == 'csv' and is_new:
+            csv.writer(self._file).writerow(CSV_FIELDS)
+
+    def _rotate(self):
+        """Переименовывает заполненный файл: path -> path.1 -> path.2 ..."""
+        self._file.close()
+        self._file = None
+        for index in range(self.backups - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+
+def create_sink(settings):
+    """Создает приемник телеметрии по настройкам (или None, если выключена)"""
+    if not settings.get('telemetry_enabled', False):
+        return None
+    fmt = settings.get('telemetry_format', 'jsonl')
+    default_path = os.path.join('telemetry', f'telemetry.{fmt}')
+    return TelemetrySink(
+        settings.get('telemetry_path') or default_path,
+        fmt,
+        int(settings.get('telemetry_max_bytes', 5_000_000)),
+        int(settings.get('telemetry_backups', 3)),
+    )
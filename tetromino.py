@@ -1,5 +1,4 @@
 """Класс тетромино"""
-import copy
 from constants import TETROMINOES
 
 
@@ -16,6 +15,8 @@ def get_rgb(color):
 class Tetromino:
     """Класс для управления тетромино (фигурой)"""
 
+    __slots__ = ('piece_type', 'color', 'x', 'y', 'shape', 'prev_x', 'prev_y')
+
     def __init__(self, piece_type, color, x, y):
         """
         Создает новую фигуру
@@ -27,7 +28,11 @@ class Tetromino:
         self.color = color
         self.x = x
         self.y = y
-        self.shape = copy.deepcopy(TETROMINOES[piece_type])
+        # Клетки формы - неизменяемые кортежи, поэтому достаточно копии списка
+        self.shape = list(TETROMINOES[piece_type])
+        # Позиция на предыдущем логическом тике (для интерполяции отрисовки)
+        self.prev_x = x
+        self.prev_y = y
 
     def get_positions(self):
         """Возвращает список абсолютных позиций блоков фигуры"""
@@ -41,6 +46,19 @@ class Tetromino:
         self.x += dx
         self.y += dy
 
+    def save_previous_state(self):
+        """Запоминает позицию перед логическим тиком"""
+        self.prev_x = self.x
+        self.prev_y = self.y
+
+    def get_interpolated_position(self, alpha):
+        """Возвращает позицию между прошлым и текущим тиком
+        alpha: 0 - позиция на прошлом тике, 1 - на текущем"""
+        if alpha >= 1.0:
+            return self.x, self.y
+        return (self.prev_x + (self.x - self.prev_x) * alpha,
+                self.prev_y + (self.y - self.prev_y) * alpha)
+
     def rotate(self):
         """Поворачивает фигуру на 90 градусов по часовой стрелке"""
         if self.piece_type == 'O':  # Квадрат не поворачивается
@@ -0,0 +1,82 @@
+"""Фиксированный шаг симуляции с аккумулятором времени"""
+from constants import MAX_CATCH_UP_TICKS
+
+
+class TickClock:
+    """Аккумулятор времени для логических тиков фиксированной длительности
+
+    Остаток времени после тика не отбрасывается, поэтому скорость игры
+    не зависит от частоты кадров. После долгого кадра выполняется столько
+    тиков, сколько прошло времени, но не больше max_catch_up за кадр -
+    остальные тики отбрасываются и учитываются в статистике.
+    """
+
+    def __init__(self, step, max_catch_up=MAX_CATCH_UP_TICKS):
+        """
+        step: длительность одного тика в секундах
+        max_catch_up: максимальное количество тиков за один кадр
+        """
+        self.step = step
+        self.max_catch_up = max_catch_up
+        self.accumulator = 0.0
+        self.frame_ticks = 0  # Тиков выполнено в текущем кадре
+
+        # Статистика
+        self.ticks = 0            # Всего выполнено тиков
+        self.caught_up_ticks = 0  # Тиков, выполненных сверх одного за кадр
+        self.dropped_ticks = 0    # Тиков, отброшенных из-за лимита догоняния
+
+    def add_time(self, delta_time):
+        """Добавляет время прошедшего кадра"""
+        self.accumulator += delta_time
+        self.frame_ticks = 0
+
+    def ready(self):
+        """Возвращает True, если в этом кадре нужно выполнить еще один тик"""
+        if self.accumulator < self.step:
+            return False
+        if self.frame_ticks >= self.max_catch_up:
+            # Лимит исчерпан - отбрасываем накопившиеся тики
+            dropped = int(self.accumulator // self.step)
+            self.dropped_ticks += dropped
+            self.accumulator -= dropped * self.step
+            return False
+        return True
+
+    def consume(self):
+        """Отмечает выполнение одного тика"""
+        self.accumulator -= self.step
+        self.frame_ticks += 1
+        self.ticks += 1
+        if self.frame_ticks > 1:
+            self.caught_up_ticks += 1
+
+    def hold(self):
+        """Не дает накопиться больше одного тика (пока симуляция на паузе)"""
+        if self.accumulator > self.step:
+            self.accumulator = self.step
+
+    def pull_forward(self):
+        """Следующий тик выполняется в ближайшем кадре, не дожидаясь шага"""
+        if self.accumulator < self.step:
+            self.accumulator = self.step
+
+    def reset(self):
+        """Сбрасывает накопленное время"""
+        self.accumulator = 0.0
+        self.frame_ticks = 0
+
+    @property
+    def alpha(self):
+        """Доля времени до следующего тика (0..1) для интерполяции"""
+        if self.step <= 0:
+            return 1.0
+        return max(0.0, min(1.0, self.accumulator / self.step))
+
+    def stats(self):
+        """Возвращает статистику тиков"""
+        return {
+            'ticks': self.ticks,
+            'caught_up': self.caught_up_ticks,
+            'dropped': self.dropped_ticks,
+        }